@@ -3,6 +3,7 @@
 # Powered by Claude AI for intelligent trip planning
 
 import os
+import asyncio
 from datetime import datetime
 from uuid import uuid4
 from typing import Optional
@@ -32,11 +33,14 @@ except ImportError:
         chat_protocol_spec,
     )
 
-from intent import parse_intent
-from planner import build_itinerary
+from intent import TripIntent, parse_intent_async, parse_multi_city_intent
+from planner import build_itinerary, iter_itinerary, Itinerary, ItineraryDay
 from llm_planner import create_intelligent_itinerary
+from multi_city import plan_multi_city
 from exporters import itinerary_to_markdown, itinerary_to_ics
 from data_sources import get_supported_cities, is_city_supported
+from singleflight import AsyncSingleFlight, normalize_request_key
+from preference_classifier import get_preference_classifier
 
 # Load environment variables
 load_dotenv()
@@ -59,6 +63,13 @@ fund_agent_if_low(agent.wallet.address())
 # Initialize the Chat Protocol
 chat_proto = Protocol(spec=chat_protocol_spec)
 
+# Coalesces identical concurrent chat requests into one planning run
+plan_flight = AsyncSingleFlight()
+
+# Long trips get a preview of their first days while the full plan is built
+PREVIEW_MIN_DAYS = 15
+PREVIEW_DAYS = 3
+
 
 def make_text_msg(text: str) -> ChatMessage:
     """Helper to wrap plain text into a ChatMessage compatible with the Chat Protocol."""
@@ -102,8 +113,14 @@ async def on_chat(ctx: Context, sender: str, msg: ChatMessage):
 
     ctx.logger.info(f"Processing request: {user_text}")
 
-    # Parse intent using Claude AI
-    intent = parse_intent(user_text)
+    async def send_preview(text: str):
+        await ctx.send(sender, make_text_msg(text))
+
+    # Identical requests arriving together share one parse + plan + export
+    # (only the first of them gets the preview)
+    intent, md, ics_path = await plan_flight.do(
+        normalize_request_key(user_text), _plan_request, user_text, send_preview
+    )
 
     if not intent.destination:
         error_msg = (
@@ -117,8 +134,7 @@ async def on_chat(ctx: Context, sender: str, msg: ChatMessage):
         await ctx.send(sender, make_text_msg(error_msg))
         return
 
-    # Validate that the destination is supported (with normalized matching)
-    if not is_city_supported(intent.destination):
+    if md is None:
         error_msg = (
             f"I found '{intent.destination}' in your request, but I don't have data for that city yet.\n\n"
             f"Supported cities: {', '.join(get_supported_cities())}\n\n"
@@ -127,25 +143,10 @@ async def on_chat(ctx: Context, sender: str, msg: ChatMessage):
         await ctx.send(sender, make_text_msg(error_msg))
         return
 
-    if not intent.days:
-        # Default to 3 days if not specified
-        intent.days = 3
-        ctx.logger.info(f"No duration specified, defaulting to {intent.days} days")
-
-    # Build itinerary using LLM-powered planner
     ctx.logger.info(
-        f"Building AI-powered itinerary for {intent.destination}, "
+        f"Built AI-powered itinerary for {intent.destination}, "
         f"{intent.days} days, preferences: {intent.preferences}"
     )
-    
-    # Use the new intelligent planner that can handle any city
-    itinerary = create_intelligent_itinerary(intent, use_llm=True)
-
-    # Format as markdown
-    md = itinerary_to_markdown(itinerary)
-
-    # Generate calendar file
-    ics_path = itinerary_to_ics(itinerary)
 
     # Build response
     reply = md
@@ -157,6 +158,83 @@ async def on_chat(ctx: Context, sender: str, msg: ChatMessage):
     ctx.logger.info(f"Sent itinerary to {sender}")
 
 
+async def _plan_request(user_text: str, send_preview=None):
+    """
+    Parse, plan and export one chat request.
+
+    For long trips, send_preview (an async callable taking markdown) gets
+    the first few days as soon as they're planned.
+
+    Multi-city requests ("Tokyo 4 days then Singapore 3") are planned leg
+    by leg and sent as one itinerary, without a preview.
+
+    Returns (intent, markdown, ics_path). markdown and ics_path are None when
+    no destination was found or the city isn't supported.
+    """
+    # Parse intent using Claude AI (awaited so other chats keep flowing)
+    intent = await parse_intent_async(user_text)
+
+    multi_city = parse_multi_city_intent(user_text, intent.preferences)
+    if multi_city:
+        for leg in multi_city.legs:
+            if not is_city_supported(leg.destination):
+                return TripIntent(destination=leg.destination, days=leg.days,
+                                  preferences=multi_city.preferences), None, None
+        plan = await asyncio.to_thread(plan_multi_city, multi_city)
+        itinerary = plan.itinerary
+        intent = TripIntent(destination=itinerary.destination, days=itinerary.days,
+                            preferences=multi_city.preferences)
+        ics_path = await asyncio.to_thread(itinerary_to_ics, itinerary)
+        return intent, itinerary_to_markdown(itinerary), ics_path
+
+    # Validate that the destination is supported (with normalized matching)
+    if not intent.destination or not is_city_supported(intent.destination):
+        return intent, None, None
+
+    if not intent.days:
+        # Default to 3 days if not specified
+        intent.days = 3
+
+    if send_preview and intent.days >= PREVIEW_MIN_DAYS:
+        preview = await asyncio.to_thread(_render_preview, intent)
+        await send_preview(preview)
+
+    # Use the new intelligent planner that can handle any city.
+    # Planning and export are blocking, so run them in a worker thread.
+    itinerary = await asyncio.to_thread(create_intelligent_itinerary, intent, True)
+
+    # Format as markdown
+    md = itinerary_to_markdown(itinerary)
+
+    # Generate calendar file
+    ics_path = await asyncio.to_thread(itinerary_to_ics, itinerary)
+
+    return intent, md, ics_path
+
+
+def _render_preview(intent) -> str:
+    """Markdown for the first PREVIEW_DAYS days, streamed from the planner."""
+    items, day_ranges = [], []
+    for part in iter_itinerary(intent):
+        if isinstance(part, ItineraryDay):
+            if part.day > PREVIEW_DAYS:
+                break
+            items.extend(part.items)
+        else:
+            if part.start_day > PREVIEW_DAYS:
+                break
+            day_ranges.append(part)
+
+    partial = Itinerary(destination=intent.destination, days=intent.days,
+                        items=items, day_ranges=day_ranges)
+    # Drop the "# N-Day Trip" title; the full plan carries it
+    body = itinerary_to_markdown(partial).split("\n", 1)[1].lstrip("\n")
+    return (
+        f"⏳ Planning your {intent.days}-day trip to {intent.destination}. "
+        f"Here's how it starts while I finish the rest:\n\n{body}"
+    )
+
+
 @chat_proto.on_message(ChatAcknowledgement)
 async def on_ack(ctx: Context, sender: str, msg: ChatAcknowledgement):
     """Log acknowledgements for messages this agent has sent."""
@@ -177,6 +255,10 @@ async def startup(ctx: Context):
     ctx.logger.info(f"Chat Protocol enabled and manifest published")
     ctx.logger.info(f"🌍 AI-Powered Planning: Can plan trips to ANY city worldwide!")
     ctx.logger.info(f"📊 Static Database: {', '.join(get_supported_cities())} (enhanced with AI)")
+
+    # Load the local preference classifier before the first chat arrives
+    if get_preference_classifier():
+        ctx.logger.info("🏷️  Local preference classifier: LOADED")
     
     # Check if Anthropic API key is available
     if os.getenv("ANTHROPIC_API_KEY"):
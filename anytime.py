@@ -0,0 +1,185 @@
+# anytime.py
+# Anytime planning: a greedy itinerary right away, improved by local search until a deadline
+# Plans are compared with the same objective as the variant generator
+
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, List
+
+from data_sources import fetch_pois
+from intent import TripIntent
+from planner import Itinerary, ItineraryItem, _next_starts, _slot_duration, build_itinerary
+from planner_config import PlannerConfig, get_config
+from variants import ItineraryScore, ObjectiveWeights, score_itinerary
+
+DEFAULT_DEADLINE_MS = 200.0
+
+# Share of local-search moves that bring in an unused POI (the rest swap two planned ones)
+REPLACE_MOVE_SHARE = 0.5
+
+
+@dataclass
+class AnytimeResult:
+    """
+    Best itinerary found before the deadline.
+
+    Attributes:
+        itinerary: Best plan found (the greedy plan if nothing beat it)
+        score: Its score
+        initial_score: Score of the greedy plan
+        improvement: score.total - initial_score.total
+        greedy_ms: Time spent building the greedy plan
+        search_ms: Time spent in local search
+        elapsed_ms: Total time spent
+        iterations: Moves tried
+        accepted: Moves that improved the plan
+    """
+    itinerary: Itinerary
+    score: ItineraryScore
+    initial_score: ItineraryScore
+    improvement: float
+    greedy_ms: float
+    search_ms: float
+    elapsed_ms: float
+    iterations: int
+    accepted: int
+
+
+def plan_anytime(intent: TripIntent, deadline_ms: float = DEFAULT_DEADLINE_MS,
+                 config: PlannerConfig = None, weights: ObjectiveWeights = None,
+                 seed: int = 0) -> AnytimeResult:
+    """
+    Plan a trip within a wall-clock budget.
+
+    The greedy build_itinerary() plan is built first, so a valid plan with
+    every day covered exists whatever the budget. The rest of the budget
+    goes to hill climbing on score_itinerary(): each move either puts an
+    unused catalog POI in an activity's slot or swaps two activities'
+    slots, and is kept only if the score goes up. Moves keep every slot
+    filled and every POI open at its slot's hour (in timed mode, open for
+    its whole visit, which ends before the day's next activity), so the
+    plan stays valid after any number of them.
+
+    Args:
+        intent: Parsed trip intent
+        deadline_ms: Budget in milliseconds, counted from the call
+        config: Planner configuration (uses default if not provided)
+        weights: Objective weights (uses ObjectiveWeights() if not provided)
+        seed: Seed for choosing moves
+    """
+    start = time.perf_counter()
+    deadline = start + deadline_ms / 1000
+    if config is None:
+        config = get_config()
+
+    itinerary = build_itinerary(intent, config)
+    greedy_done = time.perf_counter()
+    initial = score_itinerary(itinerary, intent.preferences, weights)
+
+    search = _LocalSearch(itinerary, fetch_pois(intent.destination, intent.preferences),
+                          intent.preferences, weights, seed, config)
+    score = search.run(initial, deadline)
+
+    end = time.perf_counter()
+    return AnytimeResult(
+        itinerary=itinerary,
+        score=score,
+        initial_score=initial,
+        improvement=round(score.total - initial.total, 6),
+        greedy_ms=(greedy_done - start) * 1000,
+        search_ms=(end - greedy_done) * 1000,
+        elapsed_ms=(end - start) * 1000,
+        iterations=search.iterations,
+        accepted=search.accepted,
+    )
+
+
+class _LocalSearch:
+    """Hill climbing over one itinerary's activities, in place."""
+
+    def __init__(self, itinerary: Itinerary, pois: List[dict], preferences: List[str],
+                 weights: ObjectiveWeights, seed: int, config: PlannerConfig):
+        self.itinerary = itinerary
+        self.config = config
+        # Slots keep their day and start time through every move
+        self.next_starts = _next_starts(itinerary.items)
+        self.preferences = preferences
+        self.weights = weights
+        self.rng = random.Random(seed)
+        self.pois_by_name: Dict[str, dict] = {}
+        for poi in pois:
+            self.pois_by_name.setdefault(poi.get("name", "Unknown"), poi)
+        used = {item.name for item in itinerary.items}
+        self.unused = [poi for name, poi in self.pois_by_name.items() if name not in used]
+        self.iterations = 0
+        self.accepted = 0
+
+    def run(self, score: ItineraryScore, deadline: float) -> ItineraryScore:
+        items = self.itinerary.items
+        # Items that aren't catalog POIs (e.g. the unsupported-city message) are left alone
+        if not all(item.name in self.pois_by_name for item in items):
+            return score
+        movable = len(items) >= 2 or bool(items and self.unused)
+        while movable and time.perf_counter() < deadline:
+            self.iterations += 1
+            if self.unused and (len(items) < 2 or self.rng.random() < REPLACE_MOVE_SHARE):
+                undo = self._replace()
+            else:
+                undo = self._swap()
+            if undo is None:
+                continue
+            candidate = score_itinerary(self.itinerary, self.preferences, self.weights)
+            if candidate.total > score.total + 1e-9:
+                score = candidate
+                self.accepted += 1
+            else:
+                undo()
+        return score
+
+    def _replace(self):
+        """Put a random unused POI in a random activity's slot, if it fits there."""
+        items = self.itinerary.items
+        i = self.rng.randrange(len(items))
+        j = self.rng.randrange(len(self.unused))
+        poi = self.unused[j]
+        old = items[i]
+        duration = _slot_duration(poi, old, self.config, self.next_starts[i])
+        if duration is None:
+            return None
+        items[i] = _with_poi(old, poi, duration)
+        self.unused[j] = self.pois_by_name[old.name]
+
+        def undo():
+            items[i] = old
+            self.unused[j] = poi
+        return undo
+
+    def _swap(self):
+        """Swap the POIs in two random slots, if each fits its new slot."""
+        items = self.itinerary.items
+        i, j = self.rng.sample(range(len(items)), 2)
+        a, b = items[i], items[j]
+        poi_a, poi_b = self.pois_by_name[a.name], self.pois_by_name[b.name]
+        duration_a = _slot_duration(poi_a, b, self.config, self.next_starts[j])
+        duration_b = _slot_duration(poi_b, a, self.config, self.next_starts[i])
+        if duration_a is None or duration_b is None:
+            return None
+        items[i], items[j] = _with_poi(a, poi_b, duration_b), _with_poi(b, poi_a, duration_a)
+
+        def undo():
+            items[i], items[j] = a, b
+        return undo
+
+
+def _with_poi(slot: ItineraryItem, poi: dict, duration_minutes: int) -> ItineraryItem:
+    """`poi` in the day and time of `slot`."""
+    return ItineraryItem(
+        day=slot.day,
+        time=slot.time,
+        name=poi.get("name", "Unknown"),
+        area=poi.get("area", "Unknown"),
+        tags=poi.get("tags", []),
+        url=poi.get("url", ""),
+        duration_minutes=duration_minutes
+    )
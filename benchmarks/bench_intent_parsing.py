@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Intent parsing accuracy/latency benchmark over the labeled intent corpus.
+
+Runs every request in data/intent_corpus_v1.jsonl through four parsers:
+
+    rule      _parse_intent_simple() (keyword matching only)
+    fallback  parse_intent() without an API key: the rule parser plus the
+              local preference classifier
+    tiered    parse_intent(use_local_preferences=True); Claude is only asked
+              for DESTINATION and DAYS
+    llm       parse_intent() as served by default, with Claude extracting
+              all three fields
+
+Claude is replaced by StubClaude answering from the corpus labels, so the
+"tiered" and "llm" accuracy numbers are an upper bound on what a perfect
+model would reach: they measure the parsing/merging code and the local
+classifier, not Claude itself. Latency for those parsers is pure overhead
+unless --simulate-latency is given.
+
+Results are written as JSON keyed by parser, together with the corpus
+version and checksum, so runs can be diffed. --baseline compares against a
+previous run and exits non-zero on regressions.
+
+Usage:
+    python3 benchmarks/bench_intent_parsing.py [--output results.json]
+        [--baseline baseline.json] [--limit N] [--simulate-latency]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from circuit_breaker import get_llm_breaker
+from intent import parse_intent, _parse_intent_fallback, _parse_intent_simple
+from preference_classifier import get_preference_classifier
+from stub_claude import StubClaude
+
+CORPUS_VERSION = 1
+CORPUS_PATH = os.path.join(ROOT, "data", f"intent_corpus_v{CORPUS_VERSION}.jsonl")
+
+FIELDS = ("destination", "days", "preferences", "all_fields")
+
+# Default regression thresholds for --baseline
+MAX_ACCURACY_DROP = 0.005
+MAX_LATENCY_INCREASE = 0.5
+
+
+def load_corpus(path: str) -> list:
+    examples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                examples.append(json.loads(line))
+    return examples
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def oracle_client(examples: list, simulate_latency: bool) -> StubClaude:
+    """StubClaude that replies with the gold labels for each corpus request."""
+    by_text = {e["text"]: e for e in examples}
+
+    def reply(user_content: str) -> str:
+        # parse_intent sends: Request: "<text>"
+        text = user_content.partition('"')[2].rpartition('"')[0]
+        example = by_text.get(text, {})
+        days = example.get("days")
+        return (
+            f"DESTINATION: {example.get('destination') or 'NONE'}\n"
+            f"DAYS: {days if days is not None else 'NONE'}\n"
+            f"PREFERENCES: {', '.join(example.get('preferences') or []) or 'NONE'}"
+        )
+
+    if simulate_latency:
+        return StubClaude(reply_fn=reply)
+    return StubClaude(reply_fn=reply, base_latency=0.0, seconds_per_input_token=0.0,
+                      seconds_per_output_token=0.0)
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def score(examples: list, predictions: list) -> dict:
+    """Per-field accuracy plus micro precision/recall/F1 for preferences."""
+    correct = {field: 0 for field in FIELDS}
+    tp = fp = fn = 0
+    for example, intent in zip(examples, predictions):
+        destination_ok = (intent.destination or "").lower() == (example["destination"] or "").lower()
+        days_ok = intent.days == example["days"]
+        predicted, expected = set(intent.preferences), set(example["preferences"])
+        preferences_ok = predicted == expected
+        tp += len(predicted & expected)
+        fp += len(predicted - expected)
+        fn += len(expected - predicted)
+
+        correct["destination"] += destination_ok
+        correct["days"] += days_ok
+        correct["preferences"] += preferences_ok
+        correct["all_fields"] += destination_ok and days_ok and preferences_ok
+
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    n = max(1, len(examples))
+    return {
+        "accuracy": {field: round(correct[field] / n, 4) for field in FIELDS},
+        "preferences_micro": {"precision": round(precision, 4), "recall": round(recall, 4),
+                              "f1": round(f1, 4)},
+    }
+
+
+def run_parser(name: str, parse_fn, examples: list) -> dict:
+    get_llm_breaker().reset()
+    predictions, latencies = [], []
+    start = time.perf_counter()
+    for example in examples:
+        t0 = time.perf_counter()
+        predictions.append(parse_fn(example["text"]))
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    result = score(examples, predictions)
+    result.update({
+        "requests": len(examples),
+        "throughput_rps": round(len(examples) / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p90": round(percentile(latencies, 90) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+    })
+    print(f"{name:>8}: all-fields {result['accuracy']['all_fields']:.1%}  "
+          f"p50 {result['latency_ms']['p50']:.3f} ms  {result['throughput_rps']} req/s",
+          file=sys.stderr)
+    return result
+
+
+def compare(current: dict, baseline: dict, max_accuracy_drop: float,
+            max_latency_increase: float) -> list:
+    """Return human-readable regressions of `current` against `baseline`."""
+    regressions = []
+    if current["corpus"]["sha256"] != baseline.get("corpus", {}).get("sha256"):
+        regressions.append("corpus differs from baseline; results are not comparable")
+        return regressions
+
+    for name, result in current["parsers"].items():
+        base = baseline.get("parsers", {}).get(name)
+        if base is None:
+            continue
+        for field in FIELDS:
+            drop = base["accuracy"][field] - result["accuracy"][field]
+            if drop > max_accuracy_drop:
+                regressions.append(f"{name}: {field} accuracy {base['accuracy'][field]:.4f} "
+                                   f"-> {result['accuracy'][field]:.4f}")
+        # Latency only compares like with like
+        if current.get("simulate_latency") == baseline.get("simulate_latency"):
+            before, after = base["latency_ms"]["p50"], result["latency_ms"]["p50"]
+            if before > 0 and (after - before) / before > max_latency_increase:
+                regressions.append(f"{name}: p50 latency {before:.3f} ms -> {after:.3f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intent parsing accuracy/latency benchmark")
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N requests")
+    parser.add_argument("--simulate-latency", action="store_true",
+                        help="Use StubClaude's default network/generation delays")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="Previous report to compare against")
+    parser.add_argument("--max-accuracy-drop", type=float, default=MAX_ACCURACY_DROP)
+    parser.add_argument("--max-latency-increase", type=float, default=MAX_LATENCY_INCREASE,
+                        help="Allowed relative p50 increase (0.5 = +50%%)")
+    args = parser.parse_args()
+
+    # Never reach the real API from a benchmark
+    os.environ.pop("ANTHROPIC_API_KEY", None)
+
+    examples = load_corpus(args.corpus)
+    if args.limit:
+        examples = examples[:args.limit]
+    if get_preference_classifier() is None:
+        sys.exit("Preference classifier weights not found; run preference_classifier.py")
+
+    client = oracle_client(examples, args.simulate_latency)
+    parsers = {
+        "rule": _parse_intent_simple,
+        "fallback": _parse_intent_fallback,
+        "tiered": lambda text: parse_intent(text, client=client, use_local_preferences=True),
+        "llm": lambda text: parse_intent(text, client=client),
+    }
+
+    report = {
+        "corpus": {
+            "path": os.path.relpath(args.corpus, ROOT),
+            "version": CORPUS_VERSION,
+            "requests": len(examples),
+            "sha256": file_sha256(args.corpus),
+        },
+        "simulate_latency": args.simulate_latency,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "parsers": {name: run_parser(name, fn, examples) for name, fn in parsers.items()},
+    }
+    report["stub_tokens"] = {
+        "input_billed": round(client.input_tokens_billed),
+        "output_sent": client.output_tokens_sent,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.max_accuracy_drop, args.max_latency_increase)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Time-to-intent benchmark: full completion vs streamed early exit.
+
+"before" reproduces the original flow: the whole prompt (instructions and
+few-shot examples) sent as one user message, then a blocking create() that
+waits for every output token. "after" is parse_intent() with Claude
+extracting all three fields (use_local_preferences=False), so the only
+difference is streaming that stops once DESTINATION/DAYS/PREFERENCES
+arrive. The prompt is below the minimum cacheable length, so neither side
+gets prompt caching and input tokens are about the same.
+
+Both run against StubClaude, so results are deterministic and need no API key.
+
+Usage:
+    python3 benchmarks/bench_intent_streaming.py [--requests N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from intent import INTENT_SYSTEM_PROMPT, parse_intent, _parse_intent_response
+from stub_claude import StubClaude
+
+REQUESTS = [
+    "Plan a 3-day trip to Tokyo for food and culture",
+    "I want to visit Barcelona for 2 days, focus on architecture",
+    "Family trip to Singapore for 4 days, kid-friendly",
+    "London trip for 3 days, museums and history",
+]
+
+TERSE_REPLY = "DESTINATION: Tokyo\nDAYS: 3\nPREFERENCES: food, culture"
+CHATTY_REPLY = TERSE_REPLY + (
+    "\n\nThe user wants a short city break focused on food and culture, "
+    "so both categories were selected from the allowed list."
+)
+
+
+def legacy_parse(text: str, client):
+    """The pre-streaming flow: one uncached prompt, wait for the full reply."""
+    prompt = f'{INTENT_SYSTEM_PROMPT}\n\nUser request: "{text}"\n\nNow parse the user\'s request.'
+    message = client.messages.create(
+        model="claude-3-haiku-20240307",
+        max_tokens=300,
+        messages=[{"role": "user", "content": prompt}]
+    )
+    return _parse_intent_response(message.content[0].text)
+
+
+def run(parse_fn, reply: str, n: int) -> dict:
+    client = StubClaude(reply_fn=lambda _text: reply)
+    latencies = []
+    for i in range(n):
+        start = time.perf_counter()
+        intent = parse_fn(REQUESTS[i % len(REQUESTS)], client)
+        latencies.append(time.perf_counter() - start)
+        assert intent.destination == "Tokyo"
+    return {
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "max_ms": round(max(latencies) * 1000, 1),
+        "input_tokens_per_request": round(client.input_tokens_billed / n, 1),
+        "output_tokens_read_per_request": round(client.output_tokens_sent / n, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    results = {}
+    for label, reply in (("terse_reply", TERSE_REPLY), ("chatty_reply", CHATTY_REPLY)):
+        results[label] = {
+            "before": run(legacy_parse, reply, args.requests),
+            "after": run(lambda text, client: parse_intent(text, client=client, use_local_preferences=False),
+                         reply, args.requests),
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+LLM city planning: two Claude calls vs one call plus the local scheduler.
+
+"two_call" is the original flow for cities outside the catalog: Claude
+generates the POIs, then a second call arranges them into days.
+"scheduled" sets LLMConfig.schedule_generated_pois, so the same POIs go
+through schedule_itinerary() locally and the second round trip disappears.
+
+Both run against StubClaude, so results are deterministic and need no API
+key. Token counts are the stub's ~4 characters per token estimate; the
+itinerary reply mimics Claude's (one reasoning sentence per activity).
+
+The two flows don't plan the same number of activities: the scheduler
+follows the planner's pacing, Claude's reply fills three slots a day. So
+each flow also reports activities per activity day and preference
+coverage (share of activities matching a requested preference), to read
+the savings against.
+
+Usage:
+    python3 benchmarks/bench_llm_scheduling.py [--days 3 7 14] [--repeats N] [--speedup X]
+"""
+
+import argparse
+import dataclasses
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from intent import TripIntent
+from llm_planner import LLMTripPlanner
+from stub_claude import StubClaude
+from validator import validate_itinerary
+
+CITY = "Valdoria"
+PREFERENCES = ["food"]
+AREAS = ["Old Town", "Harbour", "Museum Quarter", "Hillside", "Market District"]
+TAGS = ["food", "culture", "museum", "nature", "history", "nightlife", "shopping", "art"]
+HOURS = [("9:00-18:00", "Morning", "2 hours"), ("10:00-17:00", "Afternoon", "1-2 hours"),
+         ("24/7", "Any time", "1 hour"), ("17:00-23:00", "Evening", "2-3 hours")]
+
+
+def poi_reply(count: int) -> str:
+    """A POI generation answer with `count` entries."""
+    pois = []
+    for i in range(count):
+        opening, best, duration = HOURS[i % len(HOURS)]
+        pois.append({
+            "name": f"{CITY} Sight {i + 1}",
+            "area": AREAS[i % len(AREAS)],
+            "description": "A well-loved local spot with a long history. Visitors come for the views "
+                           "and stay for the food stalls nearby.",
+            "tags": [TAGS[i % len(TAGS)], TAGS[(i + 3) % len(TAGS)]],
+            "estimated_duration": duration,
+            "best_time_to_visit": best,
+            "opening_hours": opening,
+            "google_maps_query": f"{CITY} Sight {i + 1}",
+        })
+    return json.dumps(pois)
+
+
+def itinerary_reply(prompt: str) -> str:
+    """An itinerary answer covering the attractions listed in the prompt, three a day."""
+    days = int(re.search(r"Duration: (\d+) days", prompt).group(1))
+    names = re.findall(r'"name": "([^"]+)"', prompt)
+    areas = re.findall(r'"area": "([^"]+)"', prompt)
+    slots = ["09:00", "12:00", "15:00"]
+    items = [{"day": i // 3 + 1, "time": slots[i % 3], "activity_name": name, "area": area,
+              "reasoning": "Fits this slot because it is open then and close to the previous stop."}
+             for i, (name, area) in enumerate(zip(names, areas)) if i // 3 < days]
+    last_day = items[-1]["day"] if items else 0
+    day_ranges = []
+    if last_day < days:
+        day_ranges.append({"start_day": last_day + 1, "end_day": days,
+                           "description": "Rest and free exploration", "activity_type": "free_exploration"})
+    return json.dumps({"itinerary_items": items, "day_ranges": day_ranges,
+                       "planning_notes": "Activities are grouped by area and spread evenly across the days."})
+
+
+def reply(prompt: str) -> str:
+    if "AVAILABLE ATTRACTIONS" in prompt:
+        return itinerary_reply(prompt)
+    return poi_reply(int(re.search(r"Number of POIs needed: (\d+)", prompt).group(1)))
+
+
+def run(planner: LLMTripPlanner, schedule: bool, days: int, repeats: int, speedup: float) -> dict:
+    planner.config = dataclasses.replace(planner.config, schedule_generated_pois=schedule)
+    client = StubClaude(reply_fn=reply, base_latency=0.05 / speedup,
+                        seconds_per_input_token=0.0002 / speedup,
+                        seconds_per_output_token=0.004 / speedup)
+    planner.client = client
+    calls = 0
+    original_create = client.messages.create
+
+    def counting_create(**kwargs):
+        nonlocal calls
+        calls += 1
+        return original_create(**kwargs)
+
+    client.messages.create = counting_create
+
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        itinerary = planner._plan_with_llm(TripIntent(destination=CITY, days=days, preferences=PREFERENCES))
+        latencies.append(time.perf_counter() - start)
+    activity_days = len({item.day for item in itinerary.items})
+    matched = sum(1 for item in itinerary.items if set(item.tags) & set(PREFERENCES))
+    return {
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+        "claude_calls": calls // repeats,
+        "input_tokens": round(client.input_tokens_billed / repeats),
+        "output_tokens": round(client.output_tokens_sent / repeats),
+        "activities": len(itinerary.items),
+        "activities_per_day": round(len(itinerary.items) / activity_days, 2) if activity_days else 0.0,
+        "preference_coverage": round(matched / len(itinerary.items), 3) if itinerary.items else 0.0,
+        "violations": len(validate_itinerary(itinerary).violations),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--days", type=int, nargs="+", default=[3, 7, 14])
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--speedup", type=float, default=1.0,
+                        help="Divide the stub's latencies by this (token counts are unaffected)")
+    args = parser.parse_args()
+
+    planner = LLMTripPlanner(api_key="stub")
+    planner.breaker.reset()
+
+    results = {}
+    for days in args.days:
+        before = run(planner, False, days, args.repeats, args.speedup)
+        after = run(planner, True, days, args.repeats, args.speedup)
+        results[f"{days}_days"] = {
+            "two_call": before,
+            "scheduled": after,
+            "latency_saved_pct": round(100 * (1 - after["mean_ms"] / before["mean_ms"]), 1),
+            "input_tokens_saved_pct": round(100 * (1 - after["input_tokens"] / before["input_tokens"]), 1),
+            "output_tokens_saved_pct": round(100 * (1 - after["output_tokens"] / before["output_tokens"]), 1),
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Planner scaling benchmark: time and memory against catalog size and trip length.
+
+Two series of synthetic trips:
+
+    catalog_size  10 .. 100k POIs in one city, FIXED_DAYS-day trip
+    trip_length   1 .. 100k days, FIXED_POIS-POI catalog
+
+For every point it measures build_itinerary(), get_uncovered_days() on the
+result, itinerary_to_markdown() and itinerary_to_ics_string(), recording:
+
+    ms       median wall-clock time over --repeats runs
+    peak_kb  peak traced memory during one run (tracemalloc)
+    blocks   memory blocks still allocated after one untraced run, i.e. the
+             size of the result in allocations
+
+Each operation's time is then fitted against n on a log-log scale
+(least squares over the points at or above FIT_MIN_N); the slope is the
+empirical exponent, ~1 for linear work and ~2 for quadratic. Any slope
+above --max-slope fails the run, baseline or not.
+
+--baseline compares against a previous report and exits non-zero when a
+point got slower by more than --max-time-increase or its peak memory grew
+by more than --max-memory-increase. Times under MIN_COMPARABLE_MS are too
+noisy to compare and are skipped.
+
+Usage:
+    python3 benchmarks/bench_planner_scaling.py [--quick] [--repeats 3]
+        [--output results.json] [--baseline baseline.json]
+"""
+
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import data_sources
+from bench_poi_scoring import PREFERENCES, synthetic_catalog
+from exporters import itinerary_to_ics_string, itinerary_to_markdown
+from intent import TripIntent
+from planner import build_itinerary
+from planner_config import PlannerConfig
+
+CITY = "Scaling City"
+FIXED_DAYS = 14
+FIXED_POIS = 1000
+CATALOG_SIZES = [10, 100, 1_000, 10_000, 100_000]
+TRIP_LENGTHS = [1, 10, 100, 1_000, 10_000, 100_000]
+QUICK_CATALOG_SIZES = [10, 100, 1_000, 10_000]
+QUICK_TRIP_LENGTHS = [1, 10, 100, 1_000, 10_000]
+
+OPERATIONS = ("build_itinerary", "get_uncovered_days", "markdown", "ics")
+START_DATE = datetime(2030, 1, 7, 9, 0)
+
+# Points below this n are dominated by fixed costs and left out of the fit
+FIT_MIN_N = 100
+
+# Default thresholds
+MAX_SLOPE = 1.5
+MAX_TIME_INCREASE = 1.0     # +100%: timings on shared machines are noisy
+MAX_MEMORY_INCREASE = 0.25
+MIN_COMPARABLE_MS = 0.5
+
+
+def measure(fn, repeats: int):
+    """(stats, result) for one operation."""
+    times = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    del result
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    result = fn()
+    blocks = sys.getallocatedblocks() - blocks_before
+
+    times.sort()
+    return {
+        "ms": round(times[len(times) // 2] * 1000, 4),
+        "peak_kb": round(peak / 1024, 1),
+        "blocks": blocks,
+    }, result
+
+
+def run_point(n_pois: int, days: int, repeats: int) -> dict:
+    data_sources.register_destination(CITY, synthetic_catalog(n_pois))
+    try:
+        intent = TripIntent(destination=CITY, days=days, preferences=PREFERENCES)
+        config = PlannerConfig()
+        point = {}
+        point["build_itinerary"], itinerary = measure(lambda: build_itinerary(intent, config), repeats)
+        point["get_uncovered_days"], uncovered = measure(itinerary.get_uncovered_days, repeats)
+        point["markdown"], _ = measure(lambda: itinerary_to_markdown(itinerary), repeats)
+        point["ics"], _ = measure(lambda: itinerary_to_ics_string(itinerary, START_DATE), repeats)
+        assert uncovered == [], f"{days} days / {n_pois} POIs: uncovered days {uncovered[:5]}"
+        return point
+    finally:
+        data_sources.remove_destination(CITY)
+
+
+def fit_slope(points: list, operation: str) -> float:
+    """Least-squares slope of log(ms) against log(n)."""
+    xs, ys = [], []
+    for point in points:
+        if point["n"] >= FIT_MIN_N:
+            xs.append(math.log(point["n"]))
+            ys.append(math.log(max(point[operation]["ms"], 1e-3)))
+    if len(xs) < 2:
+        return 0.0
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    var = sum((x - mean_x) ** 2 for x in xs)
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    return round(cov / var, 3)
+
+
+def run_series(name: str, values: list, repeats: int) -> list:
+    points = []
+    for n in values:
+        if name == "catalog_size":
+            point = run_point(n, FIXED_DAYS, repeats)
+        else:
+            point = run_point(FIXED_POIS, n, repeats)
+        points.append({"n": n, **point})
+        print(f"{name:>12} n={n:>7}: " + "  ".join(
+            f"{op} {point[op]['ms']:.3f} ms/{point[op]['peak_kb']:.0f} KB" for op in OPERATIONS),
+            file=sys.stderr)
+    return points
+
+
+def compare(current: dict, baseline: dict, max_time_increase: float,
+            max_memory_increase: float) -> list:
+    """Return human-readable regressions of `current` against `baseline`."""
+    regressions = []
+    for series, points in current["series"].items():
+        base_points = {p["n"]: p for p in baseline.get("series", {}).get(series, [])}
+        for point in points:
+            base = base_points.get(point["n"])
+            if base is None:
+                continue
+            for op in OPERATIONS:
+                before, after = base[op]["ms"], point[op]["ms"]
+                if before >= MIN_COMPARABLE_MS and (after - before) / before > max_time_increase:
+                    regressions.append(f"{series} n={point['n']} {op}: {before:.3f} ms -> {after:.3f} ms")
+                before, after = base[op]["peak_kb"], point[op]["peak_kb"]
+                if before > 0 and (after - before) / before > max_memory_increase:
+                    regressions.append(f"{series} n={point['n']} {op}: peak {before:.0f} KB -> {after:.0f} KB")
+    return regressions
+
+
+def superlinear(report: dict, max_slope: float) -> list:
+    """Operations whose fitted exponent is above `max_slope`."""
+    return [f"{series} {op}: time grows as n^{slope}"
+            for series, slopes in report["slopes"].items()
+            for op, slope in slopes.items() if slope > max_slope]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Planner time/memory scaling benchmark")
+    parser.add_argument("--quick", action="store_true", help="Stop at 10k POIs / 10k days")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="Previous report to compare against")
+    parser.add_argument("--max-slope", type=float, default=MAX_SLOPE)
+    parser.add_argument("--max-time-increase", type=float, default=MAX_TIME_INCREASE,
+                        help="Allowed relative time increase per point (1.0 = +100%%)")
+    parser.add_argument("--max-memory-increase", type=float, default=MAX_MEMORY_INCREASE)
+    args = parser.parse_args()
+
+    sizes = QUICK_CATALOG_SIZES if args.quick else CATALOG_SIZES
+    lengths = QUICK_TRIP_LENGTHS if args.quick else TRIP_LENGTHS
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "fixed": {"days": FIXED_DAYS, "pois": FIXED_POIS},
+        "series": {
+            "catalog_size": run_series("catalog_size", sizes, args.repeats),
+            "trip_length": run_series("trip_length", lengths, args.repeats),
+        },
+    }
+    report["slopes"] = {series: {op: fit_slope(points, op) for op in OPERATIONS}
+                        for series, points in report["series"].items()}
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    failures = superlinear(report, args.max_slope)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        failures += compare(report, baseline, args.max_time_increase, args.max_memory_increase)
+    for line in failures:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+    print("No regressions" + (" against baseline" if args.baseline else ""), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+POI scoring benchmark: pure-Python vs NumPy-vectorized ranking.
+
+Times the catalog work the planner does per request — ranking POIs against
+the preferences and finding which POIs are open in each time slot — on
+synthetic catalogs of 100, 10k and 100k POIs, plus a full build_itinerary
+with PlannerConfig(vectorized_scoring=False/True). The vectorized matrix is
+built once per catalog; its build time is reported separately.
+
+Usage:
+    python3 benchmarks/bench_poi_scoring.py [--sizes 100 10000 100000] [--repeats 5]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_sources
+from intent import TripIntent
+from planner import TIME_SLOTS, build_itinerary, _is_open, _rank_pois
+from planner_config import PlannerConfig
+from poi_matrix import PoiMatrix, get_poi_matrix, numpy_available
+
+TAGS = ["food", "culture", "history", "art", "nature", "shopping", "nightlife",
+        "architecture", "family", "beach", "sports", "music"]
+PREFERENCES = ["food", "art", "history"]
+CITY = "Benchmark City"
+
+
+def synthetic_catalog(n: int, seed: int = 36) -> list:
+    rng = random.Random(seed)
+    pois = []
+    for i in range(n):
+        open_start = rng.randint(0, 14)
+        pois.append({
+            "name": f"Place {i}",
+            "area": f"Area {rng.randint(0, max(1, n // 25))}",
+            "tags": rng.sample(TAGS, rng.randint(1, 4)),
+            "open": (open_start, rng.randint(open_start + 2, 24)),
+            "url": "",
+        })
+    return pois
+
+
+def median_seconds(fn, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def python_scoring(pois: list, prefs: set):
+    ranked = _rank_pois(pois, prefs)
+    return ranked, [[poi for poi in ranked if _is_open(poi, hour)] for _, hour in TIME_SLOTS]
+
+
+def run(n: int, repeats: int) -> dict:
+    pois = synthetic_catalog(n)
+    prefs = set(PREFERENCES)
+    hours = [hour for _, hour in TIME_SLOTS]
+
+    python_s = median_seconds(lambda: python_scoring(pois, prefs), repeats)
+    matrix_build_s = median_seconds(lambda: PoiMatrix(pois), max(1, repeats // 2))
+    matrix = PoiMatrix(pois)
+    vectorized_s = median_seconds(lambda: matrix.rank_with_slots(prefs, hours), repeats)
+
+    # Sanity check: both paths must agree
+    assert python_scoring(pois, prefs) == matrix.rank_with_slots(prefs, hours)
+
+    data_sources.register_destination(CITY, pois)
+    try:
+        intent = TripIntent(destination=CITY, days=14, preferences=PREFERENCES)
+        get_poi_matrix(data_sources.fetch_pois(CITY))  # warm the per-city matrix
+        plan_python_s = median_seconds(lambda: build_itinerary(intent, PlannerConfig()), repeats)
+        plan_vectorized_s = median_seconds(
+            lambda: build_itinerary(intent, PlannerConfig(vectorized_scoring=True)), repeats)
+    finally:
+        data_sources.remove_destination(CITY)
+
+    return {
+        "pois": n,
+        "scoring_ms": {
+            "python": round(python_s * 1000, 3),
+            "vectorized": round(vectorized_s * 1000, 3),
+            "speedup": round(python_s / vectorized_s, 1) if vectorized_s else None,
+        },
+        "matrix_build_ms": round(matrix_build_s * 1000, 3),
+        "build_itinerary_ms": {
+            "python": round(plan_python_s * 1000, 3),
+            "vectorized": round(plan_vectorized_s * 1000, 3),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pure-Python vs vectorized POI scoring")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    if not numpy_available():
+        sys.exit("NumPy is not installed; pip install numpy to run this benchmark")
+
+    results = [run(n, args.repeats) for n in args.sizes]
+    for r in results:
+        print(f"{r['pois']:>7} POIs: scoring {r['scoring_ms']['python']:>9.3f} ms -> "
+              f"{r['scoring_ms']['vectorized']:>8.3f} ms ({r['scoring_ms']['speedup']}x), "
+              f"matrix build {r['matrix_build_ms']:.1f} ms", file=sys.stderr)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
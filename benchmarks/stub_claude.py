@@ -0,0 +1,123 @@
+# stub_claude.py
+# Local stand-in for the Anthropic client used by the benchmarks
+# Simulates prompt processing, prompt caching and token-by-token output
+
+import re
+import time
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def min_cacheable_tokens(model: str) -> int:
+    """Shortest prefix the API will cache for `model` (shorter ones are billed in full)."""
+    return 2048 if "haiku" in (model or "") else 1024
+
+
+def split_tokens(text: str) -> list:
+    """Split text into word/punctuation/whitespace pieces, like streamed deltas."""
+    return re.findall(r"\s+|\w+|[^\w\s]", text)
+
+
+class _StubStream:
+    """Context manager exposing text_stream like the SDK's MessageStream."""
+
+    def __init__(self, client, tokens: list, first_token_delay: float):
+        self._client = client
+        self._tokens = tokens
+        self._first_token_delay = first_token_delay
+
+    def _iter(self):
+        time.sleep(self._first_token_delay)
+        for token in self._tokens:
+            time.sleep(self._client.seconds_per_output_token)
+            self._client.output_tokens_sent += 1
+            yield token
+
+    def __enter__(self):
+        self.text_stream = self._iter()
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _StubMessages:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, **kwargs):
+        first_token_delay, reply = self._client._prepare(kwargs)
+        tokens = split_tokens(reply)
+        time.sleep(first_token_delay + self._client.seconds_per_output_token * len(tokens))
+        self._client.output_tokens_sent += len(tokens)
+        return SimpleNamespace(
+            content=[SimpleNamespace(text=reply)],
+            usage=SimpleNamespace(output_tokens=len(tokens)),
+        )
+
+    def stream(self, **kwargs):
+        first_token_delay, reply = self._client._prepare(kwargs)
+        return _StubStream(self._client, split_tokens(reply), first_token_delay)
+
+
+class StubClaude:
+    """
+    Deterministic fake of Anthropic() for latency measurements.
+
+    Time to first token grows with uncached input tokens. As with the API, a
+    system block marked with cache_control caches the prompt up to and
+    including that block, but only once that prefix reaches
+    min_cacheable_tokens() for the requested model; later requests sharing
+    the prefix are billed at `cached_input_factor` for it. Output tokens are
+    emitted one at a time.
+
+    Args:
+        reply_fn: Maps the user message content to the completion text
+        base_latency: Fixed network/queueing delay per request (seconds)
+        seconds_per_input_token: Prompt processing cost for uncached tokens
+        seconds_per_output_token: Generation cost per output token
+        cached_input_factor: Relative cost of cached prefix tokens
+    """
+
+    def __init__(self, reply_fn: Callable[[str], str],
+                 base_latency: float = 0.05,
+                 seconds_per_input_token: float = 0.0002,
+                 seconds_per_output_token: float = 0.004,
+                 cached_input_factor: float = 0.1):
+        self.reply_fn = reply_fn
+        self.base_latency = base_latency
+        self.seconds_per_input_token = seconds_per_input_token
+        self.seconds_per_output_token = seconds_per_output_token
+        self.cached_input_factor = cached_input_factor
+        self.messages = _StubMessages(self)
+        self.input_tokens_billed = 0.0
+        self.output_tokens_sent = 0
+        self._cache = set()
+
+    def _prepare(self, kwargs: dict) -> tuple:
+        minimum = min_cacheable_tokens(kwargs.get("model", ""))
+        input_tokens = 0.0
+        prefix, prefix_tokens, cached_tokens = (), 0, 0
+        for block in kwargs.get("system") or []:
+            text = block["text"] if isinstance(block, dict) else str(block)
+            prefix += (text,)
+            prefix_tokens += estimate_tokens(text)
+            if isinstance(block, dict) and block.get("cache_control") and prefix_tokens >= minimum:
+                if prefix in self._cache:
+                    cached_tokens = prefix_tokens
+                self._cache.add(prefix)
+        input_tokens += prefix_tokens - cached_tokens * (1 - self.cached_input_factor)
+
+        user_text: Optional[str] = None
+        for message in kwargs.get("messages", []):
+            input_tokens += estimate_tokens(message["content"])
+            user_text = message["content"]
+
+        self.input_tokens_billed += input_tokens
+        first_token_delay = self.base_latency + input_tokens * self.seconds_per_input_token
+        return first_token_delay, self.reply_fn(user_text or "")
@@ -0,0 +1,181 @@
+# circuit_breaker.py
+# Shared circuit breaker for Claude calls
+# Opens after repeated slow or failed calls so requests go straight to local fallbacks
+
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from llm_config import get_llm_config
+
+
+class CircuitOpenError(Exception):
+    """Raised when a Claude call is skipped because the breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker.
+
+    - closed: calls go through; consecutive slow or failed calls are counted
+    - open: calls are rejected immediately until `reset_timeout` has passed
+    - half_open: one probe call is let through; success closes the breaker,
+      failure (or another slow call) re-opens it
+
+    A call counts as slow when it takes longer than `slow_call_ratio` of the
+    deadline it was given, even if it eventually succeeds.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 slow_call_ratio: float = 0.8, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_ratio = slow_call_ratio
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        # Counters for health output
+        self._successes = 0
+        self._failures = 0
+        self._slow_calls = 0
+        self._rejected = 0
+        self._last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls would be rejected outright (no probe is due yet)."""
+        return self.state == self.OPEN
+
+    def _current_state(self) -> str:
+        # Caller holds the lock. An open breaker becomes half-open once the
+        # reset timeout has passed.
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Reserve permission for one call. Must be followed by record_success/record_failure."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self, duration: float = 0.0, deadline: Optional[float] = None):
+        """Record a finished call; slow successes count against the breaker."""
+        if deadline is not None and duration > deadline * self.slow_call_ratio:
+            with self._lock:
+                self._slow_calls += 1
+            self.record_failure(f"slow call ({duration:.1f}s of {deadline:.1f}s budget)")
+            return
+
+        with self._lock:
+            self._successes += 1
+            self._consecutive_failures = 0
+            self._state = self.CLOSED
+            self._probe_in_flight = False
+
+    def record_failure(self, error: Optional[str] = None):
+        """Record a failed (or slow) call."""
+        with self._lock:
+            self._failures += 1
+            self._consecutive_failures += 1
+            self._last_error = error
+            if (self._state == self.HALF_OPEN or
+                    self._consecutive_failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+            self._probe_in_flight = False
+
+    def release(self):
+        """Give back a reservation without recording an outcome (e.g. on cancellation)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def call(self, fn: Callable[..., Any], *args, deadline: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run fn through the breaker.
+
+        Raises CircuitOpenError without calling fn when the breaker is open.
+        Exceptions from fn are recorded and re-raised.
+        """
+        if not self.allow_request():
+            raise CircuitOpenError("Claude circuit is open; using local fallback")
+
+        start = self._clock()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self.record_failure(f"{type(e).__name__}: {e}")
+            raise
+        self.record_success(self._clock() - start, deadline)
+        return result
+
+    def reset(self):
+        """Force the breaker closed (used by tests and manual recovery)."""
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        """Breaker state and counters for health output."""
+        with self._lock:
+            state = self._current_state()
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = round(max(0.0, self.reset_timeout - (self._clock() - self._opened_at)), 1)
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_in_seconds": retry_in,
+                "successes": self._successes,
+                "failures": self._failures,
+                "slow_calls": self._slow_calls,
+                "rejected": self._rejected,
+                "last_error": self._last_error,
+            }
+
+
+# Shared breaker for every Claude call in the process
+_LLM_BREAKER: Optional[CircuitBreaker] = None
+_LLM_BREAKER_LOCK = threading.Lock()
+
+
+def get_llm_breaker() -> CircuitBreaker:
+    """Get the process-wide Claude breaker, creating it from LLMConfig on first use."""
+    global _LLM_BREAKER
+    with _LLM_BREAKER_LOCK:
+        if _LLM_BREAKER is None:
+            config = get_llm_config()
+            _LLM_BREAKER = CircuitBreaker(
+                failure_threshold=config.breaker_failure_threshold,
+                reset_timeout=config.breaker_reset_seconds,
+                slow_call_ratio=config.breaker_slow_call_ratio,
+            )
+        return _LLM_BREAKER
+
+
+def set_llm_breaker(breaker: CircuitBreaker):
+    """Replace the process-wide Claude breaker."""
+    global _LLM_BREAKER
+    with _LLM_BREAKER_LOCK:
+        _LLM_BREAKER = breaker
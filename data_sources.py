@@ -3,7 +3,7 @@
 # No external APIs required - works immediately!
 
 import re
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 # Comprehensive POI database for 6+ popular cities
 DESTINATIONS: Dict[str, Dict[str, List[dict]]] = {
@@ -362,6 +362,9 @@ DESTINATIONS: Dict[str, Dict[str, List[dict]]] = {
     }
 }
 
+# Bumped by register_destination/remove_destination
+_CATALOG_VERSION = 1
+
 
 def _normalize_city_name(city: str) -> str:
     """
@@ -404,26 +407,57 @@ def fetch_pois(city: str, preferences: List[str] = None) -> List[dict]:
     Returns:
         List of POI dictionaries with name, area, tags, opening hours, and URL
     """
+    dest_city = resolve_city(city)
+    if dest_city is None:
+        # Return empty list if city not found
+        return []
+
+    return DESTINATIONS[dest_city].get("pois", [])
+
+
+def resolve_city(city: str) -> Optional[str]:
+    """
+    Find the DESTINATIONS key for a user-supplied city name.
+
+    Matching is case-insensitive and punctuation-tolerant; returns None if the
+    city has no POI data.
+    """
     # Normalize the input city name
     normalized_city = _normalize_city_name(city)
 
     # Try exact match first (for backward compatibility)
-    city_data = DESTINATIONS.get(normalized_city, {})
+    if DESTINATIONS.get(normalized_city, {}).get("pois"):
+        return normalized_city
 
     # If not found, try case-insensitive search
-    if not city_data:
-        for dest_city in DESTINATIONS.keys():
-            if _normalize_city_name(dest_city) == normalized_city:
-                city_data = DESTINATIONS[dest_city]
-                break
+    for dest_city, city_data in DESTINATIONS.items():
+        if _normalize_city_name(dest_city) == normalized_city and city_data.get("pois"):
+            return dest_city
 
-    pois = city_data.get("pois", [])
+    return None
+
+
+def register_destination(city: str, pois: List[dict]):
+    """
+    Add or replace a destination's POIs at runtime.
+
+    Bumps the catalog version so cached plans for the old data are not reused.
+    """
+    global _CATALOG_VERSION
+    DESTINATIONS[city] = {"pois": list(pois)}
+    _CATALOG_VERSION += 1
+
+
+def remove_destination(city: str):
+    """Remove a destination added with register_destination (no-op if absent)."""
+    global _CATALOG_VERSION
+    if DESTINATIONS.pop(city, None) is not None:
+        _CATALOG_VERSION += 1
 
-    if not pois:
-        # Return empty list if city not found
-        return []
 
-    return pois
+def get_catalog_version() -> int:
+    """Version of the POI catalog; changes whenever destinations are added or removed."""
+    return _CATALOG_VERSION
 
 
 def get_supported_cities() -> List[str]:
@@ -2,10 +2,11 @@
 # Export itinerary to markdown and ICS calendar formats
 # Now supports day ranges for long trips
 
+import heapq
 from typing import List, Dict
 from datetime import datetime, timedelta
 from dateutil.tz import tzlocal
-from planner import Itinerary, ItineraryItem, DayRange
+from planner import Itinerary, ItineraryItem, DayRange, PeriodicDayRange
 
 
 def itinerary_to_markdown(itinerary: Itinerary) -> str:
@@ -23,28 +24,37 @@ def itinerary_to_markdown(itinerary: Itinerary) -> str:
     """
     lines = [f"# {itinerary.days}-Day Trip to {itinerary.destination}\n"]
 
-    # Organize content by day
-    days_content: Dict[int, List] = {}
-
-    # Add specific activities
+    # Organize activities by day
+    items_by_day: Dict[int, List[ItineraryItem]] = {}
     for item in sorted(itinerary.items, key=lambda x: (x.day, x.time)):
-        days_content.setdefault(item.day, []).append(item)
+        items_by_day.setdefault(item.day, []).append(item)
+
+    ranges = sorted(itinerary.day_ranges, key=lambda x: x.start_day)
 
-    # Add day ranges
-    for day_range in sorted(itinerary.day_ranges, key=lambda x: x.start_day):
-        # Mark each day in the range
-        for day in range(day_range.start_day, day_range.end_day + 1):
-            days_content.setdefault(day, []).append(day_range)
+    # Sweep over the days where something changes (activity days, range starts,
+    # the day after each range ends) instead of expanding every day of every
+    # range. Between two breakpoints the active range and the output are fixed.
+    breakpoints = set(items_by_day)
+    for day_range in ranges:
+        breakpoints.add(day_range.start_day)
+        breakpoints.add(day_range.end_day + 1)
 
-    # Render in order
+    # Active ranges, earliest start first (ties keep sorted order)
+    active: List[tuple] = []
+    next_range = 0
     current_day = 0
     current_range = None
 
-    for day in sorted(days_content.keys()):
-        content_list = days_content[day]
+    for day in sorted(breakpoints):
+        while next_range < len(ranges) and ranges[next_range].start_day <= day:
+            day_range = ranges[next_range]
+            heapq.heappush(active, (day_range.start_day, next_range, day_range))
+            next_range += 1
+        while active and active[0][2].end_day < day:
+            heapq.heappop(active)
 
-        # Check if this day is part of a range
-        range_item = next((item for item in content_list if isinstance(item, DayRange)), None)
+        activities = items_by_day.get(day, [])
+        range_item = active[0][2] if active else None
 
         if range_item:
             # This day is in a range
@@ -55,13 +65,15 @@ def itinerary_to_markdown(itinerary: Itinerary) -> str:
                 else:
                     lines.append(f"\n## Days {range_item.start_day}–{range_item.end_day}")
 
-                lines.append(f"_{range_item.description}_")
+                if isinstance(range_item, PeriodicDayRange):
+                    lines.append(f"_{range_item.summary}_")
+                else:
+                    lines.append(f"_{range_item.description}_")
 
                 # Check if there are also specific activities on these days
-                activities = [item for item in content_list if isinstance(item, ItineraryItem)]
                 if activities:
                     lines.append("\n**Optional activities:**")
-                    for item in sorted(activities, key=lambda x: x.time):
+                    for item in activities:
                         tags_str = ", ".join(item.tags) if item.tags else "attraction"
                         if item.url:
                             lines.append(f"- [{item.name}]({item.url}) _{tags_str}_")
@@ -70,31 +82,90 @@ def itinerary_to_markdown(itinerary: Itinerary) -> str:
 
                 current_range = range_item
 
-        else:
-            # Regular day with activities
-            if day != current_day:
-                activities = [item for item in content_list if isinstance(item, ItineraryItem)]
-                if activities:
-                    # Get area from first activity
-                    area = activities[0].area if activities else "Various"
-                    lines.append(f"\n## Day {day} - {area}")
+        elif activities and day != current_day:
+            # Regular day with activities; area from first activity
+            lines.append(f"\n## Day {day} - {activities[0].area}")
 
-                for item in sorted(activities, key=lambda x: x.time):
-                    # Format tags nicely
-                    tags_str = ", ".join(item.tags) if item.tags else "attraction"
+            for item in activities:
+                # Format tags nicely
+                tags_str = ", ".join(item.tags) if item.tags else "attraction"
 
-                    # Create clickable link if URL available
-                    if item.url:
-                        lines.append(f"**{item.time}** - [{item.name}]({item.url}) _{tags_str}_")
-                    else:
-                        lines.append(f"**{item.time}** - {item.name} _{tags_str}_")
+                # Create clickable link if URL available
+                if item.url:
+                    lines.append(f"**{item.time}** - [{item.name}]({item.url}) _{tags_str}_")
+                else:
+                    lines.append(f"**{item.time}** - {item.name} _{tags_str}_")
 
-                current_day = day
-                current_range = None
+            current_day = day
+            current_range = None
 
     return "\n".join(lines)
 
 
+def _day_range_events(day_range: DayRange, destination: str, start_date: datetime) -> List[str]:
+    """
+    ICS lines for a day range as all-day event(s).
+
+    A PeriodicDayRange becomes one recurring event (RRULE) for its full
+    blocks plus a plain event for a shorter final block, so the calendar
+    stays small however long the trip is.
+    """
+    def format_ics_date(dt: datetime) -> str:
+        return dt.strftime("%Y%m%d")
+
+    def event(first_day: int, last_day: int, summary: str, description: str,
+              uid: str, rrule: str = None) -> List[str]:
+        # ICS all-day events: end date is exclusive, so add 1 extra day
+        lines = [
+            "BEGIN:VEVENT",
+            f"DTSTART;VALUE=DATE:{format_ics_date(start_date + timedelta(days=first_day - 1))}",
+            f"DTEND;VALUE=DATE:{format_ics_date(start_date + timedelta(days=last_day))}",
+        ]
+        if rrule:
+            lines.append(f"RRULE:{rrule}")
+        lines.extend([
+            f"SUMMARY:{summary}",
+            f"DESCRIPTION:{description}",
+            f"LOCATION:{destination}",
+            f"UID:{destination}-{uid}@tripplanner",
+            "STATUS:CONFIRMED",
+            "TRANSP:TRANSPARENT",  # Show as "free" time
+            "END:VEVENT",
+        ])
+        return lines
+
+    def summary_for(block: DayRange) -> str:
+        if block.start_day != block.end_day:
+            return f"{block.description} ({block.num_days} days)"
+        return f"{block.description}"
+
+    if not isinstance(day_range, PeriodicDayRange):
+        return event(day_range.start_day, day_range.end_day, summary_for(day_range),
+                     day_range.description, f"range{day_range.start_day}-{day_range.end_day}")
+
+    period = day_range.period_days
+    full_blocks = day_range.num_days // period
+    lines: List[str] = []
+    if full_blocks:
+        if period % 7 == 0:
+            rrule = f"FREQ=WEEKLY;INTERVAL={period // 7};COUNT={full_blocks}"
+        else:
+            rrule = f"FREQ=DAILY;INTERVAL={period};COUNT={full_blocks}"
+        first_end = day_range.start_day + period - 1
+        lines.extend(event(
+            day_range.start_day, first_end,
+            f"{day_range.description} ({period} days)", day_range.summary,
+            f"range{day_range.start_day}-{day_range.end_day}-every{period}", rrule
+        ))
+
+    if day_range.num_days % period:
+        # Shorter final block
+        block = day_range.last_block
+        lines.extend(event(block.start_day, block.end_day, summary_for(block),
+                           block.description, f"range{block.start_day}-{block.end_day}"))
+    return lines
+
+
 def itinerary_to_ics(itinerary: Itinerary, start_date: datetime = None, output_dir: str = None) -> str:
     """
     Export itinerary as ICS calendar file that can be imported to Google Calendar,
@@ -125,10 +196,6 @@ def itinerary_to_ics(itinerary: Itinerary, start_date: datetime = None, output_d
         """Format datetime for ICS file."""
         return dt.strftime("%Y%m%dT%H%M%S")
 
-    def format_ics_date(dt: datetime) -> str:
-        """Format date for ICS all-day events."""
-        return dt.strftime("%Y%m%d")
-
     # Build ICS content
     ics_lines = [
         "BEGIN:VCALENDAR",
@@ -140,11 +207,10 @@ def itinerary_to_ics(itinerary: Itinerary, start_date: datetime = None, output_d
         "X-WR-TIMEZONE:UTC",
     ]
 
-    # Add specific activities as timed events
-    for day_num in range(1, itinerary.days + 1):
-        day_items = days_dict.get(day_num, [])
-        if not day_items:
-            continue
+    # Add specific activities as timed events, visiting only the days that
+    # have some rather than every day of a long trip
+    for day_num in sorted(day for day in days_dict if 1 <= day <= itinerary.days):
+        day_items = days_dict[day_num]
 
         # Sort items by time
         day_items = sorted(day_items, key=lambda x: x.time)
@@ -158,7 +224,7 @@ def itinerary_to_ics(itinerary: Itinerary, start_date: datetime = None, output_d
             event_start = event_date.replace(hour=hour, minute=minute)
 
             # Event lasts 2 hours (adjustable)
-            event_end = event_start + timedelta(hours=2)
+            event_end = event_start + timedelta(minutes=item.duration_minutes)
 
             # Build description with tags and area
             description = f"Area: {item.area}"
@@ -182,29 +248,7 @@ def itinerary_to_ics(itinerary: Itinerary, start_date: datetime = None, output_d
 
     # Add day ranges as all-day events
     for day_range in itinerary.day_ranges:
-        # Calculate date range
-        range_start_date = start_date + timedelta(days=day_range.start_day - 1)
-        # ICS all-day events: end date is exclusive, so add 1 extra day
-        range_end_date = start_date + timedelta(days=day_range.end_day)
-
-        # Create all-day event for the range
-        summary = f"{day_range.description}"
-        if day_range.start_day != day_range.end_day:
-            num_days = day_range.end_day - day_range.start_day + 1
-            summary = f"{day_range.description} ({num_days} days)"
-
-        ics_lines.extend([
-            "BEGIN:VEVENT",
-            f"DTSTART;VALUE=DATE:{format_ics_date(range_start_date)}",
-            f"DTEND;VALUE=DATE:{format_ics_date(range_end_date)}",
-            f"SUMMARY:{summary}",
-            f"DESCRIPTION:{day_range.description}",
-            f"LOCATION:{itinerary.destination}",
-            f"UID:{itinerary.destination}-range{day_range.start_day}-{day_range.end_day}@tripplanner",
-            "STATUS:CONFIRMED",
-            "TRANSP:TRANSPARENT",  # Show as "free" time
-            "END:VEVENT",
-        ])
+        ics_lines.extend(_day_range_events(day_range, itinerary.destination, start_date))
 
     ics_lines.append("END:VCALENDAR")
 
@@ -254,10 +298,6 @@ def itinerary_to_ics_string(itinerary: Itinerary, start_date: datetime = None) -
         """Format datetime for ICS file."""
         return dt.strftime("%Y%m%dT%H%M%S")
 
-    def format_ics_date(dt: datetime) -> str:
-        """Format date for ICS all-day events."""
-        return dt.strftime("%Y%m%d")
-
     # Build ICS content
     ics_lines = [
         "BEGIN:VCALENDAR",
@@ -269,11 +309,10 @@ def itinerary_to_ics_string(itinerary: Itinerary, start_date: datetime = None) -
         "X-WR-TIMEZONE:UTC",
     ]
 
-    # Add specific activities as timed events
-    for day_num in range(1, itinerary.days + 1):
-        day_items = days_dict.get(day_num, [])
-        if not day_items:
-            continue
+    # Add specific activities as timed events, visiting only the days that
+    # have some rather than every day of a long trip
+    for day_num in sorted(day for day in days_dict if 1 <= day <= itinerary.days):
+        day_items = days_dict[day_num]
 
         # Sort items by time
         day_items = sorted(day_items, key=lambda x: x.time)
@@ -287,7 +326,7 @@ def itinerary_to_ics_string(itinerary: Itinerary, start_date: datetime = None) -
             event_start = event_date.replace(hour=hour, minute=minute)
 
             # Event lasts 2 hours (adjustable)
-            event_end = event_start + timedelta(hours=2)
+            event_end = event_start + timedelta(minutes=item.duration_minutes)
 
             # Build description with tags and area
             description = f"Area: {item.area}"
@@ -311,29 +350,7 @@ def itinerary_to_ics_string(itinerary: Itinerary, start_date: datetime = None) -
 
     # Add day ranges as all-day events
     for day_range in itinerary.day_ranges:
-        # Calculate date range
-        range_start_date = start_date + timedelta(days=day_range.start_day - 1)
-        # ICS all-day events: end date is exclusive, so add 1 extra day
-        range_end_date = start_date + timedelta(days=day_range.end_day)
-
-        # Create all-day event for the range
-        summary = f"{day_range.description}"
-        if day_range.start_day != day_range.end_day:
-            num_days = day_range.end_day - day_range.start_day + 1
-            summary = f"{day_range.description} ({num_days} days)"
-
-        ics_lines.extend([
-            "BEGIN:VEVENT",
-            f"DTSTART;VALUE=DATE:{format_ics_date(range_start_date)}",
-            f"DTEND;VALUE=DATE:{format_ics_date(range_end_date)}",
-            f"SUMMARY:{summary}",
-            f"DESCRIPTION:{day_range.description}",
-            f"LOCATION:{itinerary.destination}",
-            f"UID:{itinerary.destination}-range{day_range.start_day}-{day_range.end_day}@tripplanner",
-            "STATUS:CONFIRMED",
-            "TRANSP:TRANSPARENT",  # Show as "free" time
-            "END:VEVENT",
-        ])
+        ics_lines.extend(_day_range_events(day_range, itinerary.destination, start_date))
 
     ics_lines.append("END:VCALENDAR")
 
@@ -0,0 +1,204 @@
+# group.py
+# Group trips: one shared itinerary for travellers with their own preferences
+# Weighted aggregate preferences, per-person must-sees and per-person coverage
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+
+from data_sources import fetch_pois
+from intent import TripIntent
+from planner import Itinerary, ItineraryItem, _next_starts, _slot_duration, plan_with_ranking
+from planner_config import PlannerConfig, get_config
+
+
+@dataclass
+class Traveller:
+    """
+    One member of a group.
+
+    weight is how much their preferences count relative to the others';
+    must_see names catalog POIs they want in the plan whatever the group's
+    preferences.
+    """
+    name: str
+    preferences: List[str]
+    weight: float = 1.0
+    must_see: List[str] = field(default_factory=list)
+
+
+@dataclass
+class TravellerCoverage:
+    """
+    How well the shared itinerary suits one traveller.
+
+    Attributes:
+        name: Traveller name
+        matched_items: Activities matching at least one of their preferences
+        match_share: matched_items over all activities (0-1)
+        preferences_covered: Their preferences with at least one activity
+        preferences_missed: Their preferences with none
+        must_see_planned: Their must-sees in the itinerary
+        must_see_missed: Their must-sees that couldn't be planned (unknown
+            name, closed at every slot, or more must-sees than slots)
+    """
+    name: str
+    matched_items: int
+    match_share: float
+    preferences_covered: List[str]
+    preferences_missed: List[str]
+    must_see_planned: List[str]
+    must_see_missed: List[str]
+
+
+@dataclass
+class GroupPlan:
+    """Shared itinerary, the aggregate preference weights it was ranked by, and coverage per traveller."""
+    itinerary: Itinerary
+    preference_weights: Dict[str, float]
+    coverage: List[TravellerCoverage]
+
+
+def aggregate_preferences(travellers: Sequence[Traveller]) -> Dict[str, float]:
+    """
+    Group preference vector, heaviest first, weights summing to 1.
+
+    Each traveller's weight is shared equally between their preferences, so
+    listing more interests doesn't buy a bigger say. One pass over the
+    travellers' preferences.
+    """
+    weights: Dict[str, float] = {}
+    total = 0.0
+    for traveller in travellers:
+        if traveller.weight < 0:
+            raise ValueError(f"Traveller {traveller.name!r} has a negative weight")
+        prefs = set(traveller.preferences)
+        if not prefs:
+            continue
+        total += traveller.weight
+        share = traveller.weight / len(prefs)
+        for pref in prefs:
+            weights[pref] = weights.get(pref, 0.0) + share
+    if not total:
+        return {}
+    return {pref: weight / total
+            for pref, weight in sorted(weights.items(), key=lambda kv: (-kv[1], kv[0]))}
+
+
+def rank_for_group(pois: List[dict], preference_weights: Dict[str, float],
+                   must_see: Sequence[str] = ()) -> List[dict]:
+    """
+    Sort POIs by must-see, then weighted preference match, then opening window length.
+
+    With one traveller this orders POIs exactly as the standard planner does.
+    """
+    must = {name.lower() for name in must_see}
+
+    def score_poi(poi: dict) -> tuple:
+        match = sum(preference_weights.get(tag, 0.0) for tag in set(poi.get("tags", [])))
+        open_start, open_end = poi.get("open", (9, 18))
+        return (poi.get("name", "").lower() in must, match, open_end - open_start)
+
+    # Stable sort: equal scores keep catalog order
+    return sorted(pois, key=score_poi, reverse=True)
+
+
+def _place_must_sees(items: List[ItineraryItem], ranked_pois: List[dict], must_see: set,
+                     preference_weights: Dict[str, float], config: PlannerConfig):
+    """
+    Swap must-sees the allocator left out into the itinerary, in place.
+
+    Each takes the slot of the least preferred planned activity that isn't a
+    must-see and that it fits (see planner._slot_duration: open at the
+    slot's hour, or in timed mode open for its whole visit before the day's
+    next activity).
+    """
+    planned = {item.name.lower() for item in items}
+    missing = [poi for poi in ranked_pois
+               if poi.get("name", "").lower() in must_see and poi.get("name", "").lower() not in planned]
+    if not missing:
+        return
+
+    def match(item: ItineraryItem) -> float:
+        return sum(preference_weights.get(tag, 0.0) for tag in set(item.tags))
+
+    # Least preferred first; later days give way before earlier ones
+    candidates = sorted((i for i, item in enumerate(items) if item.name.lower() not in must_see),
+                        key=lambda i: (match(items[i]), -items[i].day))
+    next_starts = _next_starts(items)
+    for poi in missing:
+        for n, i in enumerate(candidates):
+            item = items[i]
+            duration = _slot_duration(poi, item, config, next_starts[i])
+            if duration is not None:
+                items[i] = ItineraryItem(day=item.day, time=item.time, name=poi.get("name", "Unknown"),
+                                         area=poi.get("area", "Unknown"), tags=poi.get("tags", []),
+                                         url=poi.get("url", ""), duration_minutes=duration)
+                del candidates[n]
+                break
+
+
+def group_coverage(itinerary: Itinerary, travellers: Sequence[Traveller]) -> List[TravellerCoverage]:
+    """
+    Coverage of each traveller by a shared itinerary.
+
+    Activities are grouped by tag set first, so each traveller costs one
+    pass over the distinct tag sets rather than over every activity.
+    """
+    tag_sets = Counter(frozenset(item.tags) for item in itinerary.items)
+    all_tags = set().union(*tag_sets) if tag_sets else set()
+    names = {item.name.lower() for item in itinerary.items}
+    total = len(itinerary.items)
+
+    coverage = []
+    for traveller in travellers:
+        prefs = set(traveller.preferences)
+        matched = sum(count for tags, count in tag_sets.items() if tags & prefs)
+        ordered = list(dict.fromkeys(traveller.preferences))
+        coverage.append(TravellerCoverage(
+            name=traveller.name,
+            matched_items=matched,
+            match_share=round(matched / total, 6) if total else 0.0,
+            preferences_covered=[pref for pref in ordered if pref in all_tags],
+            preferences_missed=[pref for pref in ordered if pref not in all_tags],
+            must_see_planned=[name for name in traveller.must_see if name.lower() in names],
+            must_see_missed=[name for name in traveller.must_see if name.lower() not in names],
+        ))
+    return coverage
+
+
+def plan_group(destination: str, days: int, travellers: Sequence[Traveller],
+               config: PlannerConfig = None) -> GroupPlan:
+    """
+    One itinerary for a group, from the built-in catalog.
+
+    POIs are ranked against the group's aggregate preferences with every
+    traveller's must-sees first, then planned like any other trip. Must-sees
+    the allocator still leaves out (e.g. in an area no day visits) replace
+    the group's least preferred activities where their opening hours allow.
+
+    Args:
+        destination: Catalog city
+        days: Trip length
+        travellers: The group; at least one
+        config: Optional planner configuration (uses default if not provided)
+
+    Returns:
+        GroupPlan with the shared itinerary and per-traveller coverage
+    """
+    if not travellers:
+        raise ValueError("A group needs at least one traveller")
+    if config is None:
+        config = get_config()
+
+    preference_weights = aggregate_preferences(travellers)
+    must_see = [name for traveller in travellers for name in traveller.must_see]
+    ranked = rank_for_group(fetch_pois(destination), preference_weights, must_see)
+
+    intent = TripIntent(destination=destination, days=days, preferences=list(preference_weights))
+    itinerary = plan_with_ranking(intent, ranked, config)
+    if ranked:
+        _place_must_sees(itinerary.items, ranked, {name.lower() for name in must_see}, preference_weights,
+                         config)
+    return GroupPlan(itinerary=itinerary, preference_weights=preference_weights,
+                     coverage=group_coverage(itinerary, travellers))
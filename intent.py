@@ -3,11 +3,19 @@
 # Extracts destination, duration, and preferences from user messages
 
 import os
+import re
+import time
+import asyncio
 from dataclasses import dataclass
 from typing import List, Optional
-from anthropic import Anthropic
+from anthropic import Anthropic, AsyncAnthropic
 from dotenv import load_dotenv
 
+from llm_config import get_llm_config
+from data_sources import get_supported_cities
+from circuit_breaker import get_llm_breaker
+from preference_classifier import get_preference_classifier
+
 # Load environment variables
 load_dotenv()
 
@@ -19,6 +27,26 @@ class TripIntent:
     preferences: List[str]
 
 
+@dataclass
+class TripLeg:
+    """One city of a multi-city trip; days is None when the request didn't say."""
+    destination: str
+    days: Optional[int] = None
+
+
+@dataclass
+class MultiCityIntent:
+    """
+    A trip through several cities in order, e.g. "Tokyo 4 days then Singapore 3".
+
+    days is the whole trip's length when the request gave one ("a 10-day
+    trip: ..."), used for legs without their own day count.
+    """
+    legs: List[TripLeg]
+    days: Optional[int]
+    preferences: List[str]
+
+
 # Preference keywords we support
 PREFERENCE_KEYWORDS = [
     "food", "culture", "museum", "art", "architecture", "nature", "outdoors",
@@ -27,31 +55,225 @@ PREFERENCE_KEYWORDS = [
 ]
 
 
+# Common city abbreviations and variants, by lowercase spelling
+_CITY_ALIASES = {
+    "sf": "San Francisco",
+    "s.f.": "San Francisco",
+    "san fran": "San Francisco",
+    "nyc": "New York",
+    "new york city": "New York",
+    "la": "Los Angeles",
+    "l.a.": "Los Angeles",
+    "vegas": "Las Vegas",
+    "hk": "Hong Kong",
+    "h.k.": "Hong Kong",
+    "ho chi minh": "Ho Chi Minh City",
+    "saigon": "Ho Chi Minh City",
+    "cdmx": "Mexico City",
+    "rio": "Rio de Janeiro",
+}
+
+
 def _normalize_destination(city: Optional[str]) -> Optional[str]:
     """Normalize common city abbreviations and variants to canonical names."""
     if not city:
         return city
-    mapping = {
-        "sf": "San Francisco",
-        "s.f.": "San Francisco",
-        "san fran": "San Francisco",
-        "nyc": "New York",
-        "new york city": "New York",
-        "la": "Los Angeles",
-        "l.a.": "Los Angeles",
-        "vegas": "Las Vegas",
-        "hk": "Hong Kong",
-        "h.k.": "Hong Kong",
-        "ho chi minh": "Ho Chi Minh City",
-        "saigon": "Ho Chi Minh City",
-        "cdmx": "Mexico City",
-        "rio": "Rio de Janeiro",
-    }
     key = city.strip().lower()
-    return mapping.get(key, city)
+    return _CITY_ALIASES.get(key, city)
+
+
+# Static instructions and few-shot examples for intent parsing. Sent as a
+# system block marked cacheable, so each request only adds the short user
+# message on top of a prefix Claude has already seen.
+INTENT_SYSTEM_PROMPT = f"""Parse trip planning requests and extract structured information.
+
+Extract:
+1. Destination city (just the city name, properly capitalized)
+2. Number of days for the trip
+3. Preferences/interests from this list: {', '.join(PREFERENCE_KEYWORDS)}
+
+Respond in this exact format and nothing else:
+DESTINATION: [city name or NONE]
+DAYS: [number or NONE]
+PREFERENCES: [comma-separated list or NONE]
+
+Examples:
+Request: "Plan me a 3-day trip to Tokyo for food and culture"
+DESTINATION: Tokyo
+DAYS: 3
+PREFERENCES: food, culture
+
+Request: "I want to visit Barcelona for 2 days, focus on architecture"
+DESTINATION: Barcelona
+DAYS: 2
+PREFERENCES: architecture
+
+Request: "Family trip to Singapore, kid-friendly"
+DESTINATION: Singapore
+DAYS: NONE
+PREFERENCES: family, kids"""
+
+# Used when preferences come from the local classifier: Claude only has to
+# produce the two fields we can't infer reliably without it.
+INTENT_SYSTEM_PROMPT_NO_PREFERENCES = """Parse trip planning requests and extract structured information.
+
+Extract:
+1. Destination city (just the city name, properly capitalized)
+2. Number of days for the trip
+
+Respond in this exact format and nothing else:
+DESTINATION: [city name or NONE]
+DAYS: [number or NONE]
+
+Examples:
+Request: "Plan me a 3-day trip to Tokyo for food and culture"
+DESTINATION: Tokyo
+DAYS: 3
+
+Request: "Family trip to Singapore, kid-friendly"
+DESTINATION: Singapore
+DAYS: NONE"""
+
+# Line prefixes Claude is asked to produce, in order
+INTENT_FIELDS = ("DESTINATION", "DAYS", "PREFERENCES")
+INTENT_FIELDS_NO_PREFERENCES = ("DESTINATION", "DAYS")
+
+
+def _intent_request_kwargs(text: str, timeout: float, include_preferences: bool = True) -> dict:
+    """Build the messages.stream() arguments shared by the sync and async parsers."""
+    system_prompt = INTENT_SYSTEM_PROMPT if include_preferences else INTENT_SYSTEM_PROMPT_NO_PREFERENCES
+    # No cache_control: the prompt is a few hundred tokens, well under Haiku's
+    # 2048-token minimum cacheable prefix, so the API would ignore it.
+    return {
+        "model": "claude-3-haiku-20240307",
+        "timeout": timeout,
+        "max_tokens": 300,
+        "system": [{"type": "text", "text": system_prompt}],
+        "messages": [{"role": "user", "content": f'Request: "{text}"'}],
+    }
+
+
+def _classify_preferences(text: str) -> Optional[List[str]]:
+    """Preferences from the local classifier, or None if it isn't available."""
+    classifier = get_preference_classifier()
+    if classifier is None:
+        return None
+    return classifier.predict(text)
+
+
+def _parse_intent_fallback(text: str) -> TripIntent:
+    """
+    Intent for when Claude can't be asked (no key, breaker open, API error).
+
+    Destination and days come from the rule parser. Preferences come from the
+    local classifier when its weights are loaded, since it beats keyword
+    matching by a wide margin on the intent corpus (72.5% vs 36.7% exact);
+    otherwise the rule parser's keyword matches are kept.
+    """
+    intent = _parse_intent_simple(text)
+    preferences = _classify_preferences(text)
+    if preferences is not None:
+        intent.preferences = preferences
+    return intent
+
+
+class _IntentStreamParser:
+    """
+    Incrementally collects DESTINATION/DAYS/PREFERENCES lines from streamed text.
+
+    feed() returns True once every field has a complete line, so callers can
+    stop reading the stream without waiting for the rest of the completion.
+    """
+
+    def __init__(self, fields: tuple = INTENT_FIELDS):
+        self.fields = fields
+        self._buffer = ""
+        self._lines: dict = {}
+
+    @property
+    def complete(self) -> bool:
+        return len(self._lines) == len(self.fields)
+
+    def feed(self, chunk: str) -> bool:
+        """Add streamed text; returns True when all fields have been seen."""
+        self._buffer += chunk
+        while "\n" in self._buffer and not self.complete:
+            line, self._buffer = self._buffer.split("\n", 1)
+            self._take_line(line)
+        return self.complete
+
+    def finish(self) -> TripIntent:
+        """Flush any trailing partial line and build the TripIntent."""
+        if self._buffer and not self.complete:
+            self._take_line(self._buffer)
+        self._buffer = ""
+        return _parse_intent_response("\n".join(self._lines.values()))
+
+    def _take_line(self, line: str):
+        line = line.strip()
+        for field in self.fields:
+            if line.startswith(f"{field}:") and field not in self._lines:
+                self._lines[field] = line
+                break
+
+
+def _stream_intent(client: Anthropic, text: str, deadline: float,
+                   include_preferences: bool = True) -> TripIntent:
+    """Stream Claude's reply and stop as soon as all requested fields are parsed."""
+    parser = _IntentStreamParser(INTENT_FIELDS if include_preferences else INTENT_FIELDS_NO_PREFERENCES)
+    start = time.monotonic()
+    with client.messages.stream(**_intent_request_kwargs(text, deadline, include_preferences)) as stream:
+        for chunk in stream.text_stream:
+            if parser.feed(chunk):
+                break  # Leaving the block closes the connection early
+            if time.monotonic() - start > deadline:
+                raise TimeoutError(f"intent parsing exceeded {deadline:.1f}s")
+    return parser.finish()
+
+
+async def _stream_intent_async(client: AsyncAnthropic, text: str, deadline: float,
+                               include_preferences: bool = True) -> TripIntent:
+    """Async counterpart of _stream_intent (the caller enforces the deadline)."""
+    parser = _IntentStreamParser(INTENT_FIELDS if include_preferences else INTENT_FIELDS_NO_PREFERENCES)
+    async with client.messages.stream(**_intent_request_kwargs(text, deadline, include_preferences)) as stream:
+        async for chunk in stream.text_stream:
+            if parser.feed(chunk):
+                break
+    return parser.finish()
+
+
+def _parse_intent_response(response_text: str) -> TripIntent:
+    """Turn Claude's DESTINATION/DAYS/PREFERENCES lines into a TripIntent."""
+    destination = None
+    days = None
+    preferences = []
+
+    for line in response_text.split('\n'):
+        line = line.strip()
+        if line.startswith('DESTINATION:'):
+            dest = line.split(':', 1)[1].strip()
+            if dest != 'NONE':
+                destination = dest
+        elif line.startswith('DAYS:'):
+            days_str = line.split(':', 1)[1].strip()
+            if days_str != 'NONE':
+                try:
+                    days = int(days_str)
+                except ValueError:
+                    pass
+        elif line.startswith('PREFERENCES:'):
+            prefs_str = line.split(':', 1)[1].strip()
+            if prefs_str != 'NONE':
+                preferences = [p.strip() for p in prefs_str.split(',')]
+
+    # Normalize destination (e.g., 'SF' -> 'San Francisco')
+    destination = _normalize_destination(destination)
+
+    return TripIntent(destination=destination, days=days, preferences=preferences)
 
 
-def parse_intent(text: str) -> TripIntent:
+def parse_intent(text: str, client: Optional[Anthropic] = None,
+                 use_local_preferences: bool = False) -> TripIntent:
     """
     Parse user's natural language input using Claude AI.
 
@@ -60,93 +282,124 @@ def parse_intent(text: str) -> TripIntent:
     - days: Trip duration in days
     - preferences: List of interest categories
 
+    The reply is streamed and reading stops as soon as the three expected
+    lines have arrived, so trailing tokens never delay the result. The call
+    is bounded by LLMConfig.intent_timeout_seconds and goes through the
+    shared circuit breaker; while the breaker is open we use the rule parser
+    without contacting Claude.
+
+    With use_local_preferences=True and the local preference classifier
+    available, preferences are inferred in-process and Claude is only asked
+    for destination and days. That saves output tokens but is opt-in: the
+    classifier misses negation ("not interested in museums") and phrasings
+    outside its training corpus, and only gets 72.5% of the intent corpus
+    exactly right. When Claude can't be reached, the classifier still
+    supplies preferences since keyword matching does worse.
+
     Args:
         text: User's natural language request
+        client: Optional pre-built Anthropic client (mainly for tests)
+        use_local_preferences: Set True to take preferences from the local
+            classifier and ask Claude for destination and days only
 
     Returns:
         TripIntent with parsed information
     """
     api_key = os.getenv("ANTHROPIC_API_KEY")
 
-    if not api_key:
-        # Fallback to simple rule-based parsing if no API key
-        return _parse_intent_simple(text)
+    if client is None and not api_key:
+        # Fallback to rule-based parsing if no API key
+        return _parse_intent_fallback(text)
 
+    config = get_llm_config()
+    breaker = get_llm_breaker()
+    if not breaker.allow_request():
+        return _parse_intent_fallback(text)
+
+    if client is None:
+        client = Anthropic(api_key=api_key, max_retries=config.max_retries)
+
+    local_preferences = _classify_preferences(text) if use_local_preferences else None
+
+    start = time.monotonic()
     try:
-        client = Anthropic(api_key=api_key)
+        intent = _stream_intent(client, text, config.intent_timeout_seconds,
+                                include_preferences=local_preferences is None)
+        breaker.record_success(time.monotonic() - start, config.intent_timeout_seconds)
+        if local_preferences is not None:
+            intent.preferences = local_preferences
+        return intent
 
-        prompt = f"""Parse this trip planning request and extract structured information.
+    except Exception as e:
+        breaker.record_failure(f"{type(e).__name__}: {e}")
+        print(f"Error using Claude for intent parsing: {e}")
+        return _parse_intent_fallback(text)
 
-User request: "{text}"
 
-Extract:
-1. Destination city (just the city name, properly capitalized)
-2. Number of days for the trip
-3. Preferences/interests from this list: {', '.join(PREFERENCE_KEYWORDS)}
+async def parse_intent_async(text: str, timeout: Optional[float] = None,
+                             client: Optional[AsyncAnthropic] = None,
+                             use_local_preferences: bool = False) -> TripIntent:
+    """
+    Async variant of parse_intent for event-loop callers (the uAgents handler).
 
-Respond in this exact format:
-DESTINATION: [city name or NONE]
-DAYS: [number or NONE]
-PREFERENCES: [comma-separated list or NONE]
+    The Claude round trip is awaited instead of blocking the loop, so other
+    chats keep being served while this one waits on the API. The call is
+    bounded by `timeout`; on timeout or API error we fall back to the rule
+    parser. Cancelling the awaiting task cancels the in-flight request.
+    Shares the circuit breaker and the use_local_preferences behaviour with
+    parse_intent.
 
-Examples:
-Request: "Plan me a 3-day trip to Tokyo for food and culture"
-DESTINATION: Tokyo
-DAYS: 3
-PREFERENCES: food, culture
+    Args:
+        text: User's natural language request
+        timeout: Seconds to wait for Claude before falling back
+            (defaults to LLMConfig.intent_timeout_seconds)
+        client: Optional pre-built AsyncAnthropic client (mainly for tests)
+        use_local_preferences: Set True to take preferences from the local
+            classifier and ask Claude for destination and days only
 
-Request: "I want to visit Barcelona for 2 days, focus on architecture"
-DESTINATION: Barcelona
-DAYS: 2
-PREFERENCES: architecture
+    Returns:
+        TripIntent with parsed information
+    """
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if client is None and not api_key:
+        return _parse_intent_fallback(text)
 
-Request: "Family trip to Singapore, kid-friendly"
-DESTINATION: Singapore
-DAYS: NONE
-PREFERENCES: family, kids
+    config = get_llm_config()
+    if timeout is None:
+        timeout = config.intent_timeout_seconds
 
-Now parse the user's request."""
+    breaker = get_llm_breaker()
+    if not breaker.allow_request():
+        return _parse_intent_fallback(text)
 
-        message = client.messages.create(
-            model="claude-3-haiku-20240307",
-            max_tokens=300,
-            messages=[{"role": "user", "content": prompt}]
-        )
+    if client is None:
+        client = AsyncAnthropic(api_key=api_key, max_retries=config.max_retries)
 
-        # Parse Claude's response
-        response_text = message.content[0].text
-
-        destination = None
-        days = None
-        preferences = []
-
-        for line in response_text.split('\n'):
-            line = line.strip()
-            if line.startswith('DESTINATION:'):
-                dest = line.split(':', 1)[1].strip()
-                if dest != 'NONE':
-                    destination = dest
-            elif line.startswith('DAYS:'):
-                days_str = line.split(':', 1)[1].strip()
-                if days_str != 'NONE':
-                    try:
-                        days = int(days_str)
-                    except ValueError:
-                        pass
-            elif line.startswith('PREFERENCES:'):
-                prefs_str = line.split(':', 1)[1].strip()
-                if prefs_str != 'NONE':
-                    preferences = [p.strip() for p in prefs_str.split(',')]
-
-        # Normalize destination (e.g., 'SF' -> 'San Francisco')
-        destination = _normalize_destination(destination)
-
-        return TripIntent(destination=destination, days=days, preferences=preferences)
+    local_preferences = _classify_preferences(text) if use_local_preferences else None
 
+    start = time.monotonic()
+    try:
+        intent = await asyncio.wait_for(
+            _stream_intent_async(client, text, timeout, include_preferences=local_preferences is None),
+            timeout=timeout
+        )
+        breaker.record_success(time.monotonic() - start, timeout)
+        if local_preferences is not None:
+            intent.preferences = local_preferences
+        return intent
+
+    except asyncio.TimeoutError:
+        breaker.record_failure(f"timed out after {timeout:.1f}s")
+        print(f"Claude intent parsing timed out after {timeout:.1f}s")
+        return _parse_intent_fallback(text)
+    except asyncio.CancelledError:
+        # Not the API's fault; just give the probe slot back
+        breaker.release()
+        raise
     except Exception as e:
+        breaker.record_failure(f"{type(e).__name__}: {e}")
         print(f"Error using Claude for intent parsing: {e}")
-        # Fallback to simple parsing
-        return _parse_intent_simple(text)
+        return _parse_intent_fallback(text)
 
 
 def _parse_intent_simple(text: str) -> TripIntent:
@@ -234,3 +487,135 @@ def _parse_intent_simple(text: str) -> TripIntent:
     destination = _normalize_destination(destination)
 
     return TripIntent(destination=destination, days=days, preferences=preferences)
+
+
+# Connectors between the cities of a multi-city request
+_LEG_SEPARATOR_RE = re.compile(
+    r'\s*(\b(?:and\s+then|then|followed\s+by|after\s+that|and)\b|->|→|[;,+])\s*', re.IGNORECASE)
+# Connectors that always mean "next city"; the rest ("and", commas) also join
+# a city to things that aren't cities ("New York, Broadway and Central Park")
+_LEG_CONNECTOR_RE = re.compile(r'^(?:and\s+then|then|followed\s+by|after\s+that|->|→)$', re.IGNORECASE)
+# Length of the whole trip: "10-day trip", "10 days total", "10 days in total"
+_TOTAL_DAYS_RE = re.compile(r'\b(\d+)\s*-?\s*days?\s+(?:trip|total|in\s+total)\b', re.IGNORECASE)
+_LEG_DAYS_RE = re.compile(r'\b(\d+)\s*-?\s*(?:days?|nights?)\b', re.IGNORECASE)
+# "... for 5 days" closing the request: the whole trip when no other leg has a count
+_TRAILING_DAYS_RE = re.compile(r'\bfor\s+(\d+)\s*-?\s*(?:days?|nights?)\s*[.!?]*\s*$', re.IGNORECASE)
+_BARE_NUMBER_RE = re.compile(r'\b(\d+)\b')
+_LEG_CITY_RE = re.compile(r"\b(?:to|in)\s+([A-Z][\w'-]*(?:\s+[A-Z][\w'-]*)*)")
+_CAPITALIZED_RE = re.compile(r"[A-Z][\w'-]*(?:\s+[A-Z][\w'-]*)*")
+# Capitalized words that start sentences rather than name cities
+_NOT_CITY_WORDS = {
+    "plan", "i", "a", "an", "the", "me", "my", "we", "our", "trip", "day", "days", "week",
+    "then", "and", "visit", "spend", "go", "fly", "head", "start", "first", "next", "finally",
+}
+
+
+def _leg_city(segment: str) -> Optional[str]:
+    """
+    City named in one segment of a multi-city request, or None.
+
+    Catalog cities are matched anywhere, in any case. Other cities need a
+    capital letter and either "to"/"in" before them, or to open a segment
+    that is only the city or also gives a day count ("Kyoto 3 days"), so
+    that "I love Sushi" isn't taken for a leg.
+    """
+    best = None
+    for city in get_supported_cities():
+        match = re.search(r'\b' + re.escape(city) + r'\b', segment, re.IGNORECASE)
+        if match and (best is None or match.start() < best[0]):
+            best = (match.start(), city)
+    if best:
+        return best[1]
+
+    match = _LEG_CITY_RE.search(segment)
+    if match:
+        return _normalize_destination(match.group(1))
+
+    bare = _CAPITALIZED_RE.fullmatch(segment.strip(" .!?:()"))
+    if bare and bare.group(0).lower() not in _NOT_CITY_WORDS | set(PREFERENCE_KEYWORDS):
+        return _normalize_destination(bare.group(0))
+    if not _BARE_NUMBER_RE.search(segment):
+        return None
+    for match in _CAPITALIZED_RE.finditer(segment):
+        words = [w for w in match.group(0).split() if w.lower() not in _NOT_CITY_WORDS]
+        if not words:
+            continue
+        leading = re.findall(r"[\w'-]+", segment[:match.start()])
+        if any(w.lower() not in _NOT_CITY_WORDS for w in leading) or \
+                any(w.lower() in PREFERENCE_KEYWORDS for w in words):
+            return None
+        return _normalize_destination(" ".join(words))
+    return None
+
+
+def parse_multi_city_intent(text: str, preferences: Optional[List[str]] = None) -> Optional[MultiCityIntent]:
+    """
+    Rule-based parsing of multi-city requests.
+
+    Understands requests like "Tokyo 4 days then Singapore 3",
+    "3 days in Paris and 2 days in London", "Lisbon 3 days, Porto 2 days"
+    or "a 7-day trip: Barcelona -> Paris". Cities are taken in the order
+    written; a leg's days are the number next to its city, if any. A
+    trailing "for N days" when no earlier leg gave a count ("Paris and
+    London for 5 days") is the whole trip's length, not the last leg's.
+
+    Args:
+        text: User's natural language request
+        preferences: Preferences already parsed from the request (default:
+            keyword matching, as in the rule parser)
+
+    A request only counts as multi-city when a connector such as "then",
+    "followed by" or "→" comes between two of its cities, when every city
+    has its own day count, or when at least two of them are known (catalog
+    cities or canonical names of common abbreviations). Otherwise "and" and
+    commas are read as lists of sights or interests, and the request stays
+    single-city.
+
+    Returns:
+        MultiCityIntent, or None unless at least two cities were found
+    """
+    total_days = None
+    total_match = _TOTAL_DAYS_RE.search(text)
+    if total_match:
+        total_days = int(total_match.group(1))
+        text = text[:total_match.start()] + text[total_match.end():]
+
+    legs = []
+    qualifiable = False
+    connected = False
+    connector_since_leg = False
+    parts = _LEG_SEPARATOR_RE.split(text)
+    # parts alternates segment, separator, segment, ...
+    for i in range(0, len(parts), 2):
+        segment = parts[i]
+        if i and _LEG_CONNECTOR_RE.match(parts[i - 1].strip()):
+            connector_since_leg = True
+        city = _leg_city(segment)
+        days_match = _LEG_DAYS_RE.search(segment) or _BARE_NUMBER_RE.search(segment)
+        days = int(days_match.group(1)) if days_match else None
+        # "Tokyo, Japan for 3 days": a comma straight after a bare city qualifies it
+        if qualifiable and parts[i - 1].strip() == "," and city not in get_supported_cities():
+            legs[-1].days = days or None
+            city = None
+        if not city:
+            qualifiable = False
+            continue
+        connected = connected or (bool(legs) and connector_since_leg)
+        connector_since_leg = False
+        legs.append(TripLeg(destination=city, days=days or None))
+        qualifiable = days is None and segment.strip(" .!?:()").lower() == city.lower()
+
+    if len(legs) < 2:
+        return None
+    known = set(get_supported_cities()) | set(_CITY_ALIASES.values())
+    each_has_days = all(leg.days for leg in legs)
+    if not (connected or each_has_days) and sum(leg.destination in known for leg in legs) < 2:
+        return None
+    trailing = _TRAILING_DAYS_RE.search(text)
+    if trailing and total_days is None and not any(leg.days for leg in legs[:-1]):
+        total_days = int(trailing.group(1))
+        legs[-1].days = None
+    if preferences is None:
+        lowered = text.lower()
+        preferences = [keyword for keyword in PREFERENCE_KEYWORDS if keyword in lowered]
+    return MultiCityIntent(legs=legs, days=total_days, preferences=list(preferences))
@@ -0,0 +1,207 @@
+# itinerary_cache.py
+# Memoized build_itinerary results keyed by normalized plan inputs
+# LRU with an entry limit and an approximate memory cap; callers always get copies
+# Misses are served from a per-city PlanPrefix, so only new trip lengths pay for the tail
+
+import copy
+import sys
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from data_sources import get_catalog_version, resolve_city
+from intent import TripIntent
+from phase_timer import finish_timer, start_timer
+from planner import Itinerary, PlanPrefix, build_itinerary
+from planner_config import PlannerConfig, get_config
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_PREFIXES = 32
+
+
+def estimate_itinerary_bytes(itinerary: Itinerary) -> int:
+    """Rough in-memory size of an itinerary (objects plus their strings)."""
+    size = sys.getsizeof(itinerary) + sys.getsizeof(itinerary.items) + sys.getsizeof(itinerary.day_ranges)
+    for item in itinerary.items:
+        size += sys.getsizeof(item) + sys.getsizeof(item.__dict__) + sys.getsizeof(item.tags)
+        size += sum(sys.getsizeof(s) for s in (item.time, item.name, item.area, item.url))
+        size += sum(sys.getsizeof(tag) for tag in item.tags)
+    for day_range in itinerary.day_ranges:
+        size += sys.getsizeof(day_range) + sys.getsizeof(day_range.__dict__)
+        size += sys.getsizeof(day_range.description) + sys.getsizeof(day_range.activity_type)
+    return size
+
+
+def make_cache_key(intent: TripIntent, config: PlannerConfig) -> Optional[tuple]:
+    """
+    Cache key for a planning request, or None if it shouldn't be cached.
+
+    Requests that differ only in city spelling, preference order or duplicate
+    preferences share a key. Unsupported cities aren't cached: their reply is
+    cheap and quotes the city as typed.
+    """
+    city = resolve_city(intent.destination)
+    if city is None:
+        return None
+    return (
+        city,
+        intent.days or 3,
+        tuple(sorted(set(intent.preferences or []))),
+        config.fingerprint(),
+        get_catalog_version(),
+    )
+
+
+class ItineraryCache:
+    """
+    Thread-safe LRU of itineraries with an approximate memory cap.
+
+    Entries are deep-copied on put and on get, so neither the caller that
+    built a plan nor the ones served from cache can change what's stored.
+    Itineraries bigger than the whole cap are never stored.
+
+    Alongside the itineraries it keeps a small LRU of PlanPrefix objects, one
+    per key without the trip length, so "4 days in Paris" can be derived
+    from the plan already computed for "3 days in Paris".
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_prefixes: int = DEFAULT_MAX_PREFIXES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_prefixes = max_prefixes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._prefixes: "OrderedDict[Hashable, PlanPrefix]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.prefix_hits = 0
+
+    def get(self, key: Hashable) -> Optional[Itinerary]:
+        """Copy of the cached itinerary, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            itinerary = entry[0]
+        return copy.deepcopy(itinerary)
+
+    def put(self, key: Hashable, itinerary: Itinerary):
+        """
+        Store a copy, evicting least recently used entries to stay within limits.
+
+        The copy drops `timings`: they describe the run that built the plan,
+        and the key doesn't depend on PlannerConfig.collect_timings.
+        """
+        stored = copy.deepcopy(itinerary)
+        stored.timings = None
+        size = estimate_itinerary_bytes(stored)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (stored, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def get_prefix(self, key: Hashable, create) -> PlanPrefix:
+        """PlanPrefix for `key`, calling create() on a miss."""
+        with self._lock:
+            prefix = self._prefixes.get(key)
+            if prefix is not None:
+                self._prefixes.move_to_end(key)
+                self.prefix_hits += 1
+                return prefix
+        prefix = create()
+        with self._lock:
+            prefix = self._prefixes.setdefault(key, prefix)
+            while len(self._prefixes) > self.max_prefixes:
+                self._prefixes.popitem(last=False)
+        return prefix
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._prefixes.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Size and hit-rate counters for health output."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "prefixes": len(self._prefixes),
+                "prefix_hits": self.prefix_hits,
+            }
+
+
+# Process-wide cache used by the web backend and agent
+_ITINERARY_CACHE = ItineraryCache()
+
+
+def get_itinerary_cache() -> ItineraryCache:
+    """Get the process-wide itinerary cache."""
+    return _ITINERARY_CACHE
+
+
+def cached_build_itinerary(intent: TripIntent, config: PlannerConfig = None,
+                           cache: ItineraryCache = None) -> Itinerary:
+    """
+    build_itinerary with memoization.
+
+    The returned itinerary is the caller's own copy. Its destination is the
+    city as the user wrote it, exactly as build_itinerary would return it.
+    Misses are built from the cached PlanPrefix for the same city,
+    preferences and config.
+
+    With timing on, the timings cover "cache" (lookup and store), then on a
+    miss "prefix" (finding or creating the PlanPrefix) and PlanPrefix.build's
+    phases; they go to the metrics callback as "cached_build_itinerary".
+    """
+    if config is None:
+        config = get_config()
+    if cache is None:
+        cache = _ITINERARY_CACHE
+
+    key = make_cache_key(intent, config)
+    if key is None:
+        return build_itinerary(intent, config)
+
+    timer = start_timer(config.collect_timings)
+    with timer.phase("cache"):
+        itinerary = cache.get(key)
+    if itinerary is None:
+        city, days, preferences = key[:3]
+        with timer.phase("prefix"):
+            prefix = cache.get_prefix((city, preferences) + key[3:],
+                                      lambda: PlanPrefix(city, list(preferences), config))
+        itinerary = prefix.build(days, intent.destination, timer)
+        with timer.phase("cache"):
+            cache.put(key, itinerary)
+    else:
+        itinerary.destination = intent.destination
+    finish_timer(timer, "cached_build_itinerary", itinerary)
+    return itinerary
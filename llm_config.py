@@ -23,15 +23,34 @@ class LLMConfig:
     max_pois_per_city: int = 50  # Maximum POIs to generate
     min_pois_per_day: int = 1
     max_pois_per_day: int = 4
+
+    # Arrange generated POIs with the local timed scheduler instead of a
+    # second Claude call (one round trip per trip instead of two)
+    schedule_generated_pois: bool = False
     
     # Fallback Behavior
     fallback_to_static: bool = True  # Fall back to static planner if LLM fails
     retry_on_failure: bool = True    # Retry LLM calls once on failure
+
+    # Per-stage latency budgets (seconds). Calls are abandoned past these.
+    intent_timeout_seconds: float = 8.0        # parse_intent
+    poi_timeout_seconds: float = 30.0          # _generate_pois_with_llm
+    itinerary_timeout_seconds: float = 30.0    # _create_llm_itinerary
+
+    # Circuit breaker shared by all Claude calls
+    breaker_failure_threshold: int = 3    # Consecutive slow/failed calls before opening
+    breaker_reset_seconds: float = 30.0   # How long to stay open before probing again
+    breaker_slow_call_ratio: float = 0.8  # Calls using more of their budget count as slow
     
     # Output Settings
     include_reasoning: bool = False  # Include LLM reasoning in output
     debug_mode: bool = False         # Print debug information
     
+    @property
+    def max_retries(self) -> int:
+        """SDK retry count derived from retry_on_failure."""
+        return 1 if self.retry_on_failure else 0
+
     def __post_init__(self):
         """Load API key from environment if not provided."""
         if not self.anthropic_api_key:
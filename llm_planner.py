@@ -5,15 +5,21 @@
 import os
 import json
 import re
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 from anthropic import Anthropic
 from dotenv import load_dotenv
 
 from intent import TripIntent
-from planner import ItineraryItem, DayRange, Itinerary
+from planner import ItineraryItem, DayRange, Itinerary, schedule_itinerary
+from planner_config import PlannerConfig, get_config
+from phase_timer import NO_TIMER, finish_timer, start_timer
+from scheduler import parse_best_time, parse_duration_minutes, parse_opening_hours
 from data_sources import fetch_pois, get_supported_cities
+from llm_config import get_llm_config
+from circuit_breaker import get_llm_breaker
+from itinerary_cache import cached_build_itinerary
 
 # Load environment variables
 load_dotenv()
@@ -32,6 +38,26 @@ class LLMGeneratedPOI:
     google_maps_query: str  # For generating URLs
 
 
+def llm_poi_to_dict(poi: LLMGeneratedPOI) -> dict:
+    """
+    Catalog-style POI dict for the planner, with the free-text fields parsed.
+
+    Unreadable opening hours ("Varies") fall back to 9:00-18:00 and unreadable
+    durations to the scheduler's default.
+    """
+    open_minutes = parse_opening_hours(poi.opening_hours) or (9 * 60, 18 * 60)
+    return {
+        "name": poi.name,
+        "area": poi.area,
+        "tags": poi.tags,
+        "open": (open_minutes[0] // 60, -(-open_minutes[1] // 60)),
+        "open_minutes": open_minutes,
+        "duration_minutes": parse_duration_minutes(poi.estimated_duration, default=None),
+        "preferred_window": parse_best_time(poi.best_time_to_visit),
+        "url": f"https://maps.google.com/?q={poi.google_maps_query}",
+    }
+
+
 class LLMTripPlanner:
     """
     Advanced trip planner powered by Claude AI.
@@ -49,7 +75,9 @@ class LLMTripPlanner:
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
         
-        self.client = Anthropic(api_key=self.api_key)
+        self.config = get_llm_config()
+        self.breaker = get_llm_breaker()
+        self.client = Anthropic(api_key=self.api_key, max_retries=self.config.max_retries)
 
     def plan_trip(self, intent: TripIntent) -> Itinerary:
         """
@@ -60,19 +88,30 @@ class LLMTripPlanner:
         2. If not, use LLM to generate POIs and plan itinerary
         3. Create intelligent day-by-day schedule
         4. Handle any trip length (1 day to 1000+ days)
+
+        With PlannerConfig.collect_timings (or a metrics callback) on, the
+        itinerary's timings cover "fetch", then "static_plan" for catalog
+        cities or "poi_generation" followed by "itinerary_generation" (or
+        "scheduling" with LLMConfig.schedule_generated_pois) otherwise.
         """
         city = intent.destination
         days = intent.days or 3
         preferences = intent.preferences or []
+        timer = start_timer(get_config().collect_timings)
 
         # First, try static database for supported cities
-        static_pois = fetch_pois(city, preferences)
+        with timer.phase("fetch"):
+            static_pois = fetch_pois(city, preferences)
         if static_pois:
             # City is in our database - use hybrid approach
-            return self._plan_with_hybrid_data(intent, static_pois)
-        
-        # City not in database - use full LLM planning
-        return self._plan_with_llm(intent)
+            with timer.phase("static_plan"):
+                itinerary = self._plan_with_hybrid_data(intent, static_pois)
+        else:
+            # City not in database - use full LLM planning
+            itinerary = self._plan_with_llm(intent, timer)
+
+        finish_timer(timer, "llm_plan_trip", itinerary)
+        return itinerary
 
     def _plan_with_hybrid_data(self, intent: TripIntent, static_pois: List[dict]) -> Itinerary:
         """
@@ -93,22 +132,33 @@ class LLMTripPlanner:
 
         return enhanced_itinerary
 
-    def _plan_with_llm(self, intent: TripIntent) -> Itinerary:
+    def _plan_with_llm(self, intent: TripIntent, timer=NO_TIMER) -> Itinerary:
         """
         Plan complete trip using LLM for cities not in static database.
+
+        Claude generates the POIs. With LLMConfig.schedule_generated_pois
+        they are arranged into days locally by the timed scheduler;
+        otherwise a second Claude call does it.
         """
         city = intent.destination
         days = intent.days or 3
         preferences = intent.preferences or []
 
         # Generate POIs using LLM
-        generated_pois = self._generate_pois_with_llm(intent)
+        with timer.phase("poi_generation"):
+            generated_pois = self._generate_pois_with_llm(intent)
         
         if not generated_pois:
-            return self._create_fallback_itinerary(intent)
+            with timer.phase("fallback"):
+                return self._create_fallback_itinerary(intent)
+
+        if self.config.schedule_generated_pois:
+            with timer.phase("scheduling"):
+                return self._schedule_llm_itinerary(intent, generated_pois)
 
         # Create detailed itinerary
-        return self._create_llm_itinerary(intent, generated_pois)
+        with timer.phase("itinerary_generation"):
+            return self._create_llm_itinerary(intent, generated_pois)
 
     def _generate_pois_with_llm(self, intent: TripIntent) -> List[LLMGeneratedPOI]:
         """
@@ -165,11 +215,15 @@ Use these tag categories when relevant: {', '.join(['food', 'culture', 'museum',
 Return ONLY a valid JSON array of POI objects, no other text."""
 
         try:
-            message = self.client.messages.create(
+            deadline = self.config.poi_timeout_seconds
+            message = self.breaker.call(
+                self.client.messages.create,
                 model="claude-3-haiku-20240307",
                 max_tokens=4000,
                 temperature=0.7,
-                messages=[{"role": "user", "content": prompt}]
+                messages=[{"role": "user", "content": prompt}],
+                timeout=deadline,
+                deadline=deadline
             )
 
             response_text = message.content[0].text
@@ -271,11 +325,15 @@ Create an itinerary that covers all {days} days. Use day_ranges for periods long
 Return ONLY valid JSON, no other text."""
 
         try:
-            message = self.client.messages.create(
+            deadline = self.config.itinerary_timeout_seconds
+            message = self.breaker.call(
+                self.client.messages.create,
                 model="claude-3-haiku-20240307",
                 max_tokens=4000,
                 temperature=0.3,  # Lower temperature for more structured output
-                messages=[{"role": "user", "content": prompt}]
+                messages=[{"role": "user", "content": prompt}],
+                timeout=deadline,
+                deadline=deadline
             )
 
             response_text = message.content[0].text
@@ -337,19 +395,13 @@ Return ONLY valid JSON, no other text."""
             )
 
             # Fill any gaps
-            covered_days = itinerary.get_all_covered_days()
-            uncovered_days = [d for d in range(1, days + 1) if d not in covered_days]
-            
-            if uncovered_days:
-                # Group consecutive uncovered days into ranges
-                ranges = self._group_consecutive_days(uncovered_days)
-                for start, end in ranges:
-                    day_ranges.append(DayRange(
-                        start_day=start,
-                        end_day=end,
-                        description="Free exploration time",
-                        activity_type="free_exploration"
-                    ))
+            for start, end in itinerary.get_uncovered_ranges():
+                day_ranges.append(DayRange(
+                    start_day=start,
+                    end_day=end,
+                    description="Free exploration time",
+                    activity_type="free_exploration"
+                ))
 
             return itinerary
 
@@ -357,6 +409,17 @@ Return ONLY valid JSON, no other text."""
             print(f"Error creating LLM itinerary: {e}")
             return self._create_simple_fallback_itinerary(intent, generated_pois)
 
+    def _schedule_llm_itinerary(self, intent: TripIntent, generated_pois: List[LLMGeneratedPOI],
+                                config: PlannerConfig = None) -> Itinerary:
+        """
+        Arrange generated POIs with the timed scheduler instead of a second Claude call.
+
+        Uses each POI's estimated duration, opening hours and best time to
+        visit; travel between areas comes from routing.get_travel_times().
+        """
+        pois = [llm_poi_to_dict(poi) for poi in generated_pois]
+        return schedule_itinerary(intent, pois, config)
+
     def _create_simple_fallback_itinerary(self, intent: TripIntent, generated_pois: List[LLMGeneratedPOI]) -> Itinerary:
         """
         Create a simple itinerary when LLM planning fails.
@@ -441,34 +504,13 @@ Return ONLY valid JSON, no other text."""
             day_ranges=day_ranges
         )
 
-    def _group_consecutive_days(self, days: List[int]) -> List[Tuple[int, int]]:
-        """Group consecutive days into ranges."""
-        if not days:
-            return []
-
-        ranges = []
-        start = days[0]
-        prev = days[0]
-
-        for day in days[1:]:
-            if day == prev + 1:
-                prev = day
-            else:
-                ranges.append((start, prev))
-                start = day
-                prev = day
-
-        ranges.append((start, prev))
-        return ranges
-
     def _enhance_static_itinerary(self, intent: TripIntent, static_pois: List[dict]) -> Itinerary:
         """
         Enhance static POI data with LLM reasoning for better organization.
         """
         # For now, fall back to the original planner for static cities
         # This maintains consistency while adding LLM enhancement
-        from planner import build_itinerary
-        return build_itinerary(intent)
+        return cached_build_itinerary(intent)
 
     def _generate_additional_pois(self, intent: TripIntent, existing_pois: List[dict]) -> List[LLMGeneratedPOI]:
         """
@@ -489,6 +531,10 @@ def create_intelligent_itinerary(intent: TripIntent, use_llm: bool = True) -> It
     """
     Main function to create trip itinerary using LLM reasoning.
     
+    While the shared Claude circuit breaker is open (Claude has been failing
+    or slow), the static planner is used directly instead of waiting on
+    calls that are likely to fail.
+
     Args:
         intent: Parsed trip intent
         use_llm: Whether to use LLM planning (falls back to static if False or API unavailable)
@@ -496,15 +542,13 @@ def create_intelligent_itinerary(intent: TripIntent, use_llm: bool = True) -> It
     Returns:
         Complete trip itinerary
     """
-    if not use_llm or not os.getenv("ANTHROPIC_API_KEY"):
-        # Fall back to static planner
-        from planner import build_itinerary
-        return build_itinerary(intent)
+    if not use_llm or not os.getenv("ANTHROPIC_API_KEY") or get_llm_breaker().is_open:
+        # Fall back to static planner (memoized: outages send every request here)
+        return cached_build_itinerary(intent)
     
     try:
         llm_planner = LLMTripPlanner()
         return llm_planner.plan_trip(intent)
     except Exception as e:
         print(f"LLM planning failed, falling back to static planner: {e}")
-        from planner import build_itinerary
-        return build_itinerary(intent)
\ No newline at end of file
+        return cached_build_itinerary(intent)
\ No newline at end of file
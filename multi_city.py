@@ -0,0 +1,124 @@
+# multi_city.py
+# Multi-city trips: split the day budget across legs, plan the legs concurrently,
+# and stitch them into one itinerary with trip-wide day numbers
+
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from intent import MultiCityIntent, TripIntent
+from llm_planner import create_intelligent_itinerary
+from planner import Itinerary
+
+# Days for a leg when neither the leg nor the whole trip says how long
+DEFAULT_LEG_DAYS = 3
+
+# Separator between city names in the stitched itinerary's destination
+DESTINATION_SEPARATOR = " → "
+
+
+@dataclass
+class LegPlan:
+    """One leg of a planned multi-city trip, with its trip-wide days."""
+    destination: str
+    start_day: int
+    end_day: int
+    itinerary: Itinerary
+
+    @property
+    def num_days(self) -> int:
+        return self.end_day - self.start_day + 1
+
+
+@dataclass
+class MultiCityPlan:
+    """The stitched itinerary and the per-leg plans it was built from."""
+    itinerary: Itinerary
+    legs: List[LegPlan]
+
+
+def split_days(intent: MultiCityIntent, default_days: int = DEFAULT_LEG_DAYS) -> List[int]:
+    """
+    Days for each leg, in order.
+
+    Legs that gave a day count keep it. The others share what is left of
+    the whole trip's days (intent.days) as evenly as possible, earlier legs
+    taking the odd days, with at least one day each; without a trip length
+    they get `default_days`. A trip length that disagrees with the legs'
+    own counts gives way to them.
+    """
+    missing = [i for i, leg in enumerate(intent.legs) if not leg.days]
+    days = [leg.days or 0 for leg in intent.legs]
+    if not missing:
+        return days
+
+    remaining = (intent.days or 0) - sum(days)
+    if intent.days and remaining > 0:
+        base, extra = divmod(remaining, len(missing))
+        for n, i in enumerate(missing):
+            days[i] = max(1, base + (1 if n < extra else 0))
+    else:
+        for i in missing:
+            days[i] = 1 if intent.days else default_days
+    return days
+
+
+def stitch_legs(itineraries: List[Itinerary]) -> MultiCityPlan:
+    """
+    Join per-leg itineraries into one trip, in order.
+
+    Each leg's days are shifted by the days of the legs before it. Item areas
+    and range descriptions are suffixed/prefixed with the leg's city so the
+    combined plan still says where each day is spent. The inputs are not
+    modified.
+    """
+    items, day_ranges, legs = [], [], []
+    offset = 0
+    for leg in itineraries:
+        city = leg.destination
+        items.extend(dataclasses.replace(item, day=item.day + offset, area=f"{item.area}, {city}")
+                     for item in leg.items)
+        day_ranges.extend(dataclasses.replace(r, start_day=r.start_day + offset, end_day=r.end_day + offset,
+                                              description=f"{city}: {r.description}")
+                          for r in leg.day_ranges)
+        legs.append(LegPlan(destination=city, start_day=offset + 1, end_day=offset + leg.days, itinerary=leg))
+        offset += leg.days
+
+    itinerary = Itinerary(destination=DESTINATION_SEPARATOR.join(leg.destination for leg in legs),
+                          days=offset, items=items, day_ranges=day_ranges)
+    return MultiCityPlan(itinerary=itinerary, legs=legs)
+
+
+def plan_multi_city(intent: MultiCityIntent, plan_leg: Callable[[TripIntent], Itinerary] = None,
+                    use_llm: bool = True, max_workers: Optional[int] = None) -> MultiCityPlan:
+    """
+    Plan every leg of a multi-city trip at once and stitch the results.
+
+    Legs are independent, so each one's POI fetch and planning runs in its
+    own thread and the trip takes about as long as its slowest leg. With
+    the default planner that is create_intelligent_itinerary: Claude calls
+    for generated cities overlap, and catalog legs use the static planner.
+    Static planning is CPU-bound and shares the GIL; pass a plan_leg that
+    hands the work to another process (e.g. PlanningService.plan) to
+    overlap that too.
+
+    Args:
+        intent: Parsed multi-city intent
+        plan_leg: Plans one leg (default: create_intelligent_itinerary)
+        use_llm: Passed to the default planner
+        max_workers: Legs planned at once (default: all of them)
+
+    Returns:
+        MultiCityPlan; the first leg to fail raises its exception here
+    """
+    if plan_leg is None:
+        def plan_leg(leg_intent: TripIntent) -> Itinerary:
+            return create_intelligent_itinerary(leg_intent, use_llm=use_llm)
+
+    leg_intents = [TripIntent(destination=leg.destination, days=days, preferences=list(intent.preferences))
+                   for leg, days in zip(intent.legs, split_days(intent))]
+    with ThreadPoolExecutor(max_workers=max_workers or len(leg_intents)) as pool:
+        futures = [pool.submit(plan_leg, leg_intent) for leg_intent in leg_intents]
+        itineraries = [future.result() for future in futures]
+    return stitch_legs(itineraries)
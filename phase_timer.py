@@ -0,0 +1,116 @@
+# phase_timer.py
+# Lightweight wall-clock timing of planning phases
+# Timings go on the returned itinerary and to an optional metrics callback
+
+import time
+from typing import Callable, Dict, Optional
+
+# callback(source, timings): source is "build_itinerary", "cached_build_itinerary" or
+# "llm_plan_trip", timings maps phase name to milliseconds (plus "total")
+MetricsCallback = Callable[[str, Dict[str, float]], None]
+
+_METRICS_CALLBACK: Optional[MetricsCallback] = None
+
+
+class _Phase:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer: "PhaseTimer", name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class PhaseTimer:
+    """
+    Accumulates time per named phase.
+
+    Use `with timer.phase("scoring"): ...`; a phase entered more than once
+    adds up. Phases keep the order they were first entered in.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def phase(self, name: str) -> _Phase:
+        return _Phase(self, name)
+
+    def add(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        """Milliseconds per phase, plus "total" since the timer was created."""
+        timings = {name: round(seconds * 1000, 4) for name, seconds in self.phases.items()}
+        timings["total"] = round((time.perf_counter() - self.started) * 1000, 4)
+        return timings
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _NullTimer:
+    """Timer used when timing is off: every phase is a shared no-op."""
+
+    enabled = False
+
+    def phase(self, name: str) -> _NullPhase:
+        return _NULL_PHASE
+
+    def add(self, name: str, seconds: float):
+        pass
+
+
+NO_TIMER = _NullTimer()
+
+
+def start_timer(enabled: bool = False):
+    """A PhaseTimer if `enabled` or a metrics callback is set, else NO_TIMER."""
+    if enabled or _METRICS_CALLBACK is not None:
+        return PhaseTimer()
+    return NO_TIMER
+
+
+def finish_timer(timer, source: str, itinerary=None):
+    """Attach the timings to `itinerary` and pass them to the metrics callback."""
+    if not timer.enabled:
+        return
+    timings = timer.as_dict()
+    if itinerary is not None:
+        itinerary.timings = timings
+    callback = _METRICS_CALLBACK
+    if callback is not None:
+        try:
+            callback(source, timings)
+        except Exception as e:
+            print(f"Metrics callback failed: {e}")
+
+
+def set_metrics_callback(callback: Optional[MetricsCallback]):
+    """Set (or clear, with None) the callback that receives every plan's timings."""
+    global _METRICS_CALLBACK
+    _METRICS_CALLBACK = callback
+
+
+def get_metrics_callback() -> Optional[MetricsCallback]:
+    """Get the current metrics callback, if any."""
+    return _METRICS_CALLBACK
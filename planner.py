@@ -2,11 +2,17 @@
 # Intelligent itinerary generation with day range support and guaranteed day counts
 # Supports trips up to 1000 days with efficient memory usage
 
-from typing import List, Dict, Union
-from dataclasses import dataclass
+import copy
+import threading
+from typing import List, Dict, Iterator, Optional, Tuple, Union
+from dataclasses import dataclass, field
 from intent import TripIntent
 from data_sources import fetch_pois, get_supported_cities
 from planner_config import get_config, PlannerConfig
+from poi_matrix import get_poi_matrix
+from routing import get_travel_times, optimize_route
+from scheduler import ScheduledVisit, Scheduler, opening_minutes
+from phase_timer import NO_TIMER, finish_timer, start_timer
 
 
 @dataclass
@@ -18,6 +24,7 @@ class ItineraryItem:
     area: str
     tags: List[str]
     url: str
+    duration_minutes: int = 120  # Timed scheduling sets real durations; 2h matches slot spacing
 
 
 @dataclass
@@ -46,6 +53,70 @@ class DayRange:
         return f"Days {self.start_day}–{self.end_day}: {self.description}"
 
 
+@dataclass(repr=False)
+class PeriodicDayRange(DayRange):
+    """
+    Repeating rest blocks over a long span, e.g. weekly blocks from day 51 to 10000.
+
+    Stored as a single object however long the span is. Iterating yields the
+    individual DayRange blocks ("... — Week 8", "... — Week 9", ...) lazily;
+    the last block is shorter when the span isn't a whole number of periods.
+    """
+    period_days: int = 7
+
+    @property
+    def num_blocks(self) -> int:
+        """Number of blocks, counting a final partial block."""
+        return -(-self.num_days // self.period_days)
+
+    @property
+    def summary(self) -> str:
+        """One-line description covering every block."""
+        first = self._block_number(self.start_day)
+        last = self._block_number(self.end_day)
+        if first == last:
+            return f"{self.description} — {self._block_unit} {first}"
+        return f"{self.description} — {self._block_unit}s {first}–{last}"
+
+    @property
+    def last_block(self) -> DayRange:
+        """The final (possibly shorter) block, without iterating the others."""
+        start = self.start_day + (self.num_blocks - 1) * self.period_days
+        return self._block(start, self.end_day)
+
+    @property
+    def _block_unit(self) -> str:
+        return "Week" if self.period_days == 7 else "Period"
+
+    def _block_number(self, day: int) -> int:
+        return (day - 1) // self.period_days + 1
+
+    def __iter__(self) -> Iterator[DayRange]:
+        start = self.start_day
+        while start <= self.end_day:
+            end = min(start + self.period_days - 1, self.end_day)
+            yield self._block(start, end)
+            start = end + 1
+
+    def _block(self, start: int, end: int) -> DayRange:
+        return DayRange(
+            start_day=start,
+            end_day=end,
+            description=f"{self.description} — {self._block_unit} {self._block_number(start)}",
+            activity_type=self.activity_type
+        )
+
+    def __repr__(self) -> str:
+        return f"Days {self.start_day}–{self.end_day}: {self.summary} (every {self.period_days} days)"
+
+
+@dataclass
+class ItineraryDay:
+    """One day's activities, as yielded by iter_itinerary()."""
+    day: int
+    items: List[ItineraryItem]
+
+
 @dataclass
 class Itinerary:
     """
@@ -56,37 +127,111 @@ class Itinerary:
         days: Total number of days in the trip
         items: List of specific activities
         day_ranges: List of multi-day rest/buffer periods
+        timings: Milliseconds per planning phase, when timing is on
+            (see PlannerConfig.collect_timings); not part of equality
     """
     destination: str
     days: int
     items: List[ItineraryItem]
     day_ranges: List[DayRange] = None
+    timings: Optional[Dict[str, float]] = field(default=None, compare=False, repr=False)
 
     def __post_init__(self):
         """Initialize day_ranges if not provided."""
         if self.day_ranges is None:
             self.day_ranges = []
 
-    def get_all_covered_days(self) -> set:
-        """Get set of all days that have activities or are in ranges."""
-        covered = set()
+    def iter_parts(self) -> Iterator[Union[ItineraryDay, DayRange]]:
+        """
+        Walk a built itinerary in the shape iter_itinerary() yields.
 
-        # Days with specific activities
+        Activity days and day ranges come out ordered by their first day;
+        a day that starts on the same day as a range comes first.
+        """
+        items_by_day: Dict[int, List[ItineraryItem]] = {}
         for item in self.items:
-            covered.add(item.day)
+            items_by_day.setdefault(item.day, []).append(item)
+        days = [ItineraryDay(day=day, items=day_items) for day, day_items in sorted(items_by_day.items())]
+        ranges = sorted(self.day_ranges, key=lambda r: r.start_day)
+
+        i = j = 0
+        while i < len(days) or j < len(ranges):
+            if j >= len(ranges) or (i < len(days) and days[i].day <= ranges[j].start_day):
+                yield days[i]
+                i += 1
+            else:
+                yield ranges[j]
+                j += 1
 
-        # Days in ranges
+    def iter_day_ranges(self) -> Iterator[DayRange]:
+        """Iterate day ranges with periodic ranges expanded into their blocks."""
         for day_range in self.day_ranges:
-            for day in range(day_range.start_day, day_range.end_day + 1):
-                covered.add(day)
+            if isinstance(day_range, PeriodicDayRange):
+                yield from day_range
+            else:
+                yield day_range
+
+    def get_covered_intervals(self) -> List[Tuple[int, int]]:
+        """
+        Get days covered by activities or ranges as sorted, merged intervals.
+
+        Adjacent and overlapping spans are merged, so a fully covered trip is
+        a single (1, days) interval. Items are first collapsed into runs of
+        consecutive days in one pass, then runs and ranges are sorted: the
+        cost is O(items + s log s) for s runs plus ranges, independent of how
+        many days the ranges span. Planner output lists items in day order,
+        so there one run covers each block of activity days; items in any
+        other order are still handled, just with more runs to sort.
+        """
+        spans: List[Tuple[int, int]] = []
+        for item in self.items:
+            day = item.day
+            if spans and spans[-1][0] - 1 <= day <= spans[-1][1] + 1:
+                start, end = spans[-1]
+                if day < start or day > end:
+                    spans[-1] = (min(start, day), max(end, day))
+            else:
+                spans.append((day, day))
+        spans.extend((r.start_day, r.end_day) for r in self.day_ranges if r.start_day <= r.end_day)
+        spans.sort()
+
+        merged: List[Tuple[int, int]] = []
+        for start, end in spans:
+            if merged and start <= merged[-1][1] + 1:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        return merged
+
+    def get_uncovered_ranges(self) -> List[Tuple[int, int]]:
+        """Get (start_day, end_day) gaps within days 1..self.days, in order."""
+        gaps = []
+        next_day = 1
+        for start, end in self.get_covered_intervals():
+            if start > self.days:
+                break
+            if start > next_day:
+                gaps.append((next_day, start - 1))
+            next_day = max(next_day, end + 1)
+        if next_day <= self.days:
+            gaps.append((next_day, self.days))
+        return gaps
 
+    def get_all_covered_days(self) -> set:
+        """
+        Get set of all days that have activities or are in ranges.
+
+        Expands every covered day; prefer get_covered_intervals() for long trips.
+        """
+        covered = set()
+        for start, end in self.get_covered_intervals():
+            covered.update(range(start, end + 1))
         return covered
 
     def get_uncovered_days(self) -> List[int]:
         """Get list of days not covered by activities or ranges."""
-        covered = self.get_all_covered_days()
-        all_days = set(range(1, self.days + 1))
-        return sorted(all_days - covered)
+        return [day for start, end in self.get_uncovered_ranges() for day in range(start, end + 1)]
 
 
 # Time slots for activities throughout the day
@@ -123,58 +268,428 @@ def build_itinerary(intent: TripIntent, config: PlannerConfig = None) -> Itinera
     """
     if config is None:
         config = get_config()
+    timer = start_timer(config.collect_timings)
 
     city = intent.destination
     days = intent.days or 3
     prefs = set(intent.preferences) if intent.preferences else set()
 
     # Fetch POIs for this city
-    pois = fetch_pois(city, list(prefs))
+    with timer.phase("fetch"):
+        pois = fetch_pois(city, list(prefs))
 
     if not pois:
         # City not in database - return helpful message
-        supported = get_supported_cities()
-        return Itinerary(
+        itinerary = Itinerary(
             destination=city or "Unknown",
             days=days,
-            items=[
-                ItineraryItem(
-                    day=1,
-                    time="09:00",
-                    name=f"Sorry, I don't have data for {city} yet.",
-                    area="",
-                    tags=[],
-                    url=f"https://maps.google.com/?q={city}" if city else ""
-                ),
-                ItineraryItem(
-                    day=1,
-                    time="10:00",
-                    name=f"I currently support: {', '.join(supported)}",
-                    area="",
-                    tags=[],
-                    url=""
-                )
-            ],
+            items=_unsupported_city_items(city),
             day_ranges=[]
         )
+    else:
+        with timer.phase("scoring"):
+            ranked_pois, open_at = _rank_for_slots(pois, prefs, config)
+        with timer.phase("grouping"):
+            by_area = _group_by_area(ranked_pois)
+        itinerary = _plan_ranked(city, days, ranked_pois, by_area, config, open_at, timer)
 
-    # Score POIs: preference match (high priority) + opening window length (tiebreaker)
-    def score_poi(poi: dict) -> tuple:
-        poi_tags = set(poi.get("tags", []))
-        preference_match = len(poi_tags & prefs) if prefs else 0
-        open_start, open_end = poi.get("open", (9, 18))
-        availability_hours = open_end - open_start
-        return (preference_match, availability_hours)
+    finish_timer(timer, "build_itinerary", itinerary)
+    return itinerary
 
-    # Sort POIs by score (descending)
-    ranked_pois = sorted(pois, key=score_poi, reverse=True)
 
-    # Group POIs by area for geographic clustering
-    by_area: Dict[str, List[dict]] = {}
-    for poi in ranked_pois:
-        area = poi.get("area", "Unknown")
-        by_area.setdefault(area, []).append(poi)
+def plan_with_ranking(intent: TripIntent, ranked_pois: List[dict], config: PlannerConfig = None,
+                      area_order: List[str] = None) -> Itinerary:
+    """
+    build_itinerary for a POI ranking chosen by the caller.
+
+    Used to generate alternative plans (see variants.py). Days cycle through
+    the areas in `area_order` (areas it leaves out follow in rank order);
+    by default the area of the best-ranked POI comes first, as in
+    build_itinerary.
+    """
+    if config is None:
+        config = get_config()
+    if not ranked_pois:
+        return Itinerary(
+            destination=intent.destination or "Unknown",
+            days=intent.days or 3,
+            items=_unsupported_city_items(intent.destination),
+            day_ranges=[]
+        )
+    by_area = _group_by_area(ranked_pois)
+    if area_order:
+        ordered = {area: by_area[area] for area in area_order if area in by_area}
+        ordered.update((area, pois) for area, pois in by_area.items() if area not in ordered)
+        by_area = ordered
+    return _plan_ranked(intent.destination, intent.days or 3, ranked_pois, by_area, config)
+
+
+def _plan_ranked(city: str, days: int, ranked_pois: List[dict], by_area: Dict[str, List[dict]],
+                 config: PlannerConfig, open_at: List[List[dict]] = None, timer=NO_TIMER) -> Itinerary:
+    """Allocate (or schedule) ranked POIs and cover the remaining days."""
+    max_activity_days, target_activities_per_day = _activity_plan(days, len(ranked_pois), config)
+
+    if config.scheduling_mode == "timed":
+        with timer.phase("scheduling"):
+            items = _schedule_items(ranked_pois, days, max_activity_days, target_activities_per_day, config)
+        return _finish_itinerary(city, days, items, max_activity_days, config, timer)
+
+    # Build itinerary items for early days (activity-dense period)
+    with timer.phase("allocation"):
+        allocator = _Allocator(ranked_pois, by_area, max_activity_days, target_activities_per_day,
+                               config, dense=days <= config.dense_activity_days_threshold,
+                               open_at=open_at)
+        allocator.first_pass()
+    if allocator.dense:
+        with timer.phase("second_pass"):
+            allocator.top_up()
+    items = allocator.items
+    if config.optimize_routes:
+        with timer.phase("routing"):
+            items = _optimize_routes(items, allocator.pois_by_name, config)
+
+    return _finish_itinerary(city, days, items, max_activity_days, config, timer)
+
+
+def _finish_itinerary(city: str, days: int, items: List[ItineraryItem],
+                      max_activity_days: int, config: PlannerConfig, timer=NO_TIMER) -> Itinerary:
+    """Add the rest ranges after the activity days and cover any gaps."""
+    # Create day ranges for remaining days
+    with timer.phase("ranges"):
+        day_ranges = _rest_day_ranges(days, max_activity_days, config)
+
+    # Create the itinerary
+    itinerary = Itinerary(
+        destination=city,
+        days=days,
+        items=items,
+        day_ranges=day_ranges
+    )
+
+    # CRITICAL: Verify we're covering all days
+    # This should never happen, but if it does, create catch-all ranges
+    with timer.phase("coverage"):
+        for start, end in itinerary.get_uncovered_ranges():
+            day_ranges.append(_buffer_range(start, end))
+
+    return itinerary
+
+
+def iter_itinerary(intent: TripIntent, config: PlannerConfig = None) -> Iterator[Union["ItineraryDay", DayRange]]:
+    """
+    Generate the same plan as build_itinerary, one finished piece at a time.
+
+    Yields ItineraryDay objects (a day's activities) and DayRange objects in
+    day order, so callers can show day 1 while later days are still being
+    planned. Long trips stream day by day; for short trips (up to
+    dense_activity_days_threshold) the activity days are produced together,
+    because their second pass can still top up any of them. Memory stays
+    bounded by the POI catalog rather than the trip length.
+
+    Collecting the output gives the itinerary build_itinerary returns, with
+    day ranges sorted by start day.
+
+    Args:
+        intent: Parsed trip intent with destination, days, preferences
+        config: Optional planner configuration (uses default if not provided)
+    """
+    if config is None:
+        config = get_config()
+
+    city = intent.destination
+    days = intent.days or 3
+    prefs = set(intent.preferences) if intent.preferences else set()
+
+    pois = fetch_pois(city, list(prefs))
+    if not pois:
+        yield ItineraryDay(day=1, items=_unsupported_city_items(city))
+        return
+
+    ranked_pois, open_at = _rank_for_slots(pois, prefs, config)
+    by_area = _group_by_area(ranked_pois)
+    max_activity_days, target_activities_per_day = _activity_plan(days, len(ranked_pois), config)
+    if config.scheduling_mode == "timed":
+        # The repair pass can touch any day, so the whole schedule comes first
+        items = _schedule_items(ranked_pois, days, max_activity_days, target_activities_per_day, config)
+        activity_days = _group_items_by_day(items, max_activity_days)
+        allocator = None
+    else:
+        allocator = _Allocator(ranked_pois, by_area, max_activity_days, target_activities_per_day,
+                               config, dense=days <= config.dense_activity_days_threshold,
+                               keep_items=False, open_at=open_at)
+        activity_days = allocator.iter_days()
+
+    # Days left without activities become buffer ranges, as in build_itinerary
+    gap_start = None
+    for day, day_items in activity_days:
+        if not day_items:
+            if gap_start is None:
+                gap_start = day
+            continue
+        if gap_start is not None:
+            yield _buffer_range(gap_start, day - 1)
+            gap_start = None
+        if allocator is not None and config.optimize_routes:
+            day_items = _optimize_routes(day_items, allocator.pois_by_name, config)
+        yield ItineraryDay(day=day, items=day_items)
+    if gap_start is not None:
+        yield _buffer_range(gap_start, max_activity_days)
+
+    yield from _rest_day_ranges(days, max_activity_days, config)
+
+
+class PlanPrefix:
+    """
+    Reusable plan for one city, preference set and config, for any trip length.
+
+    The first pass of the allocator fills day d the same way whatever the
+    trip length: it only depends on whether the trip is dense and, for dense
+    trips, on the per-day target. So the activity days are computed once per
+    mode, extended on demand, and build(days) slices them, re-runs the short
+    second pass for dense trips and adds the tail ranges.
+
+    build(days) returns exactly what build_itinerary would for the same
+    inputs. The catalog must not change while a PlanPrefix is in use.
+    """
+
+    def __init__(self, city: str, preferences: List[str] = None, config: PlannerConfig = None):
+        self.city = city
+        self.config = config if config is not None else get_config()
+        self.prefs = set(preferences) if preferences else set()
+        self._lock = threading.Lock()
+        # One first-pass allocator per mode: None for long trips, else the dense target
+        self._streams: Dict[Optional[int], _Allocator] = {}
+        self._filled: Dict[Optional[int], int] = {}
+
+        pois = fetch_pois(city, list(self.prefs))
+        self.supported = bool(pois)
+        if self.supported:
+            self.ranked_pois, open_at = _rank_for_slots(pois, self.prefs, self.config)
+            self.by_area = _group_by_area(self.ranked_pois)
+            # Slot queues are built once and shared by every mode's pool
+            self._pool = _PoiPool(self.ranked_pois, open_at)
+
+    @property
+    def days_computed(self) -> int:
+        """Activity days computed so far, across all modes."""
+        return sum(self._filled.values())
+
+    def build(self, days: int, destination: str = None, timer=NO_TIMER) -> Itinerary:
+        """
+        Itinerary for a `days`-day trip.
+
+        Args:
+            days: Trip length
+            destination: City name to put on the itinerary (defaults to the
+                one this plan was created with)
+            timer: PhaseTimer for the "allocation", "second_pass", "routing",
+                "ranges" and "coverage" phases (or "scheduling" in timed
+                mode); the caller finishes it
+        """
+        destination = destination if destination is not None else self.city
+        if not self.supported:
+            return Itinerary(
+                destination=destination or "Unknown",
+                days=days,
+                items=_unsupported_city_items(destination),
+                day_ranges=[]
+            )
+
+        config = self.config
+        max_activity_days, target_activities_per_day = _activity_plan(days, len(self.ranked_pois), config)
+        dense = days <= config.dense_activity_days_threshold
+
+        if config.scheduling_mode == "timed":
+            # Timed schedules are repaired across days, so there's no prefix to reuse
+            with timer.phase("scheduling"):
+                items = _schedule_items(self.ranked_pois, days, max_activity_days,
+                                        target_activities_per_day, config)
+            return _finish_itinerary(destination, days, items, max_activity_days, config, timer)
+
+        with timer.phase("allocation"):
+            with self._lock:
+                allocator = self._extend(target_activities_per_day if dense else None, max_activity_days)
+                allocator = allocator.fork(max_activity_days)
+        if dense:
+            with timer.phase("second_pass"):
+                allocator.top_up()
+        items = allocator.items
+        if config.optimize_routes:
+            with timer.phase("routing"):
+                items = _optimize_routes(items, allocator.pois_by_name, config)
+
+        return _finish_itinerary(destination, days, items, max_activity_days, config, timer)
+
+    def _extend(self, mode: Optional[int], max_activity_days: int) -> "_Allocator":
+        """First-pass allocator for `mode`, filled through at least `max_activity_days`."""
+        allocator = self._streams.get(mode)
+        if allocator is None:
+            allocator = _Allocator(self.ranked_pois, self.by_area, 0, mode or 0, self.config,
+                                   dense=mode is not None, keep_items=False,
+                                   pool=self._pool.fork(set()))
+            self._streams[mode] = allocator
+            self._filled[mode] = 0
+        while self._filled[mode] < max_activity_days:
+            self._filled[mode] += 1
+            allocator.fill_day(self._filled[mode])
+        return allocator
+
+
+def schedule_itinerary(intent: TripIntent, pois: List[dict], config: PlannerConfig = None) -> Itinerary:
+    """
+    Timed itinerary for an explicit POI list, e.g. POIs generated by Claude.
+
+    Ranks the POIs like build_itinerary and packs them into days with the
+    timed scheduler whatever config.scheduling_mode says. POIs may carry
+    "duration_minutes", "open_minutes" and "preferred_window" (see
+    scheduler.py) on top of the catalog fields.
+    """
+    if config is None:
+        config = get_config()
+    days = intent.days or 3
+    prefs = set(intent.preferences) if intent.preferences else set()
+
+    ranked_pois = _rank_pois(pois, prefs)
+    max_activity_days, target_activities_per_day = _activity_plan(days, len(ranked_pois), config)
+    items = _schedule_items(ranked_pois, days, max_activity_days, target_activities_per_day, config)
+    return _finish_itinerary(intent.destination, days, items, max_activity_days, config)
+
+
+def _schedule_items(ranked_pois: List[dict], days: int, max_activity_days: int,
+                    target_activities_per_day: int, config: PlannerConfig) -> List[ItineraryItem]:
+    """
+    Items for days 1..max_activity_days from the timed scheduler, by day and start time.
 
+    With config.optimize_routes, each day's visits are then reordered to
+    cut travel time and re-timed; a day keeps its scheduled order if the
+    shorter route can't fit every visit in its opening window.
+    """
+    dense = days <= config.dense_activity_days_threshold
+    day_caps = [_daily_cap(day, dense, target_activities_per_day, config)
+                for day in range(1, max_activity_days + 1)]
+    # Like the slot planner's second pass, short trips may top days up to two activities
+    repair_caps = [max(cap, 2) for cap in day_caps] if dense else day_caps
+    scheduler = Scheduler(
+        get_travel_times(),
+        day_start=config.day_start_hour * 60,
+        day_end=config.day_end_hour * 60,
+        default_duration=config.default_duration_minutes,
+        time_limit=config.scheduling_time_limit_ms / 1000
+    )
+    return [
+        ItineraryItem(
+            day=visit.day,
+            time=visit.time,
+            name=visit.poi.get("name", "Unknown"),
+            area=visit.poi.get("area", "Unknown"),
+            tags=visit.poi.get("tags", []),
+            url=visit.poi.get("url", ""),
+            duration_minutes=visit.duration_minutes
+        )
+        for visit in _route_visits(scheduler.schedule(ranked_pois, day_caps, repair_caps), scheduler, config)
+    ]
+
+
+def _route_visits(visits: List[ScheduledVisit], scheduler: Scheduler,
+                  config: PlannerConfig) -> List[ScheduledVisit]:
+    """Timed-mode counterpart of _optimize_routes: reorder and re-time each day's visits."""
+    if not config.optimize_routes:
+        return visits
+    by_day: Dict[int, List[ScheduledVisit]] = {}
+    for visit in visits:
+        by_day.setdefault(visit.day, []).append(visit)
+
+    routed: List[ScheduledVisit] = []
+    for day in sorted(by_day):
+        pois = [visit.poi for visit in by_day[day]]
+        order = optimize_route(pois, None, scheduler.travel, time_limit=config.route_time_limit_ms / 1000)
+        pois = [pois[index] for index in order]
+        timeline = scheduler.timeline(pois)
+        if timeline is None:
+            routed.extend(by_day[day])
+            continue
+        routed.extend(ScheduledVisit(poi=poi, day=day, start=start, end=end)
+                      for poi, (start, end) in zip(pois, timeline))
+    return routed
+
+
+def _group_items_by_day(items: List[ItineraryItem],
+                        max_activity_days: int) -> Iterator[Tuple[int, List[ItineraryItem]]]:
+    """(day, items) for days 1..max_activity_days, like _Allocator.iter_days."""
+    by_day: Dict[int, List[ItineraryItem]] = {}
+    for item in items:
+        by_day.setdefault(item.day, []).append(item)
+    for day in range(1, max_activity_days + 1):
+        yield day, by_day.get(day, [])
+
+
+def _optimize_routes(items: List[ItineraryItem], pois_by_name: Dict[str, dict],
+                     config: PlannerConfig) -> List[ItineraryItem]:
+    """
+    Reorder each day's visits to cut travel time (config.optimize_routes).
+
+    A day keeps its time slots; visits are reassigned to them in route order,
+    only where each POI is open at its new slot. Returns the items sorted by
+    day and time.
+    """
+    hours = dict(TIME_SLOTS)
+    travel = get_travel_times()
+    by_day: Dict[int, List[ItineraryItem]] = {}
+    for item in items:
+        by_day.setdefault(item.day, []).append(item)
+
+    routed: List[ItineraryItem] = []
+    for day in sorted(by_day):
+        day_items = sorted(by_day[day], key=lambda item: item.time)
+        times = [item.time for item in day_items]
+        order = optimize_route([pois_by_name[item.name] for item in day_items],
+                               [hours[t] for t in times], travel,
+                               time_limit=config.route_time_limit_ms / 1000)
+        for time_label, index in zip(times, order):
+            day_items[index].time = time_label
+            routed.append(day_items[index])
+    return routed
+
+
+def _unsupported_city_items(city: str) -> List[ItineraryItem]:
+    """Day-1 message listing the supported cities."""
+    supported = get_supported_cities()
+    return [
+        ItineraryItem(
+            day=1,
+            time="09:00",
+            name=f"Sorry, I don't have data for {city} yet.",
+            area="",
+            tags=[],
+            url=f"https://maps.google.com/?q={city}" if city else ""
+        ),
+        ItineraryItem(
+            day=1,
+            time="10:00",
+            name=f"I currently support: {', '.join(supported)}",
+            area="",
+            tags=[],
+            url=""
+        )
+    ]
+
+
+def _buffer_range(start: int, end: int) -> DayRange:
+    """Catch-all range for days the allocator left empty."""
+    return DayRange(
+        start_day=start,
+        end_day=end,
+        description="Free time / Rest",
+        activity_type="buffer"
+    )
+
+
+def _activity_plan(days: int, num_pois: int, config: PlannerConfig) -> Tuple[int, int]:
+    """
+    Decide how many days get individual activities and the per-day target.
+
+    Returns (max_activity_days, target_activities_per_day).
+    """
     # Determine how many days to generate detailed activities for
     # Be more generous - allow at least 1 activity per day if we have POIs
     if days <= config.dense_activity_days_threshold:
@@ -183,28 +698,22 @@ def build_itinerary(intent: TripIntent, config: PlannerConfig = None) -> Itinera
         max_activity_days = min(
             days,
             config.max_individual_activity_days,
-            len(ranked_pois)  # One POI can cover one day minimum
+            num_pois  # One POI can cover one day minimum
         )
     else:
         # For longer trips, be more conservative
         max_activity_days = min(
             days,
             config.max_individual_activity_days,
-            len(ranked_pois) // max(1, config.min_activities_per_day - 1) + 1
+            num_pois // max(1, config.min_activities_per_day - 1) + 1
         )
 
-    # Build itinerary items for early days (activity-dense period)
-    items: List[ItineraryItem] = []
-    area_list = list(by_area.items())
-    area_index = 0
-    used_poi_names = set()
-
     # Calculate target activities per day to distribute POIs evenly across requested days
     # Use round-robin approach: first give 1 POI to each day, then distribute remainder
-    if max_activity_days > 0 and len(ranked_pois) > 0:
+    if max_activity_days > 0 and num_pois > 0:
         # First pass: 1 POI per day
-        base_pois_per_day = min(1, len(ranked_pois) // max_activity_days)
-        remaining_pois = len(ranked_pois) - (base_pois_per_day * max_activity_days)
+        base_pois_per_day = min(1, num_pois // max_activity_days)
+        remaining_pois = num_pois - (base_pois_per_day * max_activity_days)
 
         # Second pass: distribute remainder
         extra_pois_per_day = remaining_pois // max_activity_days if max_activity_days > 0 else 0
@@ -215,7 +724,7 @@ def build_itinerary(intent: TripIntent, config: PlannerConfig = None) -> Itinera
 
         # For short trips with enough POIs, round down to spread more
         if days <= config.dense_activity_days_threshold:
-            avg = len(ranked_pois) / max_activity_days
+            avg = num_pois / max_activity_days
             if 1.0 <= avg < 2.0:
                 # Between 1-2 average, start with 1 and add extras later
                 target_activities_per_day = 1
@@ -225,238 +734,387 @@ def build_itinerary(intent: TripIntent, config: PlannerConfig = None) -> Itinera
     else:
         target_activities_per_day = config.max_activities_per_day
 
-    for day in range(1, max_activity_days + 1):
-        if area_index >= len(area_list):
-            # Cycle back through areas if we have more days than areas
-            area_index = 0
-
-        area_name, area_pois = area_list[area_index]
-        area_index += 1
+    return max_activity_days, target_activities_per_day
 
-        # Determine max activities for this day
-        # For short/medium trips, distribute POIs evenly
-        if days <= config.dense_activity_days_threshold:
-            max_activities_today = target_activities_per_day
-            # But ensure we try for at least 1 activity per day while POIs remain
-            if day <= max_activity_days and len(used_poi_names) < len(ranked_pois):
-                max_activities_today = max(1, target_activities_per_day)
-        else:
-            # For longer trips, taper off over time
-            if day <= config.activity_taper_start_day:
-                max_activities_today = config.max_activities_per_day
-            else:
-                taper_factor = (day - config.activity_taper_start_day) / 10
-                max_activities_today = max(
-                    1,  # At least 1 activity per day
-                    config.max_activities_per_day - int(taper_factor)
-                )
 
-        # For each day, try to fill time slots with POIs from the same area
-        slots_filled = 0
-
-        # For short trips, ensure we put at least 1 POI per day if available
-        min_for_today = 1 if (days <= config.dense_activity_days_threshold and
-                             len(used_poi_names) < len(ranked_pois)) else 0
-
-        for time_label, hour in TIME_SLOTS:
-            # Check if we have POIs left and haven't exceeded max for today
-            if len(used_poi_names) >= len(ranked_pois):
-                break  # All POIs used
-            # Allow at least min_for_today activities before respecting the limit
-            if slots_filled >= max_activities_today and slots_filled >= min_for_today:
-                break
-
-            # Find a POI that:
-            # 1. Hasn't been used yet
-            # 2. Is open at this time
-            # 3. Is from this area (preferred)
-            found = False
-            for poi in area_pois:
-                poi_name = poi.get("name", "Unknown")
-                if poi_name in used_poi_names:
-                    continue
-
-                open_start, open_end = poi.get("open", (9, 18))
-                if open_start <= hour <= open_end:
-                    # This POI works for this time slot!
-                    items.append(
-                        ItineraryItem(
-                            day=day,
-                            time=time_label,
-                            name=poi_name,
-                            area=area_name,
-                            tags=poi.get("tags", []),
-                            url=poi.get("url", "")
-                        )
-                    )
-                    used_poi_names.add(poi_name)
-                    slots_filled += 1
-                    found = True
-                    break
-
-            # If we didn't find a POI from this area, try any unused POI
-            # Be less strict about minimum - if we have POIs left, use them
-            if not found and len(used_poi_names) < len(ranked_pois):
-                for poi in ranked_pois:
-                    poi_name = poi.get("name", "Unknown")
-                    if poi_name in used_poi_names:
-                        continue
-
-                    open_start, open_end = poi.get("open", (9, 18))
-                    if open_start <= hour <= open_end:
-                        items.append(
-                            ItineraryItem(
-                                day=day,
-                                time=time_label,
-                                name=poi_name,
-                                area=poi.get("area", "Unknown"),
-                                tags=poi.get("tags", []),
-                                url=poi.get("url", "")
-                            )
-                        )
-                        used_poi_names.add(poi_name)
-                        slots_filled += 1
-                        break
-
-    # Second pass: If we still have unused POIs and days with < 2 activities, add more
-    if len(used_poi_names) < len(ranked_pois) and days <= config.dense_activity_days_threshold:
-        for day in range(1, max_activity_days + 1):
-            if len(used_poi_names) >= len(ranked_pois):
-                break  # All POIs now used
-
-            day_items = [item for item in items if item.day == day]
-            if len(day_items) < 2:  # Add one more activity to this day
-                # Find an unused POI
-                for poi in ranked_pois:
-                    poi_name = poi.get("name", "Unknown")
-                    if poi_name in used_poi_names:
-                        continue
-
-                    # Add it to this day
-                    # Find a time slot not already used
-                    used_times = {item.time for item in day_items}
-                    for time_label, hour in TIME_SLOTS:
-                        if time_label not in used_times:
-                            open_start, open_end = poi.get("open", (9, 18))
-                            if open_start <= hour <= open_end:
-                                items.append(
-                                    ItineraryItem(
-                                        day=day,
-                                        time=time_label,
-                                        name=poi_name,
-                                        area=poi.get("area", "Unknown"),
-                                        tags=poi.get("tags", []),
-                                        url=poi.get("url", "")
-                                    )
-                                )
-                                used_poi_names.add(poi_name)
-                                break
-                    break  # Move to next day
-
-    # Create day ranges for remaining days
+def _rest_day_ranges(days: int, max_activity_days: int, config: PlannerConfig) -> List[DayRange]:
+    """Rest/buffer ranges covering the days after the activity period."""
     day_ranges: List[DayRange] = []
+    if max_activity_days >= days:
+        return day_ranges
 
-    if max_activity_days < days:
-        # We have remaining days - create day ranges
-        remaining_start = max_activity_days + 1
-        remaining_end = days
-
-        # Decide how to describe these days based on trip length
-        if days <= config.dense_activity_days_threshold:
-            # Short trip - call them "free exploration"
-            description = "Free exploration / Rest days"
-            activity_type = "free_exploration"
-        elif days <= config.auto_range_threshold_days:
-            # Medium trip - more relaxed description
-            description = "Leisure time / Optional activities"
-            activity_type = "buffer"
-        else:
-            # Long trip - clearly indicate rest period
-            description = "Extended rest period / Free time to explore at your own pace"
-            activity_type = "rest"
+    # We have remaining days - create day ranges
+    remaining_start = max_activity_days + 1
+    remaining_end = days
 
+    # Decide how to describe these days based on trip length
+    if days <= config.dense_activity_days_threshold:
+        # Short trip - call them "free exploration"
+        description = "Free exploration / Rest days"
+        activity_type = "free_exploration"
+    elif days <= config.auto_range_threshold_days:
+        # Medium trip - more relaxed description
+        description = "Leisure time / Optional activities"
+        activity_type = "buffer"
+    else:
+        # Long trip - clearly indicate rest period
+        description = "Extended rest period / Free time to explore at your own pace"
+        activity_type = "rest"
+
+    if days > 100:
+        # Very long trip - one symbolic range of numbered weekly blocks,
+        # so the itinerary stays the same size however long the tail is
+        day_ranges.append(
+            PeriodicDayRange(
+                start_day=remaining_start,
+                end_day=remaining_end,
+                description=description,
+                activity_type=activity_type,
+                period_days=7
+            )
+        )
+    else:
         # Create ranges in reasonable chunks (max 7 days per range for readability)
         current_start = remaining_start
         while current_start <= remaining_end:
-            # Create ranges of max 7 days each
             chunk_end = min(current_start + 6, remaining_end)
-
-            # Customize description based on position
-            if days > 100:
-                # Very long trip - be more specific
-                chunk_desc = f"{description} — Week {(current_start - 1) // 7 + 1}"
-            else:
-                chunk_desc = description
-
             day_ranges.append(
                 DayRange(
                     start_day=current_start,
                     end_day=chunk_end,
-                    description=chunk_desc,
+                    description=description,
                     activity_type=activity_type
                 )
             )
-
             current_start = chunk_end + 1
 
-    # Create the itinerary
-    itinerary = Itinerary(
-        destination=city,
-        days=days,
-        items=items,
-        day_ranges=day_ranges
-    )
+    return day_ranges
 
-    # CRITICAL: Verify we're covering all days
-    uncovered = itinerary.get_uncovered_days()
-    if uncovered:
-        # This should never happen, but if it does, create a catch-all range
-        # Group consecutive uncovered days
-        ranges_to_add = _group_consecutive_days(uncovered)
-        for start, end in ranges_to_add:
-            day_ranges.append(
-                DayRange(
-                    start_day=start,
-                    end_day=end,
-                    description="Free time / Rest",
-                    activity_type="buffer"
-                )
-            )
 
-    return itinerary
+def _is_open(poi: dict, hour: int) -> bool:
+    open_start, open_end = poi.get("open", (9, 18))
+    return open_start <= hour <= open_end
 
 
-def _group_consecutive_days(days: List[int]) -> List[tuple]:
+def _slot_duration(poi: dict, slot: ItineraryItem, config: PlannerConfig,
+                   next_start: Optional[int] = None) -> Optional[int]:
     """
-    Group consecutive days into ranges.
+    Duration `poi` gets if it takes over `slot`, or None if it can't.
 
-    Args:
-        days: Sorted list of day numbers
+    In "slots" mode the POI must be open at the slot's hour and keeps the
+    slot's duration. In "timed" mode it keeps the slot's start time but
+    brings its own duration, and must be open from start to finish within
+    the planning day, ending by `next_start` (minutes after midnight; the
+    day's next activity) if given.
+    """
+    hour, minute = (int(part) for part in slot.time.split(":"))
+    if config.scheduling_mode != "timed":
+        return slot.duration_minutes if _is_open(poi, hour) else None
+    start = hour * 60 + minute
+    duration = poi.get("duration_minutes") or config.default_duration_minutes
+    open_start, open_end = opening_minutes(poi)
+    end_limit = min(open_end, config.day_end_hour * 60)
+    if next_start is not None:
+        end_limit = min(end_limit, next_start)
+    if start < max(open_start, config.day_start_hour * 60) or start + duration > end_limit:
+        return None
+    return duration
+
+
+def _next_starts(items: List[ItineraryItem]) -> List[Optional[int]]:
+    """For each item, the start (minutes after midnight) of the next activity on its day, or None."""
+    order = sorted(range(len(items)), key=lambda i: (items[i].day, items[i].time))
+    next_starts: List[Optional[int]] = [None] * len(items)
+    for i, j in zip(order, order[1:]):
+        if items[i].day == items[j].day:
+            hour, minute = (int(part) for part in items[j].time.split(":"))
+            next_starts[i] = hour * 60 + minute
+    return next_starts
+
+
+def _rank_pois(pois: List[dict], prefs: set) -> List[dict]:
+    """Sort POIs by preference match (high priority), then opening window length."""
+    def score_poi(poi: dict) -> tuple:
+        poi_tags = set(poi.get("tags", []))
+        preference_match = len(poi_tags & prefs) if prefs else 0
+        open_start, open_end = poi.get("open", (9, 18))
+        availability_hours = open_end - open_start
+        return (preference_match, availability_hours)
 
-    Returns:
-        List of (start_day, end_day) tuples
+    # Stable sort: equal scores keep catalog order
+    return sorted(pois, key=score_poi, reverse=True)
+
+
+def _rank_for_slots(pois: List[dict], prefs: set,
+                    config: PlannerConfig) -> Tuple[List[dict], Union[List[List[dict]], None]]:
+    """
+    Ranked POIs plus, when vectorized scoring is on, the POIs open at each slot.
+
+    Falls back to the pure-Python ranking (and lets _PoiPool check opening
+    hours itself) when NumPy isn't installed.
+    """
+    if config.vectorized_scoring:
+        matrix = get_poi_matrix(pois)
+        if matrix is not None:
+            return matrix.rank_with_slots(prefs, [hour for _, hour in TIME_SLOTS])
+    return _rank_pois(pois, prefs), None
+
+
+def _group_by_area(ranked_pois: List[dict]) -> Dict[str, List[dict]]:
+    """Group ranked POIs by area for geographic clustering (rank order kept)."""
+    by_area: Dict[str, List[dict]] = {}
+    for poi in ranked_pois:
+        area = poi.get("area", "Unknown")
+        by_area.setdefault(area, []).append(poi)
+    return by_area
+
+
+def _daily_cap(day: int, dense: bool, target_activities_per_day: int, config: PlannerConfig) -> int:
+    """Most activities to plan on `day`."""
+    if dense:
+        # Short/medium trips: distribute POIs evenly
+        return target_activities_per_day
+    if day <= config.activity_taper_start_day:
+        return config.max_activities_per_day
+    # Longer trips taper off over time
+    taper_factor = (day - config.activity_taper_start_day) / 10
+    return max(1, config.max_activities_per_day - int(taper_factor))
+
+
+class _PoiPool:
+    """
+    Unused POIs, indexed for slot filling.
+
+    For every time slot there is a rank-ordered queue of the POIs open at that
+    hour, both overall and per area. A queue's cursor only moves forward past
+    POIs that have been used, so "best unused POI open at 15:00 in Shibuya"
+    is amortised O(1) and allocation stays linear after the initial sort.
+
+    POIs are tracked by name, as before: once a name is used, every POI with
+    that name counts as used.
+    """
+
+    def __init__(self, ranked_pois: List[dict], open_at: List[List[dict]] = None):
+        self.ranked = ranked_pois
+        self.used_names = set()
+        self._queues: Dict[tuple, List[dict]] = {}
+        self._cursors: Dict[tuple, int] = {}
+
+        # open_at[s] lists the ranked POIs open at TIME_SLOTS[s] (precomputed
+        # by the vectorized path); per-area queues are split out of it, which
+        # keeps rank order within each area
+        if open_at is None:
+            open_at = [[poi for poi in ranked_pois if _is_open(poi, hour)] for _, hour in TIME_SLOTS]
+        for (_, hour), open_pois in zip(TIME_SLOTS, open_at):
+            self._queues[(None, hour)] = open_pois
+            for poi in open_pois:
+                self._queues.setdefault((poi.get("area", "Unknown"), hour), []).append(poi)
+        self._queues[(None, None)] = ranked_pois
+
+    @property
+    def exhausted(self) -> bool:
+        """True once as many names are used as there are POIs."""
+        return len(self.used_names) >= len(self.ranked)
+
+    def _peek(self, key: tuple):
+        queue = self._queues.get(key)
+        if not queue:
+            return None
+        i = self._cursors.get(key, 0)
+        used = self.used_names
+        while i < len(queue) and queue[i].get("name", "Unknown") in used:
+            i += 1
+        self._cursors[key] = i
+        return queue[i] if i < len(queue) else None
+
+    def best_open_in_area(self, area: str, hour: int):
+        """Highest-ranked unused POI in `area` open at `hour`, or None."""
+        return self._peek((area, hour))
+
+    def best_open(self, hour: int):
+        """Highest-ranked unused POI open at `hour`, or None."""
+        return self._peek((None, hour))
+
+    def best_unused(self):
+        """Highest-ranked unused POI regardless of opening hours, or None."""
+        return self._peek((None, None))
+
+    def best_matching(self, accept, area: str = None):
+        """
+        Highest-ranked unused POI (in `area`, if given) for which accept(poi) is true, or None.
+
+        A linear scan, for checks the slot queues can't answer (e.g. timed
+        visits starting at any minute).
+        """
+        used = self.used_names
+        for poi in self.ranked:
+            if poi.get("name", "Unknown") in used or (area is not None and poi.get("area", "Unknown") != area):
+                continue
+            if accept(poi):
+                return poi
+        return None
+
+    def use(self, poi: dict):
+        self.used_names.add(poi.get("name", "Unknown"))
+
+    def release(self, names):
+        """Count `names` as unused again (cursors restart, since they may have skipped them)."""
+        self.used_names.difference_update(names)
+        self._cursors.clear()
+
+    def fork(self, used_names: set) -> "_PoiPool":
+        """Pool over the same queues in which exactly `used_names` are used."""
+        pool = copy.copy(self)
+        pool.used_names = set(used_names)
+        pool._cursors = {}
+        return pool
+
+
+class _Allocator:
+    """
+    Assigns POIs to time slots on days 1..max_activity_days.
+
+    First pass walks the days round-robin over areas, filling each slot with
+    the best open POI from that day's area, else the best open POI anywhere.
+    Short trips then get a second pass topping days with fewer than two
+    activities up from the remaining POIs.
     """
-    if not days:
-        return []
 
-    ranges = []
-    start = days[0]
-    prev = days[0]
+    def __init__(self, ranked_pois: List[dict], by_area: Dict[str, List[dict]],
+                 max_activity_days: int, target_activities_per_day: int,
+                 config: PlannerConfig, dense: bool, keep_items: bool = True,
+                 open_at: List[List[dict]] = None, pool: "_PoiPool" = None):
+        self.pool = pool if pool is not None else _PoiPool(ranked_pois, open_at)
+        self.area_names = list(by_area)
+        self.max_activity_days = max_activity_days
+        self.target_activities_per_day = target_activities_per_day
+        self.config = config
+        self.dense = dense
+        # Items in allocation order (first pass, then second pass); skipped when streaming
+        self.items: List[ItineraryItem] = [] if keep_items else None
+        self.items_by_day: Dict[int, List[ItineraryItem]] = {}
+        # POI behind each allocated item, for route optimization
+        self.pois_by_name: Dict[str, dict] = {}
+
+    def run(self) -> List[ItineraryItem]:
+        """Allocate every activity day and return the items."""
+        self.first_pass()
+        if self.dense:
+            self.top_up()
+        return self.items
+
+    def first_pass(self):
+        """Fill every activity day in order."""
+        for day in range(1, self.max_activity_days + 1):
+            self.fill_day(day)
+
+    def iter_days(self) -> Iterator[Tuple[int, List[ItineraryItem]]]:
+        """
+        Yield (day, items) for each activity day once it can no longer change.
+
+        Dense trips finish both passes first; longer trips have no second
+        pass, so each day is final as soon as it's filled and is released
+        from memory after being yielded.
+        """
+        if self.dense:
+            self.run()
+            for day in range(1, self.max_activity_days + 1):
+                yield day, self.items_by_day.get(day, [])
+            return
+
+        for day in range(1, self.max_activity_days + 1):
+            self.fill_day(day)
+            yield day, self.items_by_day.pop(day, [])
+
+    def fork(self, max_activity_days: int) -> "_Allocator":
+        """
+        Independent copy of this allocator cut back to days 1..max_activity_days.
+
+        Items are copied and the pool only counts their POIs as used, so the
+        fork is in the state a fresh first pass over those days would leave.
+        """
+        fork = copy.copy(self)
+        fork.max_activity_days = max_activity_days
+        fork.items_by_day = {
+            day: [copy.copy(item) for item in self.items_by_day[day]]
+            for day in range(1, max_activity_days + 1) if day in self.items_by_day
+        }
+        fork.items = [item for day_items in fork.items_by_day.values() for item in day_items]
+        fork.pool = self.pool.fork({item.name for item in fork.items})
+        return fork
+
+    def _add(self, day: int, time_label: str, poi: dict, area: str):
+        item = ItineraryItem(
+            day=day,
+            time=time_label,
+            name=poi.get("name", "Unknown"),
+            area=area,
+            tags=poi.get("tags", []),
+            url=poi.get("url", "")
+        )
+        if self.items is not None:
+            self.items.append(item)
+        self.items_by_day.setdefault(day, []).append(item)
+        self.pois_by_name.setdefault(item.name, poi)
+        self.pool.use(poi)
+
+    def fill_day(self, day: int):
+        """First pass for one day."""
+        pool = self.pool
+        config = self.config
+
+        # Cycle through areas if we have more days than areas
+        area_name = self.area_names[(day - 1) % len(self.area_names)]
 
-    for day in days[1:]:
-        if day == prev + 1:
-            # Consecutive
-            prev = day
-        else:
-            # Gap found - close current range
-            ranges.append((start, prev))
-            start = day
-            prev = day
+        # Determine max activities for this day
+        max_activities_today = _daily_cap(day, self.dense, self.target_activities_per_day, config)
+        if self.dense and not pool.exhausted:
+            # Short/medium trips: distribute POIs evenly, at least 1 while POIs remain
+            max_activities_today = max(1, max_activities_today)
+
+        # For short trips, ensure we put at least 1 POI per day if available
+        min_for_today = 1 if (self.dense and not pool.exhausted) else 0
+        slots_filled = 0
+
+        for time_label, hour in TIME_SLOTS:
+            if pool.exhausted:
+                break
+            # Allow at least min_for_today activities before respecting the limit
+            if slots_filled >= max_activities_today and slots_filled >= min_for_today:
+                break
 
-    # Close final range
-    ranges.append((start, prev))
+            # Prefer a POI from this day's area, else any unused POI open now
+            poi = pool.best_open_in_area(area_name, hour)
+            if poi is not None:
+                self._add(day, time_label, poi, area_name)
+                slots_filled += 1
+                continue
+            poi = pool.best_open(hour)
+            if poi is not None:
+                self._add(day, time_label, poi, poi.get("area", "Unknown"))
+                slots_filled += 1
+
+    def top_up(self):
+        """Second pass: if we still have unused POIs and days with < 2 activities, add more."""
+        pool = self.pool
+        for day in range(1, self.max_activity_days + 1):
+            if pool.exhausted:
+                break
 
-    return ranges
+            day_items = self.items_by_day.get(day, [])
+            if len(day_items) >= 2:
+                continue
+
+            # Place the best unused POI in the first free slot where it's open;
+            # if none fits, leave this day as it is
+            poi = pool.best_unused()
+            if poi is None:
+                break
+            used_times = {item.time for item in day_items}
+            for time_label, hour in TIME_SLOTS:
+                if time_label not in used_times and _is_open(poi, hour):
+                    self._add(day, time_label, poi, poi.get("area", "Unknown"))
+                    break
 
 
 # Backward compatibility: keep old function name
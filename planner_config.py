@@ -1,7 +1,12 @@
 # planner_config.py
 # Configuration options for itinerary planning and day range merging
 
-from dataclasses import dataclass
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+
+# Settings that don't change the plan, so cached plans are shared across them
+_NOT_FINGERPRINTED = ("collect_timings",)
 
 
 @dataclass
@@ -39,6 +44,39 @@ class PlannerConfig:
     # For trips over this length, automatically summarize the tail
     auto_range_threshold_days: int = 30
 
+    # Score POIs and check opening hours with NumPy (see poi_matrix.py).
+    # Same results, faster on large catalogs; ignored if NumPy isn't installed
+    vectorized_scoring: bool = False
+
+    # Reorder each day's visits to cut travel time between them (see routing.py),
+    # spending at most route_time_limit_ms per day. "slots" days keep their slots;
+    # "timed" days are re-timed in the new order, if it still fits opening hours
+    optimize_routes: bool = False
+    route_time_limit_ms: float = 20.0
+
+    # "slots" puts activities in the fixed 09/12/15/18 slots; "timed" packs them
+    # by duration, opening hours and travel time (see scheduler.py)
+    scheduling_mode: str = "slots"
+    day_start_hour: int = 9
+    day_end_hour: int = 21
+    default_duration_minutes: int = 120  # For POIs without a duration
+    # Repair is bounded by an iteration budget, so timed plans are deterministic.
+    # This is only a safety net: past it repair stops early and logs a warning
+    scheduling_time_limit_ms: float = 1000.0
+
+    # Record per-phase wall-clock time on each itinerary (Itinerary.timings);
+    # also on whenever a metrics callback is set (see phase_timer.py).
+    # Left out of fingerprint(): timing a plan doesn't change it
+    collect_timings: bool = False
+
+    def fingerprint(self) -> str:
+        """Stable short hash of every setting that affects the plan, for cache keys."""
+        settings = asdict(self)
+        for name in _NOT_FINGERPRINTED:
+            del settings[name]
+        payload = json.dumps(settings, sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
 
 # Default configuration singleton
 DEFAULT_CONFIG = PlannerConfig()
@@ -0,0 +1,271 @@
+# planning_service.py
+# Runs CPU-bound planning in a warm process pool, off the web server's request threads
+# Bounded queue, per-job timeouts and a compact tuple format between processes
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional, Tuple
+
+import data_sources
+from exporters import itinerary_to_markdown
+from intent import TripIntent
+from itinerary_cache import ItineraryCache, cached_build_itinerary, get_itinerary_cache, make_cache_key
+from planner import DayRange, Itinerary, ItineraryItem, PeriodicDayRange
+from planner_config import PlannerConfig, get_config
+
+DEFAULT_TIMEOUT_SECONDS = 10.0
+
+# Jobs allowed in the pool (queued or running) per worker before new ones are turned away
+DEFAULT_PENDING_PER_WORKER = 4
+
+
+class ServiceBusyError(Exception):
+    """Raised when the planning queue is full."""
+
+
+class PlanTimeoutError(Exception):
+    """Raised when a planning job doesn't finish within its timeout."""
+
+
+def pack_itinerary(itinerary: Itinerary) -> tuple:
+    """
+    Itinerary as (destination, days, item rows, range rows, timings).
+
+    Used between processes: plain tuples pickle about a third smaller than
+    the dataclasses and round-trip about three times faster.
+    """
+    items = [(i.day, i.time, i.name, i.area, i.tags, i.url, i.duration_minutes) for i in itinerary.items]
+    ranges = [(r.start_day, r.end_day, r.description, r.activity_type,
+               r.period_days if isinstance(r, PeriodicDayRange) else None)
+              for r in itinerary.day_ranges]
+    return (itinerary.destination, itinerary.days, items, ranges, itinerary.timings)
+
+
+def unpack_itinerary(packed: tuple) -> Itinerary:
+    """Inverse of pack_itinerary."""
+    destination, days, items, ranges, timings = packed
+    day_ranges: List[DayRange] = []
+    for start, end, description, activity_type, period in ranges:
+        if period is None:
+            day_ranges.append(DayRange(start, end, description, activity_type))
+        else:
+            day_ranges.append(PeriodicDayRange(start, end, description, activity_type, period_days=period))
+    return Itinerary(destination=destination, days=days,
+                     items=[ItineraryItem(*row) for row in items],
+                     day_ranges=day_ranges, timings=timings)
+
+
+def _init_worker(destinations: Dict[str, Dict[str, List[dict]]]):
+    """Pool initializer: install the parent's catalog and warm each city's POI ranking."""
+    for city in list(data_sources.DESTINATIONS):
+        if city not in destinations:
+            data_sources.remove_destination(city)
+    for city, city_data in destinations.items():
+        if data_sources.DESTINATIONS.get(city) != city_data:
+            data_sources.register_destination(city, city_data.get("pois", []))
+    for city in destinations:
+        data_sources.fetch_pois(city)
+
+
+def _plan_job(destination: str, days: int, preferences: List[str], config: PlannerConfig) -> tuple:
+    """Worker task: (packed itinerary, markdown). Plans use the worker's own cache."""
+    intent = TripIntent(destination=destination, days=days, preferences=preferences)
+    itinerary = cached_build_itinerary(intent, config)
+    return pack_itinerary(itinerary), itinerary_to_markdown(itinerary)
+
+
+class PlanningService:
+    """
+    Plans catalog trips in a pool of worker processes.
+
+    Workers are started once and get a copy of the catalog when they start;
+    if the catalog changes (data_sources.get_catalog_version()), the pool is
+    replaced before the next job. They are spawned rather than forked, so a
+    worker never inherits a lock some other thread of the web server held
+    at fork time. Each worker keeps its own itinerary cache, and the
+    caller's process checks the shared cache first, so repeated requests
+    never leave the process. Other CPU-bound work (e.g. variant generation)
+    can share the pool through submit().
+
+    At most `max_pending` jobs are in the pool at once, running or queued;
+    plan() raises ServiceBusyError beyond that rather than queueing without
+    bound. A job that takes longer than `timeout` raises PlanTimeoutError
+    in the caller. A job still queued at that point is cancelled. One
+    already running can't be interrupted, and it keeps its queue slot until
+    it finishes.
+
+    Args:
+        workers: Worker processes (default: CPU count)
+        max_pending: Queue bound (default: DEFAULT_PENDING_PER_WORKER per worker)
+        timeout: Seconds to wait for a job
+        executor: Use this executor instead of a process pool (for tests);
+            it is not replaced when the catalog changes
+        cache: Cache checked before submitting (default: the process-wide one)
+    """
+
+    def __init__(self, workers: int = None, max_pending: int = None,
+                 timeout: float = DEFAULT_TIMEOUT_SECONDS, executor: Executor = None,
+                 cache: ItineraryCache = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or DEFAULT_PENDING_PER_WORKER * self.workers
+        self.timeout = timeout
+        self.cache = cache if cache is not None else get_itinerary_cache()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._catalog_version: Optional[int] = None
+        # Counters for health output
+        self._submitted = 0
+        self._cache_hits = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._restarts = 0
+
+    def plan(self, intent: TripIntent, config: PlannerConfig = None) -> Tuple[Itinerary, str]:
+        """
+        (itinerary, markdown) for a catalog city, like cached_build_itinerary
+        followed by itinerary_to_markdown.
+
+        Raises ServiceBusyError or PlanTimeoutError as described above.
+        """
+        if config is None:
+            config = get_config()
+        key = make_cache_key(intent, config)
+        itinerary = self.cache.get(key) if key is not None else None
+        if itinerary is not None:
+            with self._lock:
+                self._cache_hits += 1
+            itinerary.destination = intent.destination
+            return itinerary, itinerary_to_markdown(itinerary)
+
+        future = self.submit(_plan_job, intent.destination, intent.days or 3,
+                             list(intent.preferences or []), config)
+        try:
+            packed, markdown = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self._timed_out += 1
+            raise PlanTimeoutError(f"Planning took longer than {self.timeout:g}s")
+
+        itinerary = unpack_itinerary(packed)
+        if key is not None:
+            self.cache.put(key, itinerary)
+        return itinerary, markdown
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """
+        Run fn(*args) in the pool, counted against the same queue bound as plan().
+
+        fn must be a module-level function and its arguments picklable.
+        Raises ServiceBusyError when the queue is full. Where processes
+        can't be started, fn runs in the calling thread and the returned
+        future is already done.
+        """
+        executor = self._get_executor()
+        if executor is None:
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ServiceBusyError(f"Planning queue is full ({self.max_pending} jobs)")
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        with self._lock:
+            self._submitted += 1
+        return future
+
+    def _get_executor(self) -> Optional[Executor]:
+        """
+        The pool, (re)started if the catalog changed since it was created.
+
+        Returns None where processes can't be started (jobs then run in the
+        calling thread, as before).
+        """
+        with self._lock:
+            version = data_sources.get_catalog_version()
+            if self._owns_executor and (self._executor is None or version != self._catalog_version):
+                if self._executor is not None:
+                    # Jobs already submitted still finish on the old workers
+                    self._executor.shutdown(wait=False)
+                    self._executor = None
+                    self._restarts += 1
+                try:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker, initargs=(dict(data_sources.DESTINATIONS),))
+                except (OSError, NotImplementedError) as e:
+                    print(f"Planning process pool unavailable: {e}")
+                    return None
+                self._catalog_version = version
+            return self._executor
+
+    def start(self):
+        """Start the workers now instead of on the first request."""
+        executor = self._get_executor()
+        if self._owns_executor and executor is not None:
+            # Submitting work is what spawns the processes
+            for future in [executor.submit(os.getpid) for _ in range(self.workers)]:
+                future.result()
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            if self._executor is not None and self._owns_executor:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "timeout_seconds": self.timeout,
+                "submitted": self._submitted,
+                "cache_hits": self._cache_hits,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "restarts": self._restarts,
+            }
+
+
+# Service used by the web backend, created on first use
+_SERVICE: Optional[PlanningService] = None
+_SERVICE_LOCK = threading.Lock()
+
+
+def get_planning_service() -> PlanningService:
+    """
+    Get the process-wide planning service.
+
+    Reads PLANNING_WORKERS, PLANNING_MAX_PENDING and PLANNING_TIMEOUT_SECONDS
+    from the environment the first time it is called.
+    """
+    global _SERVICE
+    with _SERVICE_LOCK:
+        if _SERVICE is None:
+            _SERVICE = PlanningService(
+                workers=int(os.getenv("PLANNING_WORKERS", "0")) or None,
+                max_pending=int(os.getenv("PLANNING_MAX_PENDING", "0")) or None,
+                timeout=float(os.getenv("PLANNING_TIMEOUT_SECONDS", DEFAULT_TIMEOUT_SECONDS)),
+            )
+        return _SERVICE
+
+
+def set_planning_service(service: Optional[PlanningService]):
+    """Replace the process-wide planning service."""
+    global _SERVICE
+    with _SERVICE_LOCK:
+        _SERVICE = service
@@ -0,0 +1,121 @@
+# poi_matrix.py
+# Optional NumPy-vectorized POI scoring and slot feasibility
+# Enabled with PlannerConfig(vectorized_scoring=True); falls back to pure Python without NumPy
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+
+def numpy_available() -> bool:
+    """True if the vectorized path can be used."""
+    return np is not None
+
+
+class PoiMatrix:
+    """
+    Column-oriented view of one city's POI catalog.
+
+    Built once per catalog: a POI × tag 0/1 matrix plus opening/closing hour
+    arrays. Ranking a request is then one matrix-vector product and a stable
+    lexsort, and slot feasibility for every POI is one broadcast comparison.
+
+    Results match the pure-Python planner exactly: tags are counted once per
+    POI (like the set intersection in _rank_pois), and ties keep catalog order
+    (like Python's stable sort).
+    """
+
+    def __init__(self, pois: List[dict]):
+        if np is None:
+            raise ImportError("NumPy is required for PoiMatrix")
+        self.pois = pois
+
+        self.tag_index: Dict[str, int] = {}
+        rows, cols = [], []
+        for i, poi in enumerate(pois):
+            for tag in set(poi.get("tags", [])):
+                rows.append(i)
+                cols.append(self.tag_index.setdefault(tag, len(self.tag_index)))
+
+        self.tags = np.zeros((len(pois), max(1, len(self.tag_index))), dtype=np.float32)
+        self.tags[rows, cols] = 1.0
+
+        hours = np.array([poi.get("open", (9, 18)) for poi in pois], dtype=np.float64).reshape(-1, 2)
+        self.open_start = hours[:, 0]
+        self.open_end = hours[:, 1]
+        self.availability = self.open_end - self.open_start
+
+    def __len__(self) -> int:
+        return len(self.pois)
+
+    def preference_vector(self, prefs: Sequence[str]):
+        """0/1 vector over this catalog's tags (unknown preferences are ignored)."""
+        vector = np.zeros(self.tags.shape[1], dtype=np.float32)
+        for pref in prefs:
+            index = self.tag_index.get(pref)
+            if index is not None:
+                vector[index] = 1.0
+        return vector
+
+    def preference_matches(self, prefs: Sequence[str]):
+        """Number of preferred tags on each POI."""
+        if not prefs:
+            return np.zeros(len(self.pois), dtype=np.int64)
+        return (self.tags @ self.preference_vector(prefs)).round().astype(np.int64)
+
+    def rank(self, prefs: Sequence[str]):
+        """
+        POI indices, best first: preference matches, then opening window length.
+
+        np.lexsort is stable, so equal scores keep catalog order.
+        """
+        matches = self.preference_matches(prefs)
+        return np.lexsort((-self.availability, -matches))
+
+    def feasibility(self, hours: Sequence[int], order=None):
+        """Boolean POI × slot mask: True where the POI is open at that hour."""
+        hours = np.asarray(hours, dtype=np.float64)
+        start, end = self.open_start, self.open_end
+        if order is not None:
+            start, end = start[order], end[order]
+        return (start[:, None] <= hours[None, :]) & (hours[None, :] <= end[:, None])
+
+    def rank_with_slots(self, prefs: Sequence[str], hours: Sequence[int]) -> Tuple[List[dict], List[List[dict]]]:
+        """
+        Ranked POIs and, for each hour, the ranked POIs open at that hour.
+
+        This is everything the allocator needs from the catalog.
+        """
+        order = self.rank(prefs)
+        ranked = [self.pois[i] for i in order.tolist()]
+        mask = self.feasibility(hours, order)
+        open_at = [[ranked[i] for i in np.flatnonzero(mask[:, s]).tolist()] for s in range(mask.shape[1])]
+        return ranked, open_at
+
+
+# One matrix per catalog list; fetch_pois hands back the same list per city
+_MATRIX_CACHE: Dict[int, Tuple[List[dict], int, PoiMatrix]] = {}
+_MATRIX_CACHE_SIZE = 32
+
+
+def get_poi_matrix(pois: List[dict]) -> Optional[PoiMatrix]:
+    """
+    Cached PoiMatrix for a catalog list, or None without NumPy.
+
+    The cache is keyed on the list object and its length, so appending POIs
+    rebuilds the matrix; editing a POI in place does not.
+    """
+    if np is None:
+        return None
+    cached = _MATRIX_CACHE.get(id(pois))
+    if cached is not None and cached[0] is pois and cached[1] == len(pois):
+        return cached[2]
+
+    matrix = PoiMatrix(pois)
+    if len(_MATRIX_CACHE) >= _MATRIX_CACHE_SIZE:
+        _MATRIX_CACHE.pop(next(iter(_MATRIX_CACHE)))
+    _MATRIX_CACHE[id(pois)] = (pois, len(pois), matrix)
+    return matrix
@@ -0,0 +1,254 @@
+# preference_classifier.py
+# Lightweight in-process preference classifier
+# One-vs-rest logistic regression over hashed word n-grams, trained offline
+
+import json
+import math
+import os
+import re
+import random
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+# Repository data directory holding the corpus and shipped weights
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+CORPUS_PATH = os.path.join(DATA_DIR, "preference_corpus.jsonl")
+
+# Bump MODEL_VERSION whenever features or the corpus change meaningfully
+MODEL_VERSION = 1
+MODEL_PATH = os.path.join(DATA_DIR, f"preference_model_v{MODEL_VERSION}.json")
+
+# Feature hashing space (word unigrams + bigrams)
+NUM_BUCKETS = 1 << 14
+
+# Drop weights smaller than this when saving to keep the file tiny
+PRUNE_BELOW = 0.6
+
+_TOKEN_RE = re.compile(r"[a-z]+")
+
+
+def extract_features(text: str) -> List[int]:
+    """Hash lowercase word unigrams and bigrams into bucket ids (stable across runs)."""
+    tokens = _TOKEN_RE.findall(text.lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return list({zlib.crc32(g.encode("utf-8")) % NUM_BUCKETS for g in grams})
+
+
+class PreferenceClassifier:
+    """
+    Multi-label classifier for the PREFERENCE_KEYWORDS categories.
+
+    Weights are stored bucket-major ({bucket: [(label_index, weight), ...]})
+    so inference touches only the handful of buckets present in the text.
+    """
+
+    def __init__(self, labels: List[str], weights: Dict[int, List[Tuple[int, float]]],
+                 bias: List[float], threshold: float = 0.5, metadata: Optional[dict] = None):
+        self.labels = labels
+        self.weights = weights
+        self.bias = bias
+        self.threshold = threshold
+        self.metadata = metadata or {}
+        # Logit equivalent of the probability threshold, so predict() skips the sigmoid
+        self._logit_threshold = math.log(threshold / (1 - threshold))
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Probability per label."""
+        logits = self._logits(extract_features(text))
+        return {label: 1 / (1 + math.exp(-z)) for label, z in zip(self.labels, logits)}
+
+    def predict(self, text: str) -> List[str]:
+        """Labels above the threshold, in training label order."""
+        logits = self._logits(extract_features(text))
+        return [label for label, z in zip(self.labels, logits) if z > self._logit_threshold]
+
+    def _logits(self, features: List[int]) -> List[float]:
+        logits = list(self.bias)
+        weights = self.weights
+        for bucket in features:
+            for label_index, w in weights.get(bucket, ()):
+                logits[label_index] += w
+        return logits
+
+    def to_dict(self) -> dict:
+        return {
+            "version": MODEL_VERSION,
+            "num_buckets": NUM_BUCKETS,
+            "labels": self.labels,
+            "threshold": self.threshold,
+            "bias": [round(b, 3) for b in self.bias],
+            "weights": {str(bucket): [[i, round(w, 3)] for i, w in entries]
+                        for bucket, entries in sorted(self.weights.items())},
+            "metadata": self.metadata,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PreferenceClassifier":
+        if data.get("num_buckets") != NUM_BUCKETS:
+            raise ValueError("Preference model was trained with a different feature space")
+        weights = {int(bucket): [(int(i), float(w)) for i, w in entries]
+                   for bucket, entries in data["weights"].items()}
+        return cls(data["labels"], weights, data["bias"], data.get("threshold", 0.5),
+                   data.get("metadata"))
+
+    @classmethod
+    def load(cls, path: str = MODEL_PATH) -> "PreferenceClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def save(self, path: str = MODEL_PATH):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+
+
+_CLASSIFIER: Optional[PreferenceClassifier] = None
+_CLASSIFIER_LOADED = False
+
+
+def get_preference_classifier() -> Optional[PreferenceClassifier]:
+    """
+    Load the shipped classifier once and cache it.
+
+    Returns None if the weight file is missing or unreadable, in which case
+    callers fall back to keyword matching or Claude.
+    """
+    global _CLASSIFIER, _CLASSIFIER_LOADED
+    if not _CLASSIFIER_LOADED:
+        _CLASSIFIER_LOADED = True
+        try:
+            _CLASSIFIER = PreferenceClassifier.load()
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Preference classifier unavailable: {e}")
+            _CLASSIFIER = None
+    return _CLASSIFIER
+
+
+# ---------------------------------------------------------------------------
+# Offline training and evaluation
+# ---------------------------------------------------------------------------
+
+def load_corpus(path: str = CORPUS_PATH) -> List[dict]:
+    """Read the labeled corpus (one {"text", "labels"} object per line)."""
+    examples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                examples.append(json.loads(line))
+    return examples
+
+
+def split_corpus(examples: List[dict], holdout_percent: int = 20) -> Tuple[List[dict], List[dict]]:
+    """Deterministic train/held-out split keyed on a hash of the text."""
+    train, held_out = [], []
+    for example in examples:
+        if zlib.crc32(example["text"].encode("utf-8")) % 100 < holdout_percent:
+            held_out.append(example)
+        else:
+            train.append(example)
+    return train, held_out
+
+
+def train(examples: List[dict], epochs: int = 8, learning_rate: float = 0.5,
+          l2: float = 1e-5, seed: int = 0) -> PreferenceClassifier:
+    """Train one-vs-rest logistic regression with plain SGD."""
+    # Imported here: intent.py loads this module for inference
+    from intent import PREFERENCE_KEYWORDS
+
+    labels = list(PREFERENCE_KEYWORDS)
+    label_index = {label: i for i, label in enumerate(labels)}
+    dense: Dict[int, List[float]] = {}
+    bias = [0.0] * len(labels)
+
+    data = [(extract_features(e["text"]), {label_index[l] for l in e["labels"] if l in label_index})
+            for e in examples]
+    rng = random.Random(seed)
+
+    for epoch in range(epochs):
+        rng.shuffle(data)
+        lr = learning_rate / (1 + epoch)
+        for features, positives in data:
+            rows = [dense.setdefault(b, [0.0] * len(labels)) for b in features]
+            for j in range(len(labels)):
+                z = bias[j] + sum(row[j] for row in rows)
+                p = 1 / (1 + math.exp(-max(-30.0, min(30.0, z))))
+                grad = p - (1.0 if j in positives else 0.0)
+                if abs(grad) < 1e-4:
+                    continue
+                bias[j] -= lr * grad
+                for row in rows:
+                    row[j] -= lr * (grad + l2 * row[j])
+
+    weights = {}
+    for bucket, row in dense.items():
+        entries = [(j, w) for j, w in enumerate(row) if abs(w) >= PRUNE_BELOW]
+        if entries:
+            weights[bucket] = entries
+    return PreferenceClassifier(labels, weights, bias)
+
+
+def evaluate(classifier: PreferenceClassifier, examples: List[dict]) -> dict:
+    """Exact-match accuracy plus micro/per-label precision, recall and F1."""
+    tp = {label: 0 for label in classifier.labels}
+    fp = dict(tp)
+    fn = dict(tp)
+    exact = 0
+    for example in examples:
+        predicted = set(classifier.predict(example["text"]))
+        expected = set(example["labels"])
+        exact += predicted == expected
+        for label in predicted & expected:
+            tp[label] += 1
+        for label in predicted - expected:
+            fp[label] += 1
+        for label in expected - predicted:
+            fn[label] += 1
+
+    def prf(t, f_p, f_n):
+        precision = t / (t + f_p) if t + f_p else 1.0
+        recall = t / (t + f_n) if t + f_n else 1.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        return {"precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4)}
+
+    return {
+        "examples": len(examples),
+        "exact_match_accuracy": round(exact / len(examples), 4) if examples else 0.0,
+        "micro": prf(sum(tp.values()), sum(fp.values()), sum(fn.values())),
+        "per_label": {label: prf(tp[label], fp[label], fn[label]) for label in classifier.labels},
+    }
+
+
+def main():
+    """Train on the corpus, report held-out accuracy and write the weight file."""
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Train the preference classifier")
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--output", default=MODEL_PATH)
+    parser.add_argument("--epochs", type=int, default=8)
+    args = parser.parse_args()
+
+    examples = load_corpus(args.corpus)
+    train_set, held_out = split_corpus(examples)
+    classifier = train(train_set, epochs=args.epochs)
+
+    held_out_metrics = evaluate(classifier, held_out)
+    start = time.perf_counter()
+    for example in held_out:
+        classifier.predict(example["text"])
+    per_call_us = (time.perf_counter() - start) / max(1, len(held_out)) * 1e6
+
+    classifier.metadata = {
+        "train_examples": len(train_set),
+        "held_out": {k: v for k, v in held_out_metrics.items() if k != "per_label"},
+    }
+    classifier.save(args.output)
+
+    print(json.dumps(held_out_metrics, indent=2))
+    print(f"Inference: {per_call_us:.1f} µs/request")
+    print(f"Wrote {args.output} ({os.path.getsize(args.output) / 1024:.1f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
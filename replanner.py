@@ -0,0 +1,353 @@
+# replanner.py
+# Incremental replanning: apply a local edit to an existing itinerary
+# Only the days an edit touches are recomputed; the rest of the plan is kept as is
+
+import copy
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from data_sources import fetch_pois
+from planner import (
+    TIME_SLOTS, Itinerary, ItineraryItem, PeriodicDayRange, _PoiPool,
+    _buffer_range, _daily_cap, _rank_pois, _rest_day_ranges, _slot_duration,
+)
+from planner_config import PlannerConfig, get_config
+
+
+@dataclass
+class RemovePOI:
+    """Drop an activity and fill its slot with the best unused POI, if one is open."""
+    name: str
+    day: Optional[int] = None  # Any day when not given
+
+
+@dataclass
+class LockDay:
+    """Keep a day exactly as it is through later edits."""
+    day: int
+
+
+@dataclass
+class ChangePreferences:
+    """Re-plan the activities on days start_day..end_day for other preferences."""
+    start_day: int
+    end_day: int
+    preferences: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ExtendTrip:
+    """Add `extra_days` days at the end of the trip."""
+    extra_days: int
+
+
+Edit = Union[RemovePOI, LockDay, ChangePreferences, ExtendTrip]
+
+
+@dataclass
+class ReplanResult:
+    """
+    Outcome of one edit.
+
+    Attributes:
+        itinerary: The edited itinerary (owned by the Replanner)
+        changed_ranges: (start_day, end_day) spans whose contents changed, in order
+    """
+    itinerary: Itinerary
+    changed_ranges: List[Tuple[int, int]]
+
+
+class Replanner:
+    """
+    Applies edits to one itinerary without re-planning the whole trip.
+
+    Construction copies, sorts and indexes the itinerary by day and POI
+    name, which is O(items log items) once. After that `items_by_day` is
+    the source of truth: an edit only reads and rewrites the lists of the
+    days it names, and apply() then splices those days back into the flat
+    `itinerary.items` with one slice assignment per changed span (found by
+    binary search). Replacement activities are picked like the planner's
+    first pass (best unused POI open in the slot, from the day's area if
+    possible) using pools that are built once per set of preferences and
+    shared by later edits. So an edit does O(affected days x slots) work in
+    Python, plus the list memmove of the splice, plus, the first time a set
+    of preferences is seen, one ranking of the catalog. Trip length only
+    matters for ExtendTrip, and only through the days added.
+
+    POIs are tracked by name, as in the planner. A removed POI never comes
+    back. Locked days are skipped by ChangePreferences, and RemovePOI on a
+    locked day raises ValueError.
+
+    Args:
+        itinerary: Itinerary to edit (not modified; the Replanner keeps a copy)
+        preferences: Preferences the itinerary was planned for
+        pois: Candidate POIs (defaults to the catalog for the destination,
+            e.g. pass llm_poi_to_dict() output for an AI-generated plan)
+        config: Planner configuration (uses default if not provided)
+        locked_days: Days locked from the start
+    """
+
+    def __init__(self, itinerary: Itinerary, preferences: Sequence[str] = None,
+                 pois: List[dict] = None, config: PlannerConfig = None,
+                 locked_days: Sequence[int] = ()):
+        self.itinerary = copy.deepcopy(itinerary)
+        self.itinerary.items.sort(key=_item_order)
+        self.config = config if config is not None else get_config()
+        self.preferences = tuple(sorted(set(preferences or [])))
+        self.pois = pois if pois is not None else fetch_pois(itinerary.destination, list(self.preferences))
+        self.locked_days = set(locked_days)
+
+        self.items_by_day: Dict[int, List[ItineraryItem]] = {}
+        self.day_of: Dict[str, int] = {}
+        for item in self.itinerary.items:
+            self.items_by_day.setdefault(item.day, []).append(item)
+            self.day_of[item.name] = item.day
+        # Preferences per day where ChangePreferences overrode the trip's
+        self.day_preferences: Dict[int, tuple] = {}
+
+        # Shared by every pool, so a POI used under one ranking is used in all
+        self.used_names = set(self.day_of)
+        self._pools: Dict[tuple, _PoiPool] = {}
+
+    def apply(self, edit: Edit) -> ReplanResult:
+        """Apply one edit and return the itinerary with the spans that changed."""
+        if isinstance(edit, RemovePOI):
+            changed = self._remove_poi(edit)
+        elif isinstance(edit, LockDay):
+            self._check_day(edit.day)
+            self.locked_days.add(edit.day)
+            changed = []
+        elif isinstance(edit, ChangePreferences):
+            changed = self._change_preferences(edit)
+        elif isinstance(edit, ExtendTrip):
+            changed = self._extend(edit)
+        else:
+            raise TypeError(f"Unsupported edit: {edit!r}")
+        for start_day, end_day in changed:
+            self._splice(start_day, end_day)
+        return ReplanResult(itinerary=self.itinerary, changed_ranges=changed)
+
+    def _splice(self, start_day: int, end_day: int):
+        """Copy days start_day..end_day from items_by_day into itinerary.items."""
+        items = self.itinerary.items
+        lo = _bisect_day(items, start_day)
+        hi = _bisect_day(items, end_day + 1, lo)
+        items[lo:hi] = [item for day in range(start_day, end_day + 1)
+                        for item in self.items_by_day.get(day, ())]
+
+    def _remove_poi(self, edit: RemovePOI) -> List[Tuple[int, int]]:
+        day = edit.day if edit.day is not None else self.day_of.get(edit.name)
+        day_items = self.items_by_day.get(day, [])
+        item = next((i for i in day_items if i.name == edit.name), None)
+        if item is None:
+            where = f" on day {edit.day}" if edit.day is not None else ""
+            raise ValueError(f"No activity named {edit.name!r}{where}")
+        if day in self.locked_days:
+            raise ValueError(f"Day {day} is locked")
+
+        self._drop(item)
+        area = day_items[0].area if day_items else item.area
+        pool = self._pool(self.day_preferences.get(day, self.preferences))
+        later = [_minutes(other.time) for other in day_items if _item_order(other) > _item_order(item)]
+        poi, duration = self._replacement(pool, area, item, later[0] if later else None)
+        if poi is not None:
+            self._add(day, item.time, poi, duration, pool)
+        elif not day_items:
+            self.itinerary.day_ranges.append(_buffer_range(day, day))
+        return [(day, day)]
+
+    def _change_preferences(self, edit: ChangePreferences) -> List[Tuple[int, int]]:
+        self._check_day(edit.start_day)
+        self._check_day(edit.end_day)
+        prefs = tuple(sorted(set(edit.preferences)))
+        days = [day for day in range(edit.start_day, edit.end_day + 1)
+                if day in self.items_by_day and day not in self.locked_days]
+
+        # Free every affected day first, so the days can swap POIs between them
+        slots: Dict[int, List[ItineraryItem]] = {}
+        for day in days:
+            slots[day] = list(self.items_by_day[day])
+            for item in slots[day]:
+                self._drop(item)
+        released = {item.name for day_items in slots.values() for item in day_items}
+        pool = self._pool(prefs)
+        for other in self._pools.values():
+            other.release(released)
+
+        for day in days:
+            self.day_preferences[day] = prefs
+            area = None
+            day_slots = slots[day]
+            for n, old in enumerate(day_slots):
+                next_start = _minutes(day_slots[n + 1].time) if n + 1 < len(day_slots) else None
+                poi, duration = self._replacement(pool, area, old, next_start)
+                if poi is not None:
+                    self._add(day, old.time, poi, duration, pool)
+                    area = area or poi.get("area", "Unknown")
+            if day not in self.items_by_day:
+                self.itinerary.day_ranges.append(_buffer_range(day, day))
+        return _spans(days)
+
+    def _extend(self, edit: ExtendTrip) -> List[Tuple[int, int]]:
+        if edit.extra_days < 1:
+            raise ValueError("extra_days must be at least 1")
+        config = self.config
+        old_days = self.itinerary.days
+        days = old_days + edit.extra_days
+        self.itinerary.days = days
+
+        # New activity days only follow on from activity days, not from a rest tail
+        next_day = old_days + 1
+        if old_days in self.items_by_day:
+            pool = self._pool(self.preferences)
+            dense = days <= config.dense_activity_days_threshold
+            activity_days = len(self.items_by_day)
+            target = max(1, min(config.max_activities_per_day,
+                                round(len(self.itinerary.items) / activity_days)))
+            last_day = min(days, config.max_individual_activity_days)
+            while next_day <= last_day and not pool.exhausted:
+                if not self._fill_new_day(next_day, _daily_cap(next_day, dense, target, config), pool):
+                    break
+                next_day += 1
+
+        if next_day <= days:
+            ranges = self.itinerary.day_ranges
+            # A symbolic weekly tail just gets longer
+            tail = next((r for r in ranges if isinstance(r, PeriodicDayRange) and r.end_day == old_days), None)
+            if tail is not None and next_day == old_days + 1:
+                tail.end_day = days
+            else:
+                ranges.extend(_rest_day_ranges(days, next_day - 1, config))
+        return [(old_days + 1, days)]
+
+    def _fill_new_day(self, day: int, cap: int, pool: _PoiPool) -> bool:
+        """Plan a day added by ExtendTrip; False if nothing could be placed."""
+        first = pool.best_unused()
+        area = first.get("area", "Unknown") if first is not None else None
+        for time_label, hour in TIME_SLOTS:
+            if len(self.items_by_day.get(day, [])) >= cap:
+                break
+            poi = pool.best_open_in_area(area, hour) or pool.best_open(hour)
+            if poi is not None:
+                self._add(day, time_label, poi, self.config.default_duration_minutes, pool)
+        return day in self.items_by_day
+
+    def _replacement(self, pool: _PoiPool, area: Optional[str], slot: ItineraryItem,
+                     next_start: Optional[int]) -> Tuple[Optional[dict], Optional[int]]:
+        """
+        Best unused POI for `slot` and the duration it gets there, from `area` if possible.
+
+        In "slots" mode that's the best POI open at the slot's hour. In
+        "timed" mode it must be open for its own duration from the slot's
+        start and finish by `next_start`, the day's next activity.
+        """
+        config = self.config
+        if config.scheduling_mode != "timed":
+            hour = _slot_hour(slot.time)
+            poi = pool.best_open_in_area(area, hour) if area is not None else None
+            poi = poi or pool.best_open(hour)
+            return poi, slot.duration_minutes
+
+        def fits(poi: dict) -> bool:
+            return _slot_duration(poi, slot, config, next_start) is not None
+
+        poi = (pool.best_matching(fits, area) if area is not None else None) or pool.best_matching(fits)
+        if poi is None:
+            return None, None
+        return poi, _slot_duration(poi, slot, config, next_start)
+
+    def _pool(self, prefs: tuple) -> _PoiPool:
+        pool = self._pools.get(prefs)
+        if pool is None:
+            pool = _PoiPool(_rank_pois(self.pois, set(prefs)))
+            pool.used_names = self.used_names
+            self._pools[prefs] = pool
+        return pool
+
+    def _add(self, day: int, time_label: str, poi: dict, duration_minutes: int, pool: _PoiPool):
+        item = ItineraryItem(
+            day=day,
+            time=time_label,
+            name=poi.get("name", "Unknown"),
+            area=poi.get("area", "Unknown"),
+            tags=poi.get("tags", []),
+            url=poi.get("url", ""),
+            duration_minutes=duration_minutes
+        )
+        _insort(self.items_by_day.setdefault(day, []), item)
+        self.day_of[item.name] = day
+        pool.use(poi)
+
+    def _drop(self, item: ItineraryItem):
+        """Remove an item; its name stays used until released."""
+        day_items = self.items_by_day[item.day]
+        day_items.remove(item)
+        if not day_items:
+            del self.items_by_day[item.day]
+        self.day_of.pop(item.name, None)
+
+    def _check_day(self, day: int):
+        if not 1 <= day <= self.itinerary.days:
+            raise ValueError(f"Day {day} is outside the trip (1-{self.itinerary.days})")
+
+
+def replan(itinerary: Itinerary, edit: Edit, preferences: Sequence[str] = None,
+           pois: List[dict] = None, config: PlannerConfig = None) -> Itinerary:
+    """
+    Apply a single edit to a copy of `itinerary`.
+
+    For a series of edits keep one Replanner instead, which indexes the
+    itinerary and ranks the catalog only once.
+    """
+    return Replanner(itinerary, preferences, pois, config).apply(edit).itinerary
+
+
+def _item_order(item: ItineraryItem) -> tuple:
+    return (item.day, item.time)
+
+
+def _insort(items: List[ItineraryItem], item: ItineraryItem):
+    """Insert keeping items ordered by (day, time)."""
+    key = _item_order(item)
+    lo, hi = 0, len(items)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _item_order(items[mid]) <= key:
+            lo = mid + 1
+        else:
+            hi = mid
+    items.insert(lo, item)
+
+
+def _bisect_day(items: List[ItineraryItem], day: int, lo: int = 0) -> int:
+    """Index of the first item on or after `day` in (day, time) ordered items."""
+    hi = len(items)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if items[mid].day < day:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _slot_hour(time_label: str) -> int:
+    """Hour of an "HH:MM" item time (timed itineraries use any minute)."""
+    return int(time_label.split(":")[0])
+
+
+def _minutes(time_label: str) -> int:
+    """Minutes after midnight of an "HH:MM" item time."""
+    hour, minute = time_label.split(":")
+    return int(hour) * 60 + int(minute)
+
+
+def _spans(days: List[int]) -> List[Tuple[int, int]]:
+    """Sorted days as merged (start, end) spans."""
+    spans: List[Tuple[int, int]] = []
+    for day in days:
+        if spans and day == spans[-1][1] + 1:
+            spans[-1] = (spans[-1][0], day)
+        else:
+            spans.append((day, day))
+    return spans
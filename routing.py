@@ -0,0 +1,172 @@
+# routing.py
+# Per-day visit ordering that cuts travel time between activities
+# Nearest-neighbour construction plus 2-opt, bounded by a per-day time limit
+
+import math
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Nearest-neighbour restarts per day; 2-opt does the rest
+MAX_STARTS = 8
+
+
+class AreaTravelTimes:
+    """
+    Travel minutes looked up from an area-to-area matrix.
+
+    Pairs missing from the matrix cost `same_area_minutes` within one area
+    and `default_minutes` between areas. Lookups are symmetric.
+    """
+
+    def __init__(self, matrix: Dict[Tuple[str, str], float] = None,
+                 same_area_minutes: float = 10.0, default_minutes: float = 30.0):
+        self.matrix = dict(matrix or {})
+        self.same_area_minutes = same_area_minutes
+        self.default_minutes = default_minutes
+
+    def minutes(self, a: dict, b: dict) -> float:
+        area_a, area_b = a.get("area", "Unknown"), b.get("area", "Unknown")
+        minutes = self.matrix.get((area_a, area_b))
+        if minutes is None:
+            minutes = self.matrix.get((area_b, area_a))
+        if minutes is not None:
+            return minutes
+        return self.same_area_minutes if area_a == area_b else self.default_minutes
+
+
+class CoordinateTravelTimes:
+    """
+    Great-circle distance at an average city speed.
+
+    Uses each POI's "coords" (lat, lon) and falls back to another source
+    (by default AreaTravelTimes) when either POI has none.
+    """
+
+    def __init__(self, speed_kmh: float = 15.0, fallback=None):
+        self.speed_kmh = speed_kmh
+        self.fallback = fallback if fallback is not None else AreaTravelTimes()
+
+    def minutes(self, a: dict, b: dict) -> float:
+        coords_a, coords_b = a.get("coords"), b.get("coords")
+        if coords_a is None or coords_b is None:
+            return self.fallback.minutes(a, b)
+        return haversine_km(coords_a, coords_b) / self.speed_kmh * 60
+
+
+def haversine_km(a: Sequence[float], b: Sequence[float]) -> float:
+    """Distance in km between two (lat, lon) points."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(min(1.0, math.sqrt(h)))
+
+
+# Travel-time source used by the planner
+_TRAVEL_TIMES = CoordinateTravelTimes()
+
+
+def get_travel_times():
+    """Get the travel-time source used for route optimization."""
+    return _TRAVEL_TIMES
+
+
+def set_travel_times(source):
+    """Set the travel-time source (any object with minutes(poi_a, poi_b))."""
+    global _TRAVEL_TIMES
+    _TRAVEL_TIMES = source
+
+
+def route_minutes(stops: List[dict], travel=None) -> float:
+    """Total travel time visiting `stops` in the given order."""
+    travel = travel if travel is not None else _TRAVEL_TIMES
+    return sum(travel.minutes(a, b) for a, b in zip(stops, stops[1:]))
+
+
+def optimize_route(stops: List[dict], slot_hours: Optional[List[int]] = None,
+                   travel=None, time_limit: float = 0.01) -> List[int]:
+    """
+    Visit order (indices into `stops`) with less total travel time.
+
+    Position p of the route is visited at slot_hours[p]; when slot hours are
+    given, every stop must be open at the hour of the position it ends up
+    in. The input order is assumed feasible and is kept unless a cheaper
+    one is found.
+
+    Nearest-neighbour routes are built from up to MAX_STARTS first stops,
+    then the best is improved with 2-opt reversals until no move helps or
+    `time_limit` seconds have passed. Travel times are treated as symmetric.
+    """
+    n = len(stops)
+    if n < 3:
+        return list(range(n))
+    travel = travel if travel is not None else _TRAVEL_TIMES
+    deadline = time.perf_counter() + time_limit
+
+    cost = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1, n):
+            cost[i][j] = cost[j][i] = travel.minutes(stops[i], stops[j])
+    if slot_hours is None:
+        allowed = [[True] * n for _ in range(n)]
+    else:
+        allowed = [[_is_open(stop, hour) for hour in slot_hours] for stop in stops]
+
+    best = list(range(n))
+    best_cost = _path_cost(best, cost)
+    starts = [i for i in range(n) if allowed[i][0]][:MAX_STARTS]
+    for start in starts:
+        if time.perf_counter() > deadline:
+            break
+        order = _nearest_neighbour(start, cost, allowed)
+        if order is not None:
+            order_cost = _path_cost(order, cost)
+            if order_cost < best_cost - 1e-9:
+                best, best_cost = order, order_cost
+
+    return _two_opt(best, cost, allowed, deadline)
+
+
+def _is_open(poi: dict, hour: int) -> bool:
+    open_start, open_end = poi.get("open", (9, 18))
+    return open_start <= hour <= open_end
+
+
+def _path_cost(order: List[int], cost: List[List[float]]) -> float:
+    return sum(cost[a][b] for a, b in zip(order, order[1:]))
+
+
+def _nearest_neighbour(start: int, cost: List[List[float]],
+                       allowed: List[List[bool]]) -> Optional[List[int]]:
+    """Greedy route from `start`, or None if it paints itself into a corner."""
+    n = len(cost)
+    order = [start]
+    unvisited = set(range(n)) - {start}
+    for position in range(1, n):
+        row = cost[order[-1]]
+        candidates = [j for j in unvisited if allowed[j][position]]
+        if not candidates:
+            return None
+        nxt = min(candidates, key=lambda j: (row[j], j))
+        order.append(nxt)
+        unvisited.discard(nxt)
+    return order
+
+
+def _two_opt(order: List[int], cost: List[List[float]], allowed: List[List[bool]],
+             deadline: float) -> List[int]:
+    """Reverse segments while that shortens the (open) path and keeps every stop open."""
+    n = len(order)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(n - 1):
+            if time.perf_counter() > deadline:
+                return order
+            for j in range(i + 1, n):
+                a, b, c, d = (order[i - 1] if i > 0 else None), order[i], order[j], \
+                    (order[j + 1] if j < n - 1 else None)
+                before = (cost[a][b] if a is not None else 0.0) + (cost[c][d] if d is not None else 0.0)
+                after = (cost[a][c] if a is not None else 0.0) + (cost[b][d] if d is not None else 0.0)
+                if after < before - 1e-9 and all(allowed[order[j - k]][i + k] for k in range(j - i + 1)):
+                    order[i:j + 1] = order[i:j + 1][::-1]
+                    improved = True
+    return order
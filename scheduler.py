@@ -0,0 +1,286 @@
+# scheduler.py
+# Timed scheduling engine: packs POIs into days by duration, opening hours and travel time
+# Greedy earliest-finish construction per day, then cheapest-insertion repair with an iteration budget
+
+import re
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+DEFAULT_DURATION_MINUTES = 120
+
+# Unused POIs (in rank order) considered for each next visit; keeps the
+# greedy choice close to the preference ranking
+CANDIDATE_WINDOW = 12
+
+# Visits starting outside a POI's preferred window count as finishing this much later
+OFF_PEAK_PENALTY_MINUTES = 30
+
+_BEST_TIMES = [
+    ("morning", (9 * 60, 12 * 60)),
+    ("midday", (11 * 60, 14 * 60)),
+    ("lunch", (11 * 60, 14 * 60)),
+    ("afternoon", (12 * 60, 17 * 60)),
+    ("sunset", (17 * 60, 20 * 60)),
+    ("evening", (17 * 60, 21 * 60)),
+    ("night", (19 * 60, 24 * 60)),
+]
+
+_CLOCK = r"(\d{1,2})(?:[:.](\d{2}))?\s*([ap]\.?m\.?)?"
+_HOURS_RE = re.compile(_CLOCK + r"\s*(?:-|–|—|to|until)\s*" + _CLOCK, re.IGNORECASE)
+_DURATION_RE = re.compile(
+    r"(\d+(?:\.\d+)?)(?:\s*(?:-|–|to)\s*(\d+(?:\.\d+)?))?\s*(hours?|hrs?|h|minutes?|mins?|m)\b",
+    re.IGNORECASE)
+
+
+def parse_duration_minutes(text: str, default: Optional[int] = DEFAULT_DURATION_MINUTES) -> Optional[int]:
+    """
+    Minutes for a free-text duration such as "2-3 hours", "45 min" or "Half day".
+
+    Ranges use their midpoint; "1 hour 30 minutes" adds up. Returns `default`
+    when nothing can be read.
+    """
+    if not text:
+        return default
+    lowered = text.lower()
+    if "half" in lowered and "day" in lowered:
+        return 240
+    if ("full" in lowered or "all" in lowered or "whole" in lowered) and "day" in lowered:
+        return 480
+
+    total = 0.0
+    for low, high, unit in _DURATION_RE.findall(lowered):
+        amount = (float(low) + float(high)) / 2 if high else float(low)
+        total += amount * (60 if unit.startswith("h") else 1)
+    return int(round(total)) if total > 0 else default
+
+
+def parse_opening_hours(text: str) -> Optional[Tuple[int, int]]:
+    """
+    (open, close) in minutes after midnight for text like "9:00-18:00" or "10am-5pm".
+
+    "24/7" and "24 hours" are the whole day; closing after midnight is
+    clipped to midnight. Returns None for "Varies" and anything unreadable.
+    """
+    if not text:
+        return None
+    lowered = text.lower()
+    if "24/7" in lowered or "24 hours" in lowered or "24h" in lowered:
+        return (0, 24 * 60)
+    match = _HOURS_RE.search(lowered)
+    if not match:
+        return None
+    start = _clock_minutes(*match.group(1, 2, 3))
+    end = _clock_minutes(*match.group(4, 5, 6))
+    if start is None or end is None:
+        return None
+    if end <= start:
+        end = 24 * 60
+    return (start, end)
+
+
+def parse_best_time(text: str) -> Optional[Tuple[int, int]]:
+    """Preferred visiting window for "Morning", "Evening", etc.; None for "Any time"."""
+    lowered = (text or "").lower()
+    for word, window in _BEST_TIMES:
+        if word in lowered:
+            return window
+    return None
+
+
+def _clock_minutes(hour: str, minute: str, meridiem: str) -> Optional[int]:
+    h, m = int(hour), int(minute or 0)
+    if meridiem:
+        if h > 12:
+            return None
+        h = h % 12 + (12 if meridiem.startswith("p") else 0)
+    if h > 24 or m > 59:
+        return None
+    return min(24 * 60, h * 60 + m)
+
+
+def opening_minutes(poi: dict) -> Tuple[int, int]:
+    """Opening window in minutes after midnight, from "open_minutes" or else "open" (hours)."""
+    if "open_minutes" in poi:
+        return tuple(poi["open_minutes"])
+    return tuple(h * 60 for h in poi.get("open", (9, 18)))
+
+
+def format_clock(minutes: int) -> str:
+    """"HH:MM" for minutes after midnight."""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+@dataclass
+class ScheduledVisit:
+    """One POI placed on a day, with start/end in minutes after midnight."""
+    poi: dict
+    day: int
+    start: int
+    end: int
+
+    @property
+    def time(self) -> str:
+        return format_clock(self.start)
+
+    @property
+    def duration_minutes(self) -> int:
+        return self.end - self.start
+
+
+class Scheduler:
+    """
+    Packs ranked POIs into days.
+
+    POIs are dicts like the catalog's. Opening hours come from "open_minutes"
+    (minutes after midnight) or "open" (hours); "duration_minutes" and
+    "preferred_window" (minutes) are optional. Travel between consecutive
+    visits comes from a routing travel-time source.
+
+    Each day is built greedily: from the best CANDIDATE_WINDOW unused POIs,
+    take the one that can finish earliest after travelling from the previous
+    visit (earliest-finish-time interval scheduling). POIs the greedy pass
+    left out are then inserted wherever they add the least time, until the
+    days are full or the repair budget (2 x free places + CANDIDATE_WINDOW
+    tries) runs out. Both passes are deterministic, so the same inputs always
+    give the same schedule and plans can be memoized.
+
+    `time_limit` (seconds) is only a safety net for pathological inputs:
+    if repair is still running when it passes, repair stops early with a
+    printed warning, and that one result depends on machine speed. The
+    greedy pass always completes, so the schedule is valid either way.
+    """
+
+    def __init__(self, travel, day_start: int = 9 * 60, day_end: int = 21 * 60,
+                 default_duration: int = DEFAULT_DURATION_MINUTES, time_limit: float = 1.0):
+        self.travel = travel
+        self.day_start = day_start
+        self.day_end = day_end
+        self.default_duration = default_duration
+        self.time_limit = time_limit
+
+    def schedule(self, ranked_pois: Sequence[dict], day_caps: Sequence[int],
+                 repair_caps: Sequence[int] = None) -> List[ScheduledVisit]:
+        """
+        Visits for days 1..len(day_caps), at most day_caps[d - 1] on day d.
+
+        The repair pass may fill day d up to repair_caps[d - 1] instead
+        (defaults to day_caps), like the slot planner's second pass.
+        Returns visits sorted by day and start time. POIs are tracked by
+        name, like the slot planner: each name is visited at most once.
+        """
+        deadline = time.perf_counter() + self.time_limit
+        remaining: List[dict] = []
+        seen = set()
+        for poi in ranked_pois:
+            name = poi.get("name", "Unknown")
+            if name not in seen:
+                seen.add(name)
+                remaining.append(poi)
+
+        days: List[List[dict]] = []
+        for cap in day_caps:
+            days.append(self._fill_day(remaining, cap))
+
+        if remaining:
+            self._repair(days, repair_caps if repair_caps is not None else day_caps, remaining, deadline)
+
+        visits = []
+        for day, pois in enumerate(days, start=1):
+            for poi, (start, end) in zip(pois, self.timeline(pois)):
+                visits.append(ScheduledVisit(poi=poi, day=day, start=start, end=end))
+        return visits
+
+    def window(self, poi: dict) -> Tuple[int, int]:
+        """Opening window in minutes, clipped to the planning day."""
+        open_start, open_end = opening_minutes(poi)
+        return max(open_start, self.day_start), min(open_end, self.day_end)
+
+    def duration(self, poi: dict) -> int:
+        return poi.get("duration_minutes") or self.default_duration
+
+    def timeline(self, pois: Sequence[dict]) -> Optional[List[Tuple[int, int]]]:
+        """(start, end) of each visit in order, or None if one can't fit its window."""
+        t = self.day_start
+        prev = None
+        out = []
+        for poi in pois:
+            placed = self._place(poi, t, prev)
+            if placed is None:
+                return None
+            out.append(placed)
+            t, prev = placed[1], poi
+        return out
+
+    def _place(self, poi: dict, t: int, prev: Optional[dict]) -> Optional[Tuple[int, int]]:
+        arrive = t + (int(round(self.travel.minutes(prev, poi))) if prev is not None else 0)
+        open_start, open_end = self.window(poi)
+        start = max(arrive, open_start)
+        end = start + self.duration(poi)
+        return (start, end) if end <= open_end else None
+
+    def _fill_day(self, remaining: List[dict], cap: int) -> List[dict]:
+        """Greedy earliest-finish pass for one day; removes what it uses from `remaining`."""
+        day: List[dict] = []
+        t, prev = self.day_start, None
+        while len(day) < cap and remaining:
+            best = None
+            for index, poi in enumerate(remaining[:CANDIDATE_WINDOW]):
+                placed = self._place(poi, t, prev)
+                if placed is None:
+                    continue
+                key = (placed[1] + self._off_peak(poi, placed[0]), index)
+                if best is None or key < best[0]:
+                    best = (key, index, placed)
+            if best is None:
+                break
+            _, index, placed = best
+            poi = remaining.pop(index)
+            day.append(poi)
+            t, prev = placed[1], poi
+        return day
+
+    def _off_peak(self, poi: dict, start: int) -> int:
+        preferred = poi.get("preferred_window")
+        if preferred and not preferred[0] <= start <= preferred[1]:
+            return OFF_PEAK_PENALTY_MINUTES
+        return 0
+
+    def _repair(self, days: List[List[dict]], day_caps: Sequence[int],
+                remaining: List[dict], deadline: float):
+        """Cheapest insertion of left-over POIs into days with room, within the try budget."""
+        room = sum(max(0, cap - len(day)) for day, cap in zip(days, day_caps))
+        ends = [self._day_end(day) for day in days]
+        tries = 2 * room + CANDIDATE_WINDOW
+        index = 0
+        while room and index < len(remaining) and tries:
+            if time.perf_counter() >= deadline:
+                print(f"Scheduler repair hit its {self.time_limit * 1000:.0f} ms safety limit "
+                      f"with {tries} tries left; this schedule may differ between runs")
+                return
+            tries -= 1
+            poi = remaining[index]
+            best = None
+            for d, day in enumerate(days):
+                if len(day) >= day_caps[d]:
+                    continue
+                for position in range(len(day) + 1):
+                    candidate = day[:position] + [poi] + day[position:]
+                    timeline = self.timeline(candidate)
+                    if timeline is None:
+                        continue
+                    added = timeline[-1][1] - ends[d]
+                    if best is None or added < best[0]:
+                        best = (added, d, candidate)
+            if best is None:
+                index += 1
+                continue
+            _, d, candidate = best
+            days[d] = candidate
+            ends[d] = self._day_end(candidate)
+            remaining.pop(index)
+            room -= 1
+
+    def _day_end(self, pois: List[dict]) -> int:
+        timeline = self.timeline(pois)
+        return timeline[-1][1] if timeline else self.day_start
@@ -0,0 +1,107 @@
+# singleflight.py
+# Request coalescing for identical in-flight planning requests
+# Concurrent callers with the same key share one computation and each get a copy
+
+import asyncio
+import copy
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+def normalize_request_key(text: str) -> str:
+    """
+    Normalize a user request for coalescing.
+
+    Case and whitespace differences don't change the plan, so
+    "Plan a 3-day trip to Tokyo" and "plan a 3-day  trip to tokyo " share a key.
+    """
+    return " ".join((text or "").lower().split())
+
+
+class _Call:
+    """One in-flight computation shared by a leader and its followers."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Thread-based request coalescing (used by the Flask backend).
+
+    The first caller for a key runs the function; callers arriving while it
+    is running block until it finishes. Every caller, the leader included,
+    receives a deep copy of the result, so nobody can mutate another
+    request's itinerary. Errors are re-raised in every caller.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) once per concurrent key and return a copy of its result."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+            else:
+                call.followers += 1
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as e:
+                call.error = e
+            finally:
+                # Later arrivals start a fresh computation
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return copy.deepcopy(call.result)
+
+
+class AsyncSingleFlight:
+    """
+    Coroutine-based request coalescing (used by the uAgents handler).
+
+    The shared computation runs as its own task, so cancelling one waiting
+    caller doesn't cancel the work for the others.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Await fn(*args, **kwargs) once per concurrent key and return a copy of its result."""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._tasks[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.coalesced += 1
+
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
@@ -0,0 +1,87 @@
+# test_anytime.py
+# Unit tests for the anytime planner
+# Tests that plans stay valid, never get worse, and that the deadline is kept
+
+import unittest
+import data_sources
+from anytime import plan_anytime
+from data_sources import fetch_pois
+from intent import TripIntent
+from planner import _is_open, build_itinerary
+from planner_config import PlannerConfig
+from scheduler import opening_minutes
+from validator import validate_itinerary
+from variants import score_itinerary
+
+
+class TestPlanAnytime(unittest.TestCase):
+    """Test greedy start plus local search."""
+
+    def assert_valid(self, intent, itinerary):
+        pois = {poi["name"]: poi for poi in fetch_pois(intent.destination)}
+        names = [item.name for item in itinerary.items]
+        self.assertEqual(len(names), len(set(names)))
+        for item in itinerary.items:
+            self.assertTrue(_is_open(pois[item.name], int(item.time[:2])), item)
+        self.assertEqual(itinerary.get_uncovered_days(), [])
+
+    def test_improves_on_greedy(self):
+        intent = TripIntent(destination="Tokyo", days=2, preferences=["food", "art"])
+        result = plan_anytime(intent, deadline_ms=300)
+
+        self.assertGreater(result.improvement, 0)
+        self.assertGreater(result.accepted, 0)
+        self.assertEqual(result.score, score_itinerary(result.itinerary, intent.preferences))
+        self.assertEqual(result.initial_score, score_itinerary(build_itinerary(intent), intent.preferences))
+        self.assert_valid(intent, result.itinerary)
+
+    def test_never_worse_and_valid(self):
+        for days in (1, 3, 5, 20):
+            intent = TripIntent(destination="Paris", days=days, preferences=["food"])
+            result = plan_anytime(intent, deadline_ms=30, seed=days)
+            self.assertGreaterEqual(result.score.total, result.initial_score.total)
+            self.assert_valid(intent, result.itinerary)
+
+    def test_timed_moves_keep_visits_in_hours(self):
+        # The best-matching POIs are long or close early, so most moves to them must be refused
+        city = "Anytimeville"
+        pois = [{"name": f"Sight {i}", "area": f"Area {i % 3}", "tags": ["culture"], "open": (9, 21), "url": ""}
+                for i in range(12)]
+        pois += [{"name": f"Feast {i}", "area": f"Area {i % 3}", "tags": ["food", "art"], "open": (9, 14),
+                  "duration_minutes": 90 + 60 * i, "url": ""} for i in range(6)]
+        data_sources.register_destination(city, pois)
+        self.addCleanup(data_sources.remove_destination, city)
+        config = PlannerConfig(scheduling_mode="timed")
+        intent = TripIntent(destination=city, days=3, preferences=["food", "art"])
+
+        result = plan_anytime(intent, deadline_ms=100, config=config)
+        self.assertGreater(result.accepted, 0)
+        self.assertTrue(validate_itinerary(result.itinerary).ok)
+        by_name = {poi["name"]: poi for poi in pois}
+        for item in result.itinerary.items:
+            poi = by_name[item.name]
+            self.assertEqual(item.duration_minutes, poi.get("duration_minutes") or config.default_duration_minutes)
+            start = int(item.time[:2]) * 60 + int(item.time[3:])
+            open_start, open_end = opening_minutes(poi)
+            self.assertTrue(open_start <= start and start + item.duration_minutes <= open_end, item)
+
+    def test_deadline(self):
+        intent = TripIntent(destination="Tokyo", days=5, preferences=["culture"])
+        result = plan_anytime(intent, deadline_ms=50)
+        self.assertLess(result.elapsed_ms, 50 + 25)
+        self.assertAlmostEqual(result.elapsed_ms, result.greedy_ms + result.search_ms, places=6)
+
+        # No budget left after the greedy plan: it is returned as is
+        result = plan_anytime(intent, deadline_ms=0)
+        self.assertEqual(result.iterations, 0)
+        self.assertEqual(result.improvement, 0)
+        self.assertEqual(result.itinerary, build_itinerary(intent))
+
+    def test_unsupported_city(self):
+        result = plan_anytime(TripIntent(destination="Atlantis", days=2, preferences=[]), deadline_ms=20)
+        self.assertEqual(result.iterations, 0)
+        self.assertIn("Atlantis", result.itinerary.items[0].name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+# test_circuit_breaker.py
+# Unit tests for the shared Claude circuit breaker
+# Uses a fake clock and stub clients - no API key required
+
+import unittest
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError, get_llm_breaker
+from intent import parse_intent
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test breaker state transitions."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30.0, clock=self.clock)
+
+    def _fail(self):
+        def boom():
+            raise RuntimeError("API down")
+        with self.assertRaises(RuntimeError):
+            self.breaker.call(boom)
+
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(3):
+            self._fail()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(lambda: "never called")
+
+    def test_success_resets_failure_count(self):
+        self._fail()
+        self._fail()
+        self.breaker.call(lambda: "ok")
+        self._fail()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_slow_calls_count_as_failures(self):
+        def slow():
+            self.clock.now += 9.0
+            return "ok"
+
+        for _ in range(3):
+            self.assertEqual(self.breaker.call(slow, deadline=10.0), "ok")
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.snapshot()["slow_calls"], 3)
+
+    def test_half_open_probe_closes_on_success(self):
+        for _ in range(3):
+            self._fail()
+
+        self.clock.now += 31.0
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+        # Only one probe at a time
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_probe_failure_reopens(self):
+        for _ in range(3):
+            self._fail()
+
+        self.clock.now += 31.0
+        self._fail()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.snapshot()["retry_in_seconds"], 30.0)
+
+    def test_snapshot_is_serializable(self):
+        import json
+        self._fail()
+        snapshot = json.loads(json.dumps(self.breaker.snapshot()))
+
+        self.assertEqual(snapshot["state"], "closed")
+        self.assertEqual(snapshot["consecutive_failures"], 1)
+        self.assertIn("RuntimeError", snapshot["last_error"])
+
+
+class _FailingMessages:
+    def __init__(self):
+        self.calls = 0
+
+    def stream(self, **kwargs):
+        self.calls += 1
+        raise ConnectionError("API unreachable")
+
+
+class _FailingClient:
+    def __init__(self):
+        self.messages = _FailingMessages()
+
+
+class TestIntentUsesBreaker(unittest.TestCase):
+    """Test that parse_intent skips Claude while the breaker is open."""
+
+    def setUp(self):
+        get_llm_breaker().reset()
+
+    def tearDown(self):
+        get_llm_breaker().reset()
+
+    def test_open_breaker_routes_to_rule_parser(self):
+        client = _FailingClient()
+        threshold = get_llm_breaker().failure_threshold
+
+        for _ in range(threshold + 3):
+            intent = parse_intent("Plan a 3-day trip to Tokyo for food", client=client)
+            self.assertEqual(intent.destination, "Tokyo")
+            self.assertEqual(intent.days, 3)
+
+        # Claude was only contacted until the breaker opened
+        self.assertEqual(client.messages.calls, threshold)
+        self.assertTrue(get_llm_breaker().is_open)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,142 @@
+# test_group.py
+# Unit tests for group trip planning
+# Tests preference aggregation, must-sees and per-traveller coverage
+
+import unittest
+import data_sources
+from group import Traveller, aggregate_preferences, plan_group, rank_for_group
+from intent import TripIntent
+from planner import build_itinerary
+from planner_config import PlannerConfig
+from validator import validate_itinerary
+
+CITY = "Groupville"
+
+
+def catalog():
+    # Area 0 has plenty of food; the one nature spot is alone in its own area
+    pois = [{"name": f"Diner {i}", "area": "Area 0", "tags": ["food"], "open": (8, 20), "url": ""}
+            for i in range(12)]
+    pois += [{"name": f"Gallery {i}", "area": "Area 1", "tags": ["art"], "open": (10, 17), "url": ""}
+             for i in range(4)]
+    pois.append({"name": "Lone Park", "area": "Area 2", "tags": ["nature"], "open": (6, 12), "url": ""})
+    pois.append({"name": "Night Club", "area": "Area 3", "tags": ["nightlife"], "open": (22, 23), "url": ""})
+    return pois
+
+
+class TestAggregate(unittest.TestCase):
+    """Test the aggregate preference vector."""
+
+    def test_weights(self):
+        weights = aggregate_preferences([
+            Traveller("Ana", ["food", "art"], weight=2),
+            Traveller("Ben", ["food"]),
+            Traveller("Cy", []),
+        ])
+        self.assertEqual(list(weights), ["food", "art"])
+        self.assertAlmostEqual(weights["food"], 2 / 3)
+        self.assertAlmostEqual(weights["art"], 1 / 3)
+
+    def test_many_preferences_dont_outweigh(self):
+        weights = aggregate_preferences([Traveller("Ana", ["food"]),
+                                         Traveller("Ben", ["art", "nature", "history", "museum"])])
+        self.assertAlmostEqual(weights["food"], 0.5)
+        self.assertAlmostEqual(weights["art"], 0.125)
+
+    def test_large_group_matches_small(self):
+        small = aggregate_preferences([Traveller("a", ["food"]), Traveller("b", ["art"], weight=3)])
+        large = aggregate_preferences([Traveller(str(i), ["food"]) for i in range(5000)] +
+                                      [Traveller(str(i), ["art"], weight=3) for i in range(5000)])
+        self.assertEqual(list(small), list(large))
+        for pref in small:
+            self.assertAlmostEqual(small[pref], large[pref])
+
+    def test_negative_weight(self):
+        with self.assertRaises(ValueError):
+            aggregate_preferences([Traveller("Ana", ["food"], weight=-1)])
+
+
+class TestPlanGroup(unittest.TestCase):
+    """Test the shared itinerary and coverage."""
+
+    def setUp(self):
+        data_sources.register_destination(CITY, catalog())
+
+    def tearDown(self):
+        data_sources.remove_destination(CITY)
+
+    def test_single_traveller_is_standard_plan(self):
+        for city, prefs in ((CITY, ["food", "art"]), ("Tokyo", ["culture"]), ("Paris", [])):
+            plan = plan_group(city, 4, [Traveller("Ana", prefs)])
+            self.assertEqual(plan.itinerary, build_itinerary(TripIntent(destination=city, days=4,
+                                                                        preferences=prefs)))
+
+    def test_must_see_ranked_first(self):
+        ranked = rank_for_group(catalog(), {"food": 1.0}, ["lone park"])
+        self.assertEqual(ranked[0]["name"], "Lone Park")
+
+    def test_must_see_planned(self):
+        travellers = [Traveller("Ana", ["food"], weight=3), Traveller("Ben", ["art"], must_see=["Lone Park"])]
+        plan = plan_group(CITY, 1, travellers)
+        names = [item.name for item in plan.itinerary.items]
+        self.assertIn("Lone Park", names)
+        self.assertEqual(plan.itinerary.get_uncovered_days(), [])
+        # Only open in the morning
+        park = next(item for item in plan.itinerary.items if item.name == "Lone Park")
+        self.assertEqual(park.time, "09:00")
+
+    def test_must_see_swapped_in(self):
+        # The day goes to Diner 7's area; the park takes the other diner's slot
+        plan = plan_group(CITY, 1, [Traveller("Ana", ["food"], must_see=["Diner 7", "Lone Park"])])
+        self.assertEqual(sorted(item.name for item in plan.itinerary.items), ["Diner 7", "Lone Park"])
+        self.assertEqual(plan.coverage[0].must_see_missed, [])
+
+    def test_must_see_timed(self):
+        # The swapped-in visit keeps its own length and must end by closing time
+        data_sources.register_destination(CITY, catalog() + [
+            {"name": "Day Hike", "area": "Area 4", "tags": ["nature"], "open": (9, 21),
+             "duration_minutes": 420, "url": ""},
+            {"name": "Grand Tour", "area": "Area 4", "tags": ["nature"], "open": (9, 21),
+             "duration_minutes": 660, "url": ""},
+        ])
+        plan = plan_group(CITY, 2, [Traveller("Ana", ["food"], must_see=["Day Hike", "Grand Tour"])],
+                          PlannerConfig(scheduling_mode="timed"))
+        hike = next(item for item in plan.itinerary.items if item.name == "Day Hike")
+        self.assertEqual(hike.duration_minutes, 420)
+        self.assertEqual(plan.coverage[0].must_see_missed, ["Grand Tour"])
+        self.assertTrue(validate_itinerary(plan.itinerary).ok)
+
+    def test_coverage(self):
+        travellers = [
+            Traveller("Ana", ["food"], weight=3),
+            Traveller("Ben", ["art", "food"], must_see=["Lone Park", "Atlantis Museum"]),
+            Traveller("Cy", ["nightlife"], must_see=["Night Club"]),
+        ]
+        plan = plan_group(CITY, 2, travellers)
+        items = plan.itinerary.items
+        ana, ben, cy = plan.coverage
+
+        self.assertEqual(ana.matched_items, sum(1 for item in items if "food" in item.tags))
+        self.assertAlmostEqual(ana.match_share, ana.matched_items / len(items), places=5)
+        tags = {tag for item in items for tag in item.tags}
+        self.assertEqual(ben.preferences_covered, [pref for pref in ["art", "food"] if pref in tags])
+        self.assertEqual(ben.preferences_missed, [pref for pref in ["art", "food"] if pref not in tags])
+        self.assertIn("food", ben.preferences_covered)
+        self.assertEqual(ben.must_see_planned, ["Lone Park"])
+        self.assertEqual(ben.must_see_missed, ["Atlantis Museum"])
+        # Open too late for any slot
+        self.assertEqual(cy.must_see_missed, ["Night Club"])
+        self.assertEqual(cy.preferences_missed, ["nightlife"])
+
+    def test_unsupported_city(self):
+        plan = plan_group("Atlantis", 2, [Traveller("Ana", ["food"])])
+        self.assertEqual(plan.itinerary.destination, "Atlantis")
+        self.assertEqual(plan.coverage[0].matched_items, 0)
+
+    def test_needs_travellers(self):
+        with self.assertRaises(ValueError):
+            plan_group(CITY, 2, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,228 @@
+# test_intent.py
+# Unit tests for Claude-backed intent parsing using stub clients
+# No API key or network access required
+
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from intent import parse_intent, parse_intent_async, TripIntent
+from circuit_breaker import get_llm_breaker
+
+
+REQUEST_TEXT = "Plan a 3-day trip to Tokyo for food and culture"
+RESPONSE_TEXT = "DESTINATION: Tokyo\nDAYS: 3\nPREFERENCES: food, culture"
+
+
+def _tokens(text: str) -> list:
+    """Split a reply into small chunks the way a streamed completion arrives."""
+    return [text[i:i + 3] for i in range(0, len(text), 3)]
+
+
+class _StubStream:
+    """Sync and async context manager exposing text_stream like the SDK."""
+
+    def __init__(self, owner, delay: float):
+        self.owner = owner
+        self.delay = delay
+
+    def _iter(self):
+        for chunk in _tokens(self.owner.text):
+            self.owner.chunks_read += 1
+            yield chunk
+
+    async def _aiter(self):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.owner.cancelled = True
+            raise
+        for chunk in _tokens(self.owner.text):
+            self.owner.chunks_read += 1
+            yield chunk
+
+    def __enter__(self):
+        self.text_stream = self._iter()
+        return self
+
+    def __exit__(self, *exc):
+        self.owner.closed = True
+        return False
+
+    async def __aenter__(self):
+        self.text_stream = self._aiter()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.owner.closed = True
+        return False
+
+
+class _StubMessages:
+    """Mimics Anthropic().messages / AsyncAnthropic().messages streaming."""
+
+    def __init__(self, delay: float, text: str):
+        self.delay = delay
+        self.text = text
+        self.cancelled = False
+        self.closed = False
+        self.chunks_read = 0
+        self.last_kwargs = None
+
+    def stream(self, **kwargs):
+        self.last_kwargs = kwargs
+        return _StubStream(self, self.delay)
+
+
+class _StubClient:
+    def __init__(self, delay: float = 0.0, text: str = RESPONSE_TEXT):
+        self.messages = _StubMessages(delay, text)
+
+
+class TestParseIntentStreaming(unittest.TestCase):
+    """Test streamed intent parsing with early exit."""
+
+    def setUp(self):
+        get_llm_breaker().reset()
+
+    def test_stops_reading_after_all_fields(self):
+        """Test that trailing tokens after PREFERENCES are never read."""
+        chatter = "\nNote: " + "the traveller seems keen on ramen. " * 20
+        client = _StubClient(text=RESPONSE_TEXT + chatter)
+        intent = parse_intent(REQUEST_TEXT, client=client)
+
+        self.assertEqual(intent.destination, "Tokyo")
+        self.assertEqual(intent.days, 3)
+        self.assertEqual(intent.preferences, ["food", "culture"])
+        self.assertTrue(client.messages.closed)
+        self.assertLess(client.messages.chunks_read, len(_tokens(RESPONSE_TEXT)) + 2)
+
+    def test_last_line_without_newline(self):
+        """Test that a reply ending without a newline is still parsed."""
+        intent = parse_intent(REQUEST_TEXT, client=_StubClient(text=RESPONSE_TEXT))
+        self.assertEqual(intent.preferences, ["food", "culture"])
+
+    def test_none_values(self):
+        """Test that NONE fields map to empty values."""
+        client = _StubClient(text="DESTINATION: Paris\nDAYS: NONE\nPREFERENCES: NONE\n")
+        intent = parse_intent("anything", client=client)
+
+        self.assertEqual(intent.destination, "Paris")
+        self.assertIsNone(intent.days)
+        self.assertEqual(intent.preferences, [])
+
+    def test_examples_sent_as_system_prompt(self):
+        """Test that few-shot examples live in the system block, not the user message."""
+        client = _StubClient()
+        parse_intent("Plan a trip to Rome", client=client)
+        kwargs = client.messages.last_kwargs
+
+        # Too short for the API's minimum cacheable prefix, so no cache marker
+        self.assertNotIn("cache_control", kwargs["system"][0])
+        self.assertIn("Examples:", kwargs["system"][0]["text"])
+        self.assertNotIn("Examples:", kwargs["messages"][0]["content"])
+        self.assertIn("Plan a trip to Rome", kwargs["messages"][0]["content"])
+
+
+class TestLocalPreferences(unittest.TestCase):
+    """Test the opt-in local classifier for preferences."""
+
+    def setUp(self):
+        get_llm_breaker().reset()
+
+    def test_claude_not_asked_for_preferences(self):
+        """Test that Claude only gets the destination/days prompt."""
+        client = _StubClient(text="DESTINATION: Paris\nDAYS: 4\nPREFERENCES: sports")
+        intent = parse_intent("4 days in Paris, mostly art galleries and street food", client=client,
+                              use_local_preferences=True)
+        system_text = client.messages.last_kwargs["system"][0]["text"]
+
+        self.assertNotIn("PREFERENCES", system_text)
+        self.assertEqual(intent.destination, "Paris")
+        self.assertEqual(intent.days, 4)
+        # Preferences come from the classifier, not the stubbed reply
+        self.assertEqual(intent.preferences, ["food", "art"])
+
+    def test_falls_back_to_claude_without_classifier(self):
+        """Test the three-field prompt when no weight file is available."""
+        client = _StubClient()
+        with mock.patch("intent.get_preference_classifier", return_value=None):
+            intent = parse_intent("anything", client=client, use_local_preferences=True)
+
+        self.assertIn("PREFERENCES", client.messages.last_kwargs["system"][0]["text"])
+        self.assertEqual(intent.preferences, ["food", "culture"])
+
+    def test_claude_asked_for_preferences_by_default(self):
+        """Test that Claude's preferences are used unless the classifier is opted into."""
+        client = _StubClient(text="DESTINATION: Paris\nDAYS: 4\nPREFERENCES: food")
+        intent = parse_intent("4 days in Paris, not interested in museums, just food", client=client)
+
+        self.assertIn("PREFERENCES", client.messages.last_kwargs["system"][0]["text"])
+        self.assertEqual(intent.preferences, ["food"])
+
+    def test_classifier_used_without_claude(self):
+        """Test that the no-key fallback takes preferences from the classifier."""
+        with mock.patch.dict("os.environ", {}, clear=True):
+            intent = parse_intent("Plan a trip to Lisbon for galleries and street food")
+
+        self.assertEqual(intent.destination, "Lisbon")
+        self.assertIsNone(intent.days)
+        # Keyword matching alone would miss "galleries"
+        self.assertEqual(intent.preferences, ["food", "art"])
+
+
+class TestParseIntentAsync(unittest.IsolatedAsyncioTestCase):
+    """Test the async parser used by the uAgents handler."""
+
+    def setUp(self):
+        get_llm_breaker().reset()
+
+    async def test_parses_claude_response(self):
+        """Test that the stubbed Claude reply is parsed into a TripIntent."""
+        intent = await parse_intent_async(REQUEST_TEXT, client=_StubClient(0.0))
+
+        self.assertIsInstance(intent, TripIntent)
+        self.assertEqual(intent.destination, "Tokyo")
+        self.assertEqual(intent.days, 3)
+        self.assertEqual(intent.preferences, ["food", "culture"])
+
+    async def test_concurrent_calls_overlap(self):
+        """Test that concurrent chats share the wait instead of queueing."""
+        delay = 0.2
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            parse_intent_async(REQUEST_TEXT, client=_StubClient(delay))
+            for _ in range(5)
+        ])
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(results), 5)
+        # Sequential execution would take 5 * delay
+        self.assertLess(elapsed, delay * 2.5)
+
+    async def test_timeout_falls_back_to_rules(self):
+        """Test that a slow API falls back to the rule parser."""
+        client = _StubClient(delay=5.0)
+        intent = await parse_intent_async(
+            "Plan a 4-day trip to Paris for art", timeout=0.05, client=client
+        )
+
+        self.assertEqual(intent.destination, "Paris")
+        self.assertEqual(intent.days, 4)
+        self.assertTrue(client.messages.cancelled)
+
+    async def test_cancellation_propagates(self):
+        """Test that cancelling the caller cancels the in-flight request."""
+        client = _StubClient(delay=5.0)
+        task = asyncio.create_task(parse_intent_async(REQUEST_TEXT, client=client))
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertTrue(client.messages.cancelled)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,127 @@
+# test_itinerary_cache.py
+# Unit tests for the memoized itinerary cache
+# Tests key normalization, copy isolation, LRU/memory eviction and invalidation
+
+import unittest
+import data_sources
+from intent import TripIntent
+from planner import build_itinerary
+from planner_config import PlannerConfig
+from itinerary_cache import (ItineraryCache, cached_build_itinerary, estimate_itinerary_bytes,
+                             make_cache_key)
+
+
+class TestCacheKey(unittest.TestCase):
+    """Requests that plan the same trip share a key."""
+
+    def test_spelling_and_preference_order_share_key(self):
+        config = PlannerConfig()
+        a = make_cache_key(TripIntent("Tokyo", 3, ["food", "art"]), config)
+        b = make_cache_key(TripIntent("tokyo", 3, ["art", "food", "art"]), config)
+        self.assertIsNotNone(a)
+        self.assertEqual(a, b)
+
+    def test_different_inputs_different_keys(self):
+        config = PlannerConfig()
+        base = make_cache_key(TripIntent("Tokyo", 3, ["food"]), config)
+        self.assertNotEqual(base, make_cache_key(TripIntent("Tokyo", 4, ["food"]), config))
+        self.assertNotEqual(base, make_cache_key(TripIntent("Paris", 3, ["food"]), config))
+        self.assertNotEqual(base, make_cache_key(TripIntent("Tokyo", 3, ["food"]),
+                                                 PlannerConfig(max_activities_per_day=2)))
+
+    def test_unsupported_city_not_cached(self):
+        self.assertIsNone(make_cache_key(TripIntent("Atlantis", 3, []), PlannerConfig()))
+
+
+class TestItineraryCache(unittest.TestCase):
+    """Hit/miss accounting, copies and eviction."""
+
+    def setUp(self):
+        self.cache = ItineraryCache()
+        self.config = PlannerConfig()
+
+    def test_hit_matches_fresh_build(self):
+        intent = TripIntent("Tokyo", 3, ["food"])
+        first = cached_build_itinerary(intent, self.config, self.cache)
+        second = cached_build_itinerary(intent, self.config, self.cache)
+        self.assertEqual(second, build_itinerary(intent, self.config))
+        self.assertEqual(first, second)
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_hit_keeps_destination_as_written(self):
+        cached_build_itinerary(TripIntent("Tokyo", 3, ["food"]), self.config, self.cache)
+        itinerary = cached_build_itinerary(TripIntent("tokyo", 3, ["food"]), self.config, self.cache)
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(itinerary.destination, "tokyo")
+
+    def test_callers_get_independent_copies(self):
+        intent = TripIntent("Tokyo", 3, ["food"])
+        built = cached_build_itinerary(intent, self.config, self.cache)
+        built.items.clear()
+        served = cached_build_itinerary(intent, self.config, self.cache)
+        self.assertTrue(served.items)
+        served.items[0].name = "Changed"
+        self.assertNotEqual(cached_build_itinerary(intent, self.config, self.cache).items[0].name,
+                            "Changed")
+
+    def test_new_trip_length_uses_prefix(self):
+        """A different day count reuses the plan prefix and still matches a fresh build."""
+        cached_build_itinerary(TripIntent("Paris", 3, ["culture"]), self.config, self.cache)
+        for days in (4, 5):
+            intent = TripIntent("paris", days, ["culture"])
+            self.assertEqual(cached_build_itinerary(intent, self.config, self.cache),
+                             build_itinerary(intent, self.config))
+        stats = self.cache.stats()
+        self.assertEqual((stats["prefixes"], stats["prefix_hits"], stats["hits"]), (1, 2, 0))
+
+    def test_lru_eviction_by_entries(self):
+        cache = ItineraryCache(max_entries=2)
+        for days in (1, 2, 3):
+            cached_build_itinerary(TripIntent("Tokyo", days, []), self.config, cache)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        self.assertIsNone(cache.get(make_cache_key(TripIntent("Tokyo", 1, []), self.config)))
+        self.assertIsNotNone(cache.get(make_cache_key(TripIntent("Tokyo", 3, []), self.config)))
+
+    def test_eviction_by_bytes(self):
+        itinerary = build_itinerary(TripIntent("Tokyo", 3, []), self.config)
+        size = estimate_itinerary_bytes(itinerary)
+        cache = ItineraryCache(max_bytes=int(size * 1.5))
+        cache.put("a", itinerary)
+        cache.put("b", itinerary)
+        self.assertEqual(len(cache), 1)
+        self.assertIsNotNone(cache.get("b"))
+        self.assertLessEqual(cache.stats()["bytes"], cache.max_bytes)
+
+    def test_oversized_itinerary_not_stored(self):
+        itinerary = build_itinerary(TripIntent("Tokyo", 3, []), self.config)
+        cache = ItineraryCache(max_bytes=estimate_itinerary_bytes(itinerary) - 1)
+        cache.put("a", itinerary)
+        self.assertEqual(len(cache), 0)
+
+
+class TestCatalogInvalidation(unittest.TestCase):
+    """Registering destinations changes the catalog version in the key."""
+
+    CITY = "Cacheville"
+
+    def tearDown(self):
+        data_sources.remove_destination(self.CITY)
+
+    def test_register_destination_invalidates(self):
+        cache = ItineraryCache()
+        config = PlannerConfig()
+        intent = TripIntent(self.CITY, 1, [])
+        poi = {"name": "Old Museum", "area": "Center", "tags": ["art"], "open": (9, 18), "url": ""}
+        data_sources.register_destination(self.CITY, [poi])
+        self.assertEqual(cached_build_itinerary(intent, config, cache).items[0].name, "Old Museum")
+
+        data_sources.register_destination(self.CITY, [dict(poi, name="New Museum")])
+        self.assertEqual(cached_build_itinerary(intent, config, cache).items[0].name, "New Museum")
+        self.assertEqual(cache.hits, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
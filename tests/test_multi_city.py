@@ -0,0 +1,150 @@
+# test_multi_city.py
+# Unit tests for multi-city trips
+# Tests leg parsing, the day split, stitching, and that legs are planned concurrently
+
+import threading
+import time
+import unittest
+from intent import MultiCityIntent, TripIntent, TripLeg, parse_multi_city_intent
+from multi_city import plan_multi_city, split_days, stitch_legs
+from planner import PeriodicDayRange, build_itinerary
+
+
+def legs_of(text):
+    intent = parse_multi_city_intent(text)
+    return [(leg.destination, leg.days) for leg in intent.legs] if intent else None
+
+
+class TestParseLegs(unittest.TestCase):
+    """Test parse_multi_city_intent."""
+
+    def test_leg_forms(self):
+        self.assertEqual(legs_of("Tokyo 4 days then Singapore 3"), [("Tokyo", 4), ("Singapore", 3)])
+        self.assertEqual(legs_of("3 days in Paris and 2 days in London"), [("Paris", 3), ("London", 2)])
+        self.assertEqual(legs_of("tokyo (4 days), new york (3 days)"), [("Tokyo", 4), ("New York", 3)])
+        self.assertEqual(legs_of("2 days in Lisbon then Porto for 3 nights"), [("Lisbon", 2), ("Porto", 3)])
+
+    def test_trip_length_and_preferences(self):
+        intent = parse_multi_city_intent("Plan a 10-day trip: Tokyo 4 days then Kyoto, for food and culture")
+        self.assertEqual(intent.days, 10)
+        self.assertEqual([(leg.destination, leg.days) for leg in intent.legs], [("Tokyo", 4), ("Kyoto", None)])
+        self.assertEqual(intent.preferences, ["food", "culture"])
+
+    def test_single_city_requests(self):
+        for text in ("Plan a 3-day trip to Tokyo for food and culture", "Plan a trip to Tokyo, I love Sushi",
+                     "Tokyo, Japan for 3 days", "Show me Paris"):
+            self.assertIsNone(parse_multi_city_intent(text), text)
+
+    def test_lists_of_sights_stay_single_city(self):
+        for text in ("Plan a 5-day trip to New York, Broadway and Central Park",
+                     "Family trip to Singapore for 4 days, Kid-friendly",
+                     "Plan a trip to Lisbon and Sintra, Cascais"):
+            self.assertIsNone(parse_multi_city_intent(text), text)
+
+    def test_unknown_cities_need_a_connector(self):
+        self.assertEqual(legs_of("Lisbon → Porto"), [("Lisbon", None), ("Porto", None)])
+        self.assertEqual(legs_of("Lisbon followed by Porto"), [("Lisbon", None), ("Porto", None)])
+        self.assertEqual(legs_of("Paris, London"), [("Paris", None), ("London", None)])
+
+    def test_own_day_counts_make_legs(self):
+        self.assertEqual(legs_of("Lisbon 3 days, Porto 2 days"), [("Lisbon", 3), ("Porto", 2)])
+        self.assertEqual(legs_of("Lisbon 3 days; Porto 2 days"), [("Lisbon", 3), ("Porto", 2)])
+        self.assertIsNone(legs_of("Lisbon 3 days, Porto"))
+
+    def test_trailing_days_are_whole_trip(self):
+        intent = parse_multi_city_intent("Paris and London for 5 days")
+        self.assertEqual(intent.days, 5)
+        self.assertEqual([(leg.destination, leg.days) for leg in intent.legs], [("Paris", None), ("London", None)])
+        self.assertEqual(split_days(intent), [3, 2])
+        self.assertEqual(legs_of("Tokyo 4 days then Kyoto for 3 days"), [("Tokyo", 4), ("Kyoto", 3)])
+
+    def test_country_after_city(self):
+        self.assertEqual(legs_of("Tokyo, Japan for 3 days then Singapore 2"), [("Tokyo", 3), ("Singapore", 2)])
+
+
+class TestSplitDays(unittest.TestCase):
+    """Test how the day budget is split across legs."""
+
+    def split(self, days, *leg_days):
+        return split_days(MultiCityIntent(legs=[TripLeg(f"City {i}", d) for i, d in enumerate(leg_days)],
+                                          days=days, preferences=[]))
+
+    def test_split(self):
+        self.assertEqual(self.split(None, 4, 3), [4, 3])
+        self.assertEqual(self.split(10, 4, None, None), [4, 3, 3])
+        self.assertEqual(self.split(7, None, None), [4, 3])
+        self.assertEqual(self.split(None, None, 2), [3, 2])
+        # Legs that say how long they are win over the trip length
+        self.assertEqual(self.split(5, 4, 3), [4, 3])
+        self.assertEqual(self.split(5, 5, None), [5, 1])
+
+
+class TestStitch(unittest.TestCase):
+    """Test joining leg itineraries."""
+
+    def test_global_day_numbers(self):
+        tokyo = build_itinerary(TripIntent(destination="Tokyo", days=4, preferences=["food"]))
+        paris = build_itinerary(TripIntent(destination="Paris", days=60, preferences=["art"]))
+        long_trip = build_itinerary(TripIntent(destination="London", days=400, preferences=[]))
+        periodic = stitch_legs([tokyo, long_trip]).itinerary.day_ranges
+        self.assertTrue(any(isinstance(r, PeriodicDayRange) and r.end_day == 404 for r in periodic))
+        plan = stitch_legs([tokyo, paris])
+        itinerary = plan.itinerary
+
+        self.assertEqual(itinerary.destination, "Tokyo → Paris")
+        self.assertEqual(itinerary.days, 64)
+        self.assertEqual([(leg.start_day, leg.end_day) for leg in plan.legs], [(1, 4), (5, 64)])
+        self.assertEqual(itinerary.get_uncovered_days(), [])
+        self.assertEqual({item.day for item in itinerary.items if item.area.endswith(", Tokyo")}, {1, 2, 3, 4})
+        self.assertTrue(all(item.day > 4 for item in itinerary.items if item.area.endswith(", Paris")))
+        self.assertEqual(max(r.end_day for r in itinerary.day_ranges), 64)
+        self.assertTrue(all(r.description.startswith("Paris: ") for r in itinerary.day_ranges))
+        # The leg plans are left as they were
+        self.assertEqual(paris, build_itinerary(TripIntent(destination="Paris", days=60, preferences=["art"])))
+
+
+class TestPlanMultiCity(unittest.TestCase):
+    """Test concurrent planning of legs."""
+
+    INTENT = MultiCityIntent(legs=[TripLeg("Tokyo", 2), TripLeg("Paris", 2), TripLeg("London", 2)],
+                             days=None, preferences=["food"])
+
+    def test_legs_overlap(self):
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def slow_leg(intent):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.2)
+            with lock:
+                active[0] -= 1
+            return build_itinerary(intent)
+
+        start = time.perf_counter()
+        plan = plan_multi_city(self.INTENT, plan_leg=slow_leg)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(peak[0], 3)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual([leg.destination for leg in plan.legs], ["Tokyo", "Paris", "London"])
+        self.assertEqual(plan.itinerary.days, 6)
+
+    def test_static_default(self):
+        plan = plan_multi_city(self.INTENT, use_llm=False)
+        self.assertEqual(plan.itinerary.get_uncovered_days(), [])
+        self.assertEqual(sorted({item.day for item in plan.itinerary.items}), [1, 2, 3, 4, 5, 6])
+
+    def test_failed_leg_raises(self):
+        def plan_leg(intent):
+            if intent.destination == "Paris":
+                raise RuntimeError("no Paris today")
+            return build_itinerary(intent)
+
+        with self.assertRaisesRegex(RuntimeError, "no Paris today"):
+            plan_multi_city(self.INTENT, plan_leg=plan_leg)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+# test_phase_timer.py
+# Unit tests for per-phase planning instrumentation
+# Tests timings on itineraries, the metrics callback, and that timing is off by default
+
+import dataclasses
+import unittest
+from unittest import mock
+from intent import TripIntent
+from itinerary_cache import ItineraryCache, cached_build_itinerary
+from llm_planner import LLMGeneratedPOI, LLMTripPlanner
+from phase_timer import NO_TIMER, PhaseTimer, set_metrics_callback, start_timer
+from planner import Itinerary, build_itinerary
+from planner_config import PlannerConfig
+
+INTENT = TripIntent(destination="Tokyo", days=5, preferences=["food"])
+
+
+class TestPhaseTimer(unittest.TestCase):
+    """Test the timer itself."""
+
+    def test_phases_add_up(self):
+        timer = PhaseTimer()
+        for _ in range(3):
+            with timer.phase("a"):
+                pass
+        with timer.phase("b"):
+            pass
+        timings = timer.as_dict()
+        self.assertEqual(list(timings), ["a", "b", "total"])
+        self.assertGreaterEqual(timings["total"], timings["a"] + timings["b"] - 1e-3)
+
+    def test_off_by_default(self):
+        self.assertIs(start_timer(), NO_TIMER)
+        self.assertIsNone(build_itinerary(INTENT).timings)
+
+
+class TestBuildItineraryTimings(unittest.TestCase):
+    """Test the phases recorded by build_itinerary."""
+
+    def tearDown(self):
+        set_metrics_callback(None)
+
+    def test_slot_phases(self):
+        itinerary = build_itinerary(INTENT, PlannerConfig(collect_timings=True))
+        self.assertEqual(list(itinerary.timings), ["fetch", "scoring", "grouping", "allocation",
+                                                   "second_pass", "ranges", "coverage", "total"])
+        self.assertTrue(all(ms >= 0 for ms in itinerary.timings.values()))
+        # Timings don't change what the plan is
+        self.assertEqual(itinerary, build_itinerary(INTENT))
+
+    def test_timed_and_routed_phases(self):
+        itinerary = build_itinerary(INTENT, PlannerConfig(collect_timings=True, scheduling_mode="timed"))
+        self.assertIn("scheduling", itinerary.timings)
+        itinerary = build_itinerary(INTENT, PlannerConfig(collect_timings=True, optimize_routes=True))
+        self.assertIn("routing", itinerary.timings)
+
+    def test_metrics_callback(self):
+        received = []
+        set_metrics_callback(lambda source, timings: received.append((source, timings)))
+        itinerary = build_itinerary(INTENT)
+        self.assertEqual(received, [("build_itinerary", itinerary.timings)])
+
+        # A failing callback doesn't fail planning
+        set_metrics_callback(lambda source, timings: 1 / 0)
+        self.assertIsNotNone(build_itinerary(INTENT).timings)
+
+
+class TestCachedBuildTimings(unittest.TestCase):
+    """Test the phases recorded by cached_build_itinerary."""
+
+    def tearDown(self):
+        set_metrics_callback(None)
+
+    def test_miss_and_hit(self):
+        cache = ItineraryCache()
+        config = PlannerConfig(collect_timings=True)
+        miss = cached_build_itinerary(INTENT, config, cache)
+        self.assertEqual(list(miss.timings), ["cache", "prefix", "allocation", "second_pass", "ranges",
+                                              "coverage", "total"])
+        hit = cached_build_itinerary(INTENT, config, cache)
+        self.assertEqual(list(hit.timings), ["cache", "total"])
+        self.assertEqual(hit, build_itinerary(INTENT))
+
+    def test_timing_shares_cache_entry(self):
+        cache = ItineraryCache()
+        timed = cached_build_itinerary(INTENT, PlannerConfig(collect_timings=True), cache)
+        untimed = cached_build_itinerary(INTENT, PlannerConfig(), cache)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertIsNotNone(timed.timings)
+        # The hit doesn't carry the first run's timings
+        self.assertIsNone(untimed.timings)
+        self.assertEqual(untimed, timed)
+
+    def test_metrics_callback(self):
+        received = []
+        set_metrics_callback(lambda source, timings: received.append((source, timings)))
+        cache = ItineraryCache()
+        itinerary = cached_build_itinerary(INTENT, cache=cache)
+        self.assertEqual(received, [("cached_build_itinerary", itinerary.timings)])
+        self.assertIn("allocation", itinerary.timings)
+        cached_build_itinerary(INTENT, cache=cache)
+        self.assertEqual([source for source, _ in received], ["cached_build_itinerary"] * 2)
+
+
+class TestPlanTripTimings(unittest.TestCase):
+    """Test the phases recorded by LLMTripPlanner.plan_trip."""
+
+    def setUp(self):
+        received = self.received = []
+        set_metrics_callback(lambda source, timings: received.append((source, timings)))
+        with mock.patch.dict("os.environ", {"ANTHROPIC_API_KEY": "test-key"}):
+            self.planner = LLMTripPlanner()
+
+    def tearDown(self):
+        set_metrics_callback(None)
+
+    def test_catalog_city(self):
+        itinerary = self.planner.plan_trip(INTENT)
+        self.assertEqual(list(itinerary.timings), ["fetch", "static_plan", "total"])
+        # The static plan inside reports its own phases first
+        self.assertEqual([source for source, _ in self.received], ["cached_build_itinerary", "llm_plan_trip"])
+        self.assertEqual(self.received[-1][1], itinerary.timings)
+
+    def test_generated_city(self):
+        planned = Itinerary(destination="Lisbon", days=2, items=[])
+        with mock.patch.object(self.planner, "_generate_pois_with_llm", return_value=["poi"]), \
+                mock.patch.object(self.planner, "_create_llm_itinerary", return_value=planned):
+            itinerary = self.planner.plan_trip(TripIntent(destination="Lisbon", days=2, preferences=[]))
+        self.assertIs(itinerary, planned)
+        self.assertEqual(list(itinerary.timings), ["fetch", "poi_generation", "itinerary_generation", "total"])
+
+    def test_generated_city_scheduled_locally(self):
+        self.planner.config = dataclasses.replace(self.planner.config, schedule_generated_pois=True)
+        poi = LLMGeneratedPOI(name="Castle", area="Old Town", description="", tags=["history"],
+                              estimated_duration="2 hours", best_time_to_visit="Morning",
+                              opening_hours="9:00-17:00", google_maps_query="Castle")
+        with mock.patch.object(self.planner, "_generate_pois_with_llm", return_value=[poi]):
+            itinerary = self.planner.plan_trip(TripIntent(destination="Lisbon", days=2, preferences=[]))
+        self.assertEqual(list(itinerary.timings), ["fetch", "poi_generation", "scheduling", "total"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,12 +2,15 @@
 # Comprehensive unit tests for the planner module
 # Tests day count guarantees, day ranges, and performance
 
+import random
 import time
 import unittest
+import data_sources
 from intent import TripIntent
-from planner import build_itinerary, Itinerary, ItineraryItem, DayRange
+from planner import (build_itinerary, iter_itinerary, Itinerary, ItineraryDay, ItineraryItem,
+                     DayRange, PeriodicDayRange, PlanPrefix, TIME_SLOTS)
 from planner_config import PlannerConfig
-from exporters import itinerary_to_markdown, itinerary_to_ics
+from exporters import itinerary_to_markdown, itinerary_to_ics, itinerary_to_ics_string
 
 
 class TestPlannerDayCount(unittest.TestCase):
@@ -136,6 +139,176 @@ class TestDayRanges(unittest.TestCase):
         uncovered = itinerary.get_uncovered_days()
         self.assertEqual(set(uncovered), {2, 4, 5})
 
+    def test_uncovered_ranges_merge_overlaps(self):
+        """Test that overlapping, adjacent and out-of-trip spans are merged correctly."""
+        itinerary = Itinerary(
+            destination="Tokyo",
+            days=30,
+            items=[ItineraryItem(day=2, time="09:00", name="A", area="X", tags=[], url="")],
+            day_ranges=[
+                DayRange(start_day=10, end_day=15, description="Rest"),
+                DayRange(start_day=3, end_day=5, description="Rest"),
+                DayRange(start_day=12, end_day=20, description="Rest"),
+                DayRange(start_day=21, end_day=22, description="Rest"),
+                DayRange(start_day=28, end_day=40, description="Rest"),
+            ]
+        )
+
+        self.assertEqual(itinerary.get_covered_intervals(), [(2, 5), (10, 22), (28, 40)])
+        self.assertEqual(itinerary.get_uncovered_ranges(), [(1, 1), (6, 9), (23, 27)])
+        self.assertEqual(itinerary.get_uncovered_days(), [1, 6, 7, 8, 9, 23, 24, 25, 26, 27])
+
+    def test_covered_intervals_from_unordered_items(self):
+        """Test that item days in any order collapse to the same intervals."""
+        days = [7, 3, 4, 3, 9, 8, 1, 4, 12]
+        items = [ItineraryItem(day=day, time="09:00", name=f"P{n}", area="X", tags=[], url="")
+                 for n, day in enumerate(days)]
+        expected = [(1, 1), (3, 4), (7, 9), (12, 12)]
+        self.assertEqual(Itinerary("Tokyo", 12, items=items).get_covered_intervals(), expected)
+        ordered = sorted(items, key=lambda item: item.day)
+        self.assertEqual(Itinerary("Tokyo", 12, items=ordered).get_covered_intervals(), expected)
+
+    def test_uncovered_ranges_independent_of_trip_length(self):
+        """Test that a million-day range is checked without expanding it."""
+        itinerary = Itinerary(
+            destination="Tokyo",
+            days=1_000_000,
+            items=[],
+            day_ranges=[DayRange(start_day=1, end_day=999_990, description="Rest")]
+        )
+
+        start_time = time.time()
+        gaps = itinerary.get_uncovered_ranges()
+        self.assertLess(time.time() - start_time, 0.01)
+        self.assertEqual(gaps, [(999_991, 1_000_000)])
+
+
+class TestPeriodicDayRanges(unittest.TestCase):
+    """Test symbolic weekly ranges used for very long trips."""
+
+    def test_blocks_generated_lazily(self):
+        """Test that iterating yields numbered weekly blocks with a short last block."""
+        periodic = PeriodicDayRange(start_day=51, end_day=70, description="Rest", period_days=7)
+
+        blocks = list(periodic)
+        self.assertEqual([(b.start_day, b.end_day) for b in blocks], [(51, 57), (58, 64), (65, 70)])
+        self.assertEqual(blocks[0].description, "Rest — Week 8")
+        self.assertEqual(periodic.num_blocks, 3)
+        self.assertEqual(periodic.last_block, blocks[-1])
+        self.assertEqual(periodic.num_days, 20)
+
+    def test_long_trip_size_independent_of_length(self):
+        """Test that a 10,000-day trip has as many ranges as a 1,000-day trip."""
+        short = build_itinerary(TripIntent(destination="Paris", days=1000, preferences=[]))
+        long = build_itinerary(TripIntent(destination="Paris", days=10000, preferences=[]))
+
+        self.assertEqual(len(short.day_ranges), len(long.day_ranges))
+        self.assertTrue(any(isinstance(r, PeriodicDayRange) for r in long.day_ranges))
+        self.assertEqual(long.get_uncovered_ranges(), [])
+        # Expanded view still matches the old one-range-per-week layout
+        weeks = [r for r in long.iter_day_ranges() if "Week" in r.description]
+        self.assertTrue(all(r.num_days <= 7 for r in weeks))
+        self.assertEqual(sum(r.num_days for r in long.iter_day_ranges()), 10000 - len({i.day for i in long.items}))
+
+    def test_exports_stay_compact(self):
+        """Test that markdown and ICS use one entry for the periodic range."""
+        itinerary = build_itinerary(TripIntent(destination="Tokyo", days=10000, preferences=[]))
+
+        markdown = itinerary_to_markdown(itinerary)
+        self.assertLess(len(markdown), 5000)
+        self.assertIn("Weeks", markdown)
+
+        ics_content, _ = itinerary_to_ics_string(itinerary)
+        self.assertIn("RRULE:FREQ=WEEKLY;INTERVAL=1;COUNT=", ics_content)
+        self.assertLess(ics_content.count("BEGIN:VEVENT"), 50)
+
+
+class TestIterItinerary(unittest.TestCase):
+    """Test the streaming day-by-day generator."""
+
+    def collect(self, intent, config=None):
+        """Collect streamed parts, checking they arrive in day order."""
+        items, day_ranges, last_day = [], [], 0
+        for part in iter_itinerary(intent, config):
+            if isinstance(part, ItineraryDay):
+                self.assertGreater(part.day, last_day)
+                last_day = part.day
+                items.extend(part.items)
+            else:
+                self.assertGreater(part.start_day, last_day)
+                last_day = part.end_day
+                day_ranges.append(part)
+        return items, day_ranges
+
+    def test_matches_build_itinerary(self):
+        """Test that streaming yields the same plan as build_itinerary."""
+        for days in [3, 14, 20, 45, 365]:
+            intent = TripIntent(destination="Tokyo", days=days, preferences=["food"])
+            expected = build_itinerary(intent)
+            items, day_ranges = self.collect(intent)
+
+            by_slot = lambda item: (item.day, item.time)
+            self.assertEqual(sorted(items, key=by_slot), sorted(expected.items, key=by_slot))
+            self.assertEqual(day_ranges, sorted(expected.day_ranges, key=lambda r: r.start_day))
+
+    def test_first_day_before_rest_of_trip(self):
+        """Test that a long trip's first day arrives before later days are planned."""
+        config = PlannerConfig(max_individual_activity_days=5000)
+        intent = TripIntent(destination="Paris", days=5000, preferences=[])
+
+        first = next(iter_itinerary(intent, config))
+        self.assertIsInstance(first, ItineraryDay)
+        self.assertEqual(first.day, 1)
+        self.assertGreater(len(first.items), 0)
+
+    def test_built_itinerary_parts(self):
+        """Test that Itinerary.iter_parts walks a built plan in the same shape."""
+        intent = TripIntent(destination="London", days=20, preferences=[])
+        self.assertEqual(list(build_itinerary(intent).iter_parts()), list(iter_itinerary(intent)))
+
+
+class TestPlanPrefix(unittest.TestCase):
+    """Test that plans derived from a PlanPrefix match fresh builds."""
+
+    def assertMatchesFresh(self, plan, city, days, prefs, config=None):
+        self.assertEqual(plan.build(days, city),
+                         build_itinerary(TripIntent(city, days, prefs), config))
+
+    def test_any_order_of_trip_lengths(self):
+        """Test shrinking, growing and revisiting trip lengths on one prefix."""
+        for city in ["Paris", "Tokyo", "New York"]:
+            plan = PlanPrefix(city, ["culture"])
+            for days in [3, 5, 4, 1, 60, 14, 15, 30, 2, 101, 45, 3]:
+                self.assertMatchesFresh(plan, city, days, ["culture"])
+
+    def test_custom_config(self):
+        """Test a config where many more days are dense."""
+        config = PlannerConfig(max_activities_per_day=2, dense_activity_days_threshold=30)
+        plan = PlanPrefix("Tokyo", ["food", "art"], config)
+        for days in [25, 3, 30, 31, 8]:
+            self.assertMatchesFresh(plan, "Tokyo", days, ["food", "art"], config)
+
+    def test_builds_are_independent(self):
+        """Test that changing one derived itinerary doesn't affect the next."""
+        plan = PlanPrefix("Paris", [])
+        first = plan.build(3)
+        first.items[0].name = "Changed"
+        first.items.clear()
+        self.assertMatchesFresh(plan, "Paris", 3, [])
+
+    def test_prefix_computed_once(self):
+        """Test that shorter trips reuse activity days already computed."""
+        plan = PlanPrefix("Tokyo", [])
+        plan.build(40)
+        computed = plan.days_computed
+        plan.build(20)
+        plan.build(35)
+        self.assertEqual(plan.days_computed, computed)
+
+    def test_unsupported_city(self):
+        """Test that an unknown city gets the same message as build_itinerary."""
+        self.assertMatchesFresh(PlanPrefix("Atlantis", []), "Atlantis", 5, [])
+
 
 class TestPlannerPerformance(unittest.TestCase):
     """Test that planner performs well with large day counts."""
@@ -177,6 +350,62 @@ class TestPlannerPerformance(unittest.TestCase):
                           "Should use day ranges for long trips!")
 
 
+class TestPlannerLargeCatalog(unittest.TestCase):
+    """Test allocation on large synthetic catalogs."""
+
+    CITY = "Synthville"
+
+    def setUp(self):
+        rng = random.Random(32)
+        tags = ["food", "culture", "history", "art", "nature", "shopping"]
+        pois = []
+        for i in range(20000):
+            open_start = rng.randint(0, 20)
+            pois.append({
+                "name": f"Place {i}",
+                "area": f"Area {rng.randint(0, 400)}",
+                "tags": rng.sample(tags, rng.randint(0, 3)),
+                "open": (open_start, rng.randint(open_start, 24)),
+                "url": "",
+            })
+        data_sources.register_destination(self.CITY, pois)
+        self.open_hours = {poi["name"]: poi["open"] for poi in pois}
+
+    def tearDown(self):
+        data_sources.remove_destination(self.CITY)
+
+    def test_large_catalog_allocation(self):
+        """Test that 20k POIs over 5000 dense days allocate quickly and consistently."""
+        config = PlannerConfig(dense_activity_days_threshold=5000, max_individual_activity_days=5000)
+        intent = TripIntent(destination=self.CITY, days=5000, preferences=["food", "art"])
+
+        start_time = time.time()
+        itinerary = build_itinerary(intent, config=config)
+        elapsed = time.time() - start_time
+
+        # The old slot scan took tens of seconds here
+        self.assertLess(elapsed, 3.0, f"Allocation took {elapsed:.2f}s")
+        self.assertEqual(len(itinerary.get_uncovered_days()), 0)
+
+        hours = dict(TIME_SLOTS)
+        names = [item.name for item in itinerary.items]
+        self.assertEqual(len(names), len(set(names)), "POI used twice")
+        slots = [(item.day, item.time) for item in itinerary.items]
+        self.assertEqual(len(slots), len(set(slots)), "Two activities in one slot")
+        for item in itinerary.items:
+            open_start, open_end = self.open_hours[item.name]
+            self.assertTrue(open_start <= hours[item.time] <= open_end,
+                            f"{item.name} scheduled at {item.time} while closed")
+
+    def test_plan_prefix_matches_fresh_build(self):
+        """Test that prefix-derived plans match fresh builds while POIs run out."""
+        config = PlannerConfig(dense_activity_days_threshold=3000, max_individual_activity_days=3000)
+        plan = PlanPrefix(self.CITY, ["history"], config)
+        for days in [2500, 10, 2999, 1200]:
+            intent = TripIntent(destination=self.CITY, days=days, preferences=["history"])
+            self.assertEqual(plan.build(days), build_itinerary(intent, config))
+
+
 class TestPlannerConfiguration(unittest.TestCase):
     """Test planner configuration options."""
 
@@ -0,0 +1,135 @@
+# test_planning_service.py
+# Unit tests for the process-pool planning service
+# Tests compact transfer, the warm pool, the bounded queue and job timeouts
+
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import data_sources
+import planning_service
+from exporters import itinerary_to_markdown
+from intent import TripIntent
+from itinerary_cache import ItineraryCache
+from planner import build_itinerary
+from planner_config import PlannerConfig
+from planning_service import (PlanningService, PlanTimeoutError, ServiceBusyError, pack_itinerary,
+                              unpack_itinerary)
+
+INTENT = TripIntent(destination="Tokyo", days=4, preferences=["food"])
+
+
+class TestPacking(unittest.TestCase):
+    """Test the compact itinerary format."""
+
+    def test_round_trip(self):
+        for days in (3, 40, 500):
+            itinerary = build_itinerary(TripIntent(destination="Paris", days=days, preferences=["art"]),
+                                        PlannerConfig(collect_timings=True))
+            unpacked = unpack_itinerary(pack_itinerary(itinerary))
+            self.assertEqual(unpacked, itinerary)
+            self.assertEqual([type(r) for r in unpacked.day_ranges], [type(r) for r in itinerary.day_ranges])
+            self.assertEqual(unpacked.timings, itinerary.timings)
+
+
+class TestProcessPool(unittest.TestCase):
+    """Test planning in real worker processes."""
+
+    def setUp(self):
+        self.service = PlanningService(workers=1, cache=ItineraryCache())
+        self.addCleanup(self.service.shutdown)
+
+    def test_same_plan_as_inline(self):
+        self.service.start()
+        itinerary, markdown = self.service.plan(INTENT)
+        expected = build_itinerary(INTENT)
+        self.assertEqual(itinerary, expected)
+        self.assertEqual(markdown, itinerary_to_markdown(expected))
+
+        # Repeats are answered from the cache without a job
+        self.assertEqual(self.service.plan(INTENT)[0], expected)
+        stats = self.service.stats()
+        self.assertEqual((stats["submitted"], stats["cache_hits"]), (1, 1))
+
+    def test_catalog_change_restarts_workers(self):
+        self.service.start()
+        pois = [{"name": f"Spot {i}", "area": "Old Town", "tags": ["food"], "open": (8, 20), "url": ""}
+                for i in range(6)]
+        data_sources.register_destination("Newtown", pois)
+        self.addCleanup(data_sources.remove_destination, "Newtown")
+
+        itinerary, _ = self.service.plan(TripIntent(destination="Newtown", days=2, preferences=["food"]))
+        self.assertTrue(all(item.name.startswith("Spot") for item in itinerary.items))
+        self.assertEqual(self.service.stats()["restarts"], 1)
+
+    def test_workers_are_spawned(self):
+        with mock.patch.object(planning_service, "ProcessPoolExecutor") as pool:
+            PlanningService(workers=1, cache=ItineraryCache())._get_executor()
+        self.assertEqual(pool.call_args.kwargs["mp_context"].get_start_method(), "spawn")
+
+
+class TestQueue(unittest.TestCase):
+    """Test the queue bound and timeouts with a thread executor and a blocking job."""
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        real_job = planning_service._plan_job
+
+        def blocking_job(*args):
+            self.release.wait(5)
+            return real_job(*args)
+
+        patcher = mock.patch.object(planning_service, "_plan_job", blocking_job)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def plan_when_free(self, service, intent):
+        """Plan once the slot held by an earlier job is released (its callback may lag)."""
+        deadline = time.monotonic() + 5
+        while True:
+            try:
+                return service.plan(intent)
+            except ServiceBusyError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.01)
+
+    def make_service(self, **kwargs):
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        return PlanningService(executor=executor, cache=ItineraryCache(), **kwargs)
+
+    def test_full_queue_rejects(self):
+        service = self.make_service(max_pending=1, timeout=5)
+        first = threading.Thread(target=service.plan, args=(INTENT,))
+        first.start()
+        while service.stats()["submitted"] == 0:
+            time.sleep(0.001)
+
+        with self.assertRaises(ServiceBusyError):
+            service.plan(TripIntent(destination="Paris", days=2, preferences=[]))
+        self.release.set()
+        first.join()
+        self.assertEqual(service.stats()["rejected"], 1)
+        # The slot is free again
+        paris = TripIntent(destination="Paris", days=2, preferences=[])
+        self.assertEqual(self.plan_when_free(service, paris)[0].days, 2)
+
+    def test_timeout(self):
+        service = self.make_service(max_pending=1, timeout=0.05)
+        with self.assertRaises(PlanTimeoutError):
+            service.plan(INTENT)
+        self.assertEqual(service.stats()["timed_out"], 1)
+
+        # The running job keeps its slot until it finishes
+        with self.assertRaises(ServiceBusyError):
+            service.plan(INTENT)
+        self.release.set()
+        service.timeout = 5
+        self.assertEqual(self.plan_when_free(service, INTENT)[0].days, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
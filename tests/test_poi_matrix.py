@@ -0,0 +1,72 @@
+# test_poi_matrix.py
+# Unit tests for the optional NumPy-vectorized scoring path
+
+import random
+import unittest
+
+import data_sources
+from intent import TripIntent
+from planner import TIME_SLOTS, build_itinerary, _is_open, _rank_pois
+from planner_config import PlannerConfig
+from poi_matrix import PoiMatrix, get_poi_matrix, numpy_available
+
+
+@unittest.skipUnless(numpy_available(), "NumPy not installed")
+class TestPoiMatrix(unittest.TestCase):
+    """Test that vectorized ranking and feasibility match the Python planner."""
+
+    def setUp(self):
+        rng = random.Random(36)
+        tags = ["food", "culture", "art", "nature", "history"]
+        self.pois = [
+            {
+                "name": f"Place {i}",
+                "area": f"Area {rng.randint(0, 20)}",
+                # Repeated tags must only count once
+                "tags": [rng.choice(tags) for _ in range(rng.randint(0, 4))],
+                "open": (rng.randint(0, 23), rng.randint(0, 24)),
+                "url": "",
+            }
+            for i in range(500)
+        ]
+        self.pois.append({"name": "No hours", "area": "Area 0", "tags": ["food"], "url": ""})
+
+    def test_rank_matches_python_sort(self):
+        """Test ranking, including tie order and unknown preferences."""
+        matrix = PoiMatrix(self.pois)
+        for prefs in [set(), {"food"}, {"art", "history", "not-a-tag"}]:
+            ranked = [self.pois[i] for i in matrix.rank(prefs)]
+            self.assertEqual(ranked, _rank_pois(self.pois, prefs))
+
+    def test_feasibility_matches_opening_hours(self):
+        """Test the POI × slot mask against the scalar check."""
+        hours = [hour for _, hour in TIME_SLOTS]
+        mask = PoiMatrix(self.pois).feasibility(hours)
+        for i, poi in enumerate(self.pois):
+            self.assertEqual(mask[i].tolist(), [_is_open(poi, hour) for hour in hours])
+
+    def test_build_itinerary_identical(self):
+        """Test that the config flag doesn't change the plan."""
+        data_sources.register_destination("Matrixville", self.pois)
+        try:
+            for days in [3, 14, 40]:
+                intent = TripIntent(destination="Matrixville", days=days, preferences=["food", "art"])
+                self.assertEqual(
+                    build_itinerary(intent, PlannerConfig()),
+                    build_itinerary(intent, PlannerConfig(vectorized_scoring=True))
+                )
+        finally:
+            data_sources.remove_destination("Matrixville")
+
+    def test_matrix_cached_per_catalog(self):
+        """Test that the matrix is built once per catalog list and rebuilt when it grows."""
+        pois = list(self.pois)
+        first = get_poi_matrix(pois)
+        self.assertIs(get_poi_matrix(pois), first)
+
+        pois.append({"name": "New", "area": "Area 1", "tags": [], "open": (9, 18), "url": ""})
+        self.assertIsNot(get_poi_matrix(pois), first)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,72 @@
+# test_preference_classifier.py
+# Unit tests for the local preference classifier and its shipped weights
+
+import os
+import tempfile
+import time
+import unittest
+
+from intent import PREFERENCE_KEYWORDS
+from preference_classifier import (
+    PreferenceClassifier, get_preference_classifier, load_corpus, split_corpus,
+    evaluate, MODEL_VERSION
+)
+
+
+class TestShippedModel(unittest.TestCase):
+    """Test the versioned weight file loaded at startup."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.classifier = get_preference_classifier()
+
+    def test_model_loads(self):
+        self.assertIsNotNone(self.classifier)
+        self.assertEqual(self.classifier.labels, PREFERENCE_KEYWORDS)
+
+    def test_common_requests(self):
+        cases = [
+            ("Plan a 3-day trip to Tokyo for food and culture", ["food", "culture"]),
+            ("Family trip to Singapore for 4 days, kid-friendly", ["family", "kids"]),
+            ("Barcelona for 2 days, gaudi buildings and tapas bars", ["food", "architecture"]),
+            ("Plan a 5-day trip to New York", []),
+        ]
+        for text, expected in cases:
+            self.assertEqual(self.classifier.predict(text), expected, text)
+
+    def test_handles_paraphrases_keyword_matching_misses(self):
+        """Test phrases without any literal PREFERENCE_KEYWORDS substring."""
+        self.assertIn("nightlife", self.classifier.predict("Berlin weekend, clubs and cocktail bars"))
+        self.assertIn("relaxation", self.classifier.predict("Bali for 7 days, spa days please"))
+
+    def test_held_out_accuracy(self):
+        """Test accuracy on the held-out split stays above the shipped level."""
+        _, held_out = split_corpus(load_corpus())
+        metrics = evaluate(self.classifier, held_out)
+
+        self.assertGreater(len(held_out), 100)
+        self.assertGreaterEqual(metrics["exact_match_accuracy"], 0.9)
+        self.assertGreaterEqual(metrics["micro"]["f1"], 0.95)
+
+    def test_inference_is_fast(self):
+        text = "I want to visit Prague for 4 days, focus on architecture and history"
+        start = time.perf_counter()
+        for _ in range(1000):
+            self.classifier.predict(text)
+        per_call = (time.perf_counter() - start) / 1000
+
+        self.assertLess(per_call, 0.001)
+
+    def test_save_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "model.json")
+            self.classifier.save(path)
+            loaded = PreferenceClassifier.load(path)
+
+        text = "London for 3 days, museums and history"
+        self.assertEqual(loaded.predict(text), self.classifier.predict(text))
+        self.assertEqual(loaded.to_dict()["version"], MODEL_VERSION)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,174 @@
+# test_replanner.py
+# Unit tests for incremental replanning
+# Tests each edit type, locked days, and that untouched days are left alone
+
+import unittest
+import data_sources
+from intent import TripIntent
+from planner import PeriodicDayRange, build_itinerary
+from planner_config import PlannerConfig
+from replanner import ChangePreferences, ExtendTrip, LockDay, RemovePOI, Replanner, replan
+from validator import validate_itinerary
+
+CITY = "Replanville"
+TAGS = ["food", "art", "nature", "history"]
+
+
+def catalog(n=80):
+    return [{"name": f"Place {i}", "area": f"Area {i % 5}", "tags": [TAGS[i % 4]],
+             "open": (8, 20), "url": ""} for i in range(n)]
+
+
+def by_day(itinerary):
+    days = {}
+    for item in itinerary.items:
+        days.setdefault(item.day, []).append((item.time, item.name))
+    return {day: sorted(items) for day, items in days.items()}
+
+
+class ReplannerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        data_sources.register_destination(CITY, catalog())
+        self.config = PlannerConfig()
+
+    def tearDown(self):
+        data_sources.remove_destination(CITY)
+
+    def plan(self, days, prefs=("food",)):
+        return build_itinerary(TripIntent(destination=CITY, days=days, preferences=list(prefs)), self.config)
+
+
+class TestRemovePOI(ReplannerTestCase):
+    """Test removing an activity."""
+
+    def test_slot_refilled_and_other_days_kept(self):
+        itinerary = self.plan(5)
+        before = by_day(itinerary)
+        target = next(item for item in itinerary.items if item.day == 3)
+
+        result = Replanner(itinerary, ["food"], config=self.config).apply(RemovePOI(target.name))
+        after = by_day(result.itinerary)
+
+        self.assertEqual(result.changed_ranges, [(3, 3)])
+        self.assertEqual(by_day(itinerary), before)  # Input is not modified
+        self.assertNotIn(target.name, [item.name for item in result.itinerary.items])
+        self.assertEqual([time for time, _ in after[3]], [time for time, _ in before[3]])
+        for day in before:
+            if day != 3:
+                self.assertEqual(after[day], before[day])
+        names = [item.name for item in result.itinerary.items]
+        self.assertEqual(len(names), len(set(names)))
+
+    def test_removed_poi_never_returns(self):
+        itinerary = self.plan(3)
+        replanner = Replanner(itinerary, ["food"], config=self.config)
+        removed = itinerary.items[0].name
+        replanner.apply(RemovePOI(removed))
+        replanner.apply(ChangePreferences(1, 3, ["food"]))
+        self.assertNotIn(removed, [item.name for item in replanner.itinerary.items])
+
+    def test_empty_day_becomes_buffer(self):
+        itinerary = build_itinerary(TripIntent(destination="Tokyo", days=3, preferences=[]), self.config)
+        replanner = Replanner(itinerary, [], pois=[], config=self.config)
+        for item in [i for i in itinerary.items if i.day == 2]:
+            replanner.apply(RemovePOI(item.name, day=2))
+        self.assertEqual(replanner.itinerary.get_uncovered_days(), [])
+        self.assertTrue(any(r.start_day == 2 and r.activity_type == "buffer"
+                            for r in replanner.itinerary.day_ranges))
+
+    def test_timed_replacement_fits(self):
+        self.config = PlannerConfig(scheduling_mode="timed")
+        itinerary = self.plan(2)
+        first = itinerary.items[0]
+        # Best ranked, in the same area, but far too long to finish before the day's next visit
+        feast = {"name": "Feast", "area": first.area, "tags": ["food"], "open": (8, 20),
+                 "duration_minutes": 600, "url": ""}
+        replanner = Replanner(itinerary, ["food"], pois=[feast] + catalog(), config=self.config)
+        replanner.apply(RemovePOI(first.name))
+        replanner.apply(ChangePreferences(2, 2, ["art"]))
+
+        replacement = next(item for item in replanner.itinerary.items if item.day == 1 and item.time == first.time)
+        self.assertNotEqual(replacement.name, "Feast")
+        self.assertTrue(validate_itinerary(replanner.itinerary).ok)
+
+    def test_unknown_poi(self):
+        with self.assertRaises(ValueError):
+            replan(self.plan(3), RemovePOI("Nowhere"), ["food"], config=self.config)
+
+
+class TestChangePreferences(ReplannerTestCase):
+    """Test re-planning a span of days for other preferences."""
+
+    def test_only_span_changes(self):
+        itinerary = self.plan(6)
+        before = by_day(itinerary)
+        result = Replanner(itinerary, ["food"], config=self.config).apply(ChangePreferences(2, 4, ["art"]))
+        after = by_day(result.itinerary)
+
+        self.assertEqual(result.changed_ranges, [(2, 4)])
+        for day in (1, 5, 6):
+            self.assertEqual(after[day], before[day])
+        for day in (2, 3, 4):
+            self.assertEqual(len(after[day]), len(before[day]))
+        tags = [tag for item in result.itinerary.items if 2 <= item.day <= 4 for tag in item.tags]
+        self.assertEqual(set(tags), {"art"})
+
+    def test_locked_day_kept(self):
+        itinerary = self.plan(6)
+        before = by_day(itinerary)
+        replanner = Replanner(itinerary, ["food"], config=self.config)
+        replanner.apply(LockDay(3))
+        result = replanner.apply(ChangePreferences(2, 4, ["nature"]))
+
+        self.assertEqual(result.changed_ranges, [(2, 2), (4, 4)])
+        self.assertEqual(by_day(result.itinerary)[3], before[3])
+        with self.assertRaises(ValueError):
+            replanner.apply(RemovePOI(before[3][0][1]))
+
+    def test_items_match_day_index_after_edits(self):
+        replanner = Replanner(self.plan(8), ["food"], config=self.config)
+        replanner.apply(ChangePreferences(2, 3, ["art"]))
+        replanner.apply(RemovePOI(replanner.items_by_day[5][0].name))
+        replanner.apply(ChangePreferences(3, 7, ["history"]))
+        replanner.apply(ExtendTrip(2))
+
+        items = replanner.itinerary.items
+        self.assertEqual(items, [item for day in sorted(replanner.items_by_day)
+                                 for item in replanner.items_by_day[day]])
+        self.assertEqual(items, sorted(items, key=lambda item: (item.day, item.time)))
+        self.assertTrue(validate_itinerary(replanner.itinerary).ok)
+
+
+class TestExtendTrip(ReplannerTestCase):
+    """Test adding days at the end."""
+
+    def test_new_activity_days(self):
+        itinerary = self.plan(3)
+        before = by_day(itinerary)
+        result = Replanner(itinerary, ["food"], config=self.config).apply(ExtendTrip(2))
+        after = by_day(result.itinerary)
+
+        self.assertEqual(result.itinerary.days, 5)
+        self.assertEqual(result.changed_ranges, [(4, 5)])
+        for day in before:
+            self.assertEqual(after[day], before[day])
+        self.assertIn(4, after)
+        self.assertIn(5, after)
+        self.assertEqual(result.itinerary.get_uncovered_days(), [])
+
+    def test_periodic_tail_grows_in_place(self):
+        itinerary = self.plan(150)
+        ranges_before = len(itinerary.day_ranges)
+        result = Replanner(itinerary, ["food"], config=self.config).apply(ExtendTrip(1000))
+
+        self.assertEqual(len(result.itinerary.day_ranges), ranges_before)
+        tail = max(result.itinerary.day_ranges, key=lambda r: r.end_day)
+        self.assertIsInstance(tail, PeriodicDayRange)
+        self.assertEqual(tail.end_day, 1150)
+        self.assertEqual(result.itinerary.get_uncovered_ranges(), [])
+        self.assertEqual(len(result.itinerary.items), len(itinerary.items))
+
+
+if __name__ == "__main__":
+    unittest.main()
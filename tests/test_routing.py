@@ -0,0 +1,108 @@
+# test_routing.py
+# Unit tests for per-day route optimization
+# Tests the heuristic itself and the planner's optimize_routes option
+
+import random
+import unittest
+from dataclasses import replace
+import data_sources
+from intent import TripIntent
+from planner import PlanPrefix, build_itinerary
+from planner_config import PlannerConfig
+from routing import (AreaTravelTimes, CoordinateTravelTimes, haversine_km, optimize_route,
+                     route_minutes)
+
+
+def random_stops(n, seed=39):
+    rng = random.Random(seed)
+    return [{"name": f"Stop {i}", "area": "Center",
+             "coords": (48.8 + rng.random() * 0.1, 2.3 + rng.random() * 0.1)}
+            for i in range(n)]
+
+
+class TestTravelTimes(unittest.TestCase):
+    """Test the travel-time sources."""
+
+    def test_area_matrix_is_symmetric(self):
+        travel = AreaTravelTimes({("A", "B"): 12.0})
+        self.assertEqual(travel.minutes({"area": "B"}, {"area": "A"}), 12.0)
+        self.assertEqual(travel.minutes({"area": "A"}, {"area": "A"}), travel.same_area_minutes)
+        self.assertEqual(travel.minutes({"area": "A"}, {"area": "C"}), travel.default_minutes)
+
+    def test_coordinates_with_fallback(self):
+        travel = CoordinateTravelTimes(speed_kmh=60.0)
+        paris, london = (48.8566, 2.3522), (51.5074, -0.1278)
+        self.assertAlmostEqual(haversine_km(paris, london), 344, delta=2)
+        self.assertAlmostEqual(travel.minutes({"coords": paris}, {"coords": london}), 344, delta=2)
+        self.assertEqual(travel.minutes({"area": "A", "coords": paris}, {"area": "B"}),
+                         travel.fallback.default_minutes)
+
+
+class TestOptimizeRoute(unittest.TestCase):
+    """Test nearest-neighbour + 2-opt ordering."""
+
+    def test_shortens_random_route(self):
+        stops = random_stops(40)
+        order = optimize_route(stops, time_limit=1.0)
+        self.assertEqual(sorted(order), list(range(40)))
+        self.assertLess(route_minutes([stops[i] for i in order]), route_minutes(stops) / 2)
+
+    def test_respects_opening_hours(self):
+        travel = AreaTravelTimes({("A", "B"): 60.0})
+        stops = [{"name": "a1", "area": "A"}, {"name": "b1", "area": "B"},
+                 {"name": "a2", "area": "A", "open": (15, 18)}, {"name": "b2", "area": "B"}]
+        hours = [9, 12, 15, 18]
+        order = optimize_route(stops, hours, travel)
+        for position, index in enumerate(order):
+            open_start, open_end = stops[index].get("open", (9, 18))
+            self.assertTrue(open_start <= hours[position] <= open_end)
+        self.assertLess(route_minutes([stops[i] for i in order], travel), route_minutes(stops, travel))
+
+    def test_small_and_timed_out_routes_are_valid(self):
+        self.assertEqual(optimize_route(random_stops(2)), [0, 1])
+        order = optimize_route(random_stops(30), time_limit=0.0)
+        self.assertEqual(sorted(order), list(range(30)))
+
+
+class TestPlannerRoutes(unittest.TestCase):
+    """Test PlannerConfig.optimize_routes."""
+
+    CITY = "Routeville"
+
+    def setUp(self):
+        # Day 1's area is A, but A1 closes before noon and A2 opens at 15:00, so the
+        # allocator alternates A, B, A, B
+        data_sources.register_destination(self.CITY, [
+            {"name": "A1", "area": "A", "tags": ["art"], "open": (9, 10), "url": ""},
+            {"name": "A2", "area": "A", "tags": ["art"], "open": (15, 18), "url": ""},
+            {"name": "B1", "area": "B", "tags": [], "open": (0, 24), "url": ""},
+            {"name": "B2", "area": "B", "tags": [], "open": (0, 24), "url": ""},
+        ])
+
+    def tearDown(self):
+        data_sources.remove_destination(self.CITY)
+
+    def test_same_visits_less_travel(self):
+        intent = TripIntent(destination=self.CITY, days=1, preferences=["art"])
+        config = PlannerConfig(dense_activity_days_threshold=0)  # up to 4 activities a day
+        plain = build_itinerary(intent, config)
+        routed = build_itinerary(intent, replace(config, optimize_routes=True))
+
+        self.assertEqual([(i.time, i.name) for i in plain.items],
+                         [("09:00", "A1"), ("12:00", "B1"), ("15:00", "A2"), ("18:00", "B2")])
+        self.assertEqual([(i.time, i.name) for i in routed.items],
+                         [("09:00", "A1"), ("12:00", "B1"), ("15:00", "B2"), ("18:00", "A2")])
+        travel = AreaTravelTimes()
+        self.assertLess(route_minutes([{"area": i.area} for i in routed.items], travel),
+                        route_minutes([{"area": i.area} for i in plain.items], travel))
+
+    def test_plan_prefix_matches(self):
+        config = PlannerConfig(optimize_routes=True)
+        plan = PlanPrefix("Paris", ["art"], config)
+        for days in (3, 20, 5):
+            self.assertEqual(plan.build(days),
+                             build_itinerary(TripIntent("Paris", days, ["art"]), config))
+
+
+if __name__ == "__main__":
+    unittest.main()
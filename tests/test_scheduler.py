@@ -0,0 +1,196 @@
+# test_scheduler.py
+# Unit tests for the timed scheduling engine
+# Tests text parsing, schedule validity, repair, and the planner/LLM integrations
+
+import dataclasses
+import unittest
+from unittest import mock
+from intent import TripIntent
+from planner import PlanPrefix, build_itinerary, iter_itinerary, schedule_itinerary, ItineraryDay
+from planner_config import PlannerConfig
+from routing import AreaTravelTimes
+from scheduler import (Scheduler, format_clock, parse_best_time, parse_duration_minutes,
+                       parse_opening_hours)
+from llm_planner import LLMGeneratedPOI, LLMTripPlanner, llm_poi_to_dict
+from validator import validate_itinerary
+
+
+def generated_pois():
+    """POIs as Claude might generate them, with free-text hours and durations."""
+    return [
+        LLMGeneratedPOI(name="Harbour Walk", area="Waterfront", description="", tags=["nature"],
+                        estimated_duration="1-2 hours", best_time_to_visit="Morning",
+                        opening_hours="24/7", google_maps_query="Harbour Walk"),
+        LLMGeneratedPOI(name="Night Market", area="Old Town", description="", tags=["food"],
+                        estimated_duration="2 hours", best_time_to_visit="Evening",
+                        opening_hours="5pm-11pm", google_maps_query="Night Market"),
+        LLMGeneratedPOI(name="City Museum", area="Old Town", description="", tags=["museum"],
+                        estimated_duration="Varies", best_time_to_visit="Any time",
+                        opening_hours="Varies", google_maps_query="City Museum"),
+    ]
+
+
+def minutes(clock):
+    hour, minute = map(int, clock.split(":"))
+    return hour * 60 + minute
+
+
+class TestParsing(unittest.TestCase):
+    """Test reading the free-text fields Claude returns."""
+
+    def test_durations(self):
+        self.assertEqual(parse_duration_minutes("2-3 hours"), 150)
+        self.assertEqual(parse_duration_minutes("45 min"), 45)
+        self.assertEqual(parse_duration_minutes("1 hour 30 minutes"), 90)
+        self.assertEqual(parse_duration_minutes("Half day"), 240)
+        self.assertEqual(parse_duration_minutes("Varies"), 120)
+        self.assertIsNone(parse_duration_minutes("Varies", default=None))
+
+    def test_opening_hours(self):
+        self.assertEqual(parse_opening_hours("9:00-18:00"), (540, 1080))
+        self.assertEqual(parse_opening_hours("10am - 5pm"), (600, 1020))
+        self.assertEqual(parse_opening_hours("24/7"), (0, 1440))
+        self.assertEqual(parse_opening_hours("18:00-02:00"), (1080, 1440))
+        self.assertIsNone(parse_opening_hours("Varies"))
+
+    def test_best_time(self):
+        self.assertEqual(parse_best_time("Early morning"), (540, 720))
+        self.assertIsNone(parse_best_time("Any time"))
+        self.assertEqual(format_clock(545), "09:05")
+
+
+class TestScheduler(unittest.TestCase):
+    """Test that schedules respect durations, hours, travel and caps."""
+
+    def setUp(self):
+        self.travel = AreaTravelTimes({("A", "B"): 45.0}, same_area_minutes=10.0)
+        self.scheduler = Scheduler(self.travel)
+
+    def assertValid(self, visits, day_caps):
+        by_day = {}
+        for visit in visits:
+            by_day.setdefault(visit.day, []).append(visit)
+        names = [visit.poi["name"] for visit in visits]
+        self.assertEqual(len(names), len(set(names)))
+        for day, day_visits in by_day.items():
+            self.assertLessEqual(len(day_visits), day_caps[day - 1])
+            for prev, visit in zip(day_visits, day_visits[1:]):
+                gap = self.travel.minutes(prev.poi, visit.poi)
+                self.assertGreaterEqual(visit.start, prev.end + gap)
+            for visit in day_visits:
+                open_start, open_end = self.scheduler.window(visit.poi)
+                self.assertTrue(open_start <= visit.start and visit.end <= open_end)
+                self.assertEqual(visit.end - visit.start, self.scheduler.duration(visit.poi))
+
+    def test_packs_by_duration(self):
+        pois = [{"name": f"P{i}", "area": "AB"[i % 2], "open": (9, 21), "duration_minutes": 60}
+                for i in range(12)]
+        visits = self.scheduler.schedule(pois, [6, 6])
+        self.assertValid(visits, [6, 6])
+        self.assertEqual(len(visits), 12)
+
+    def test_opening_windows(self):
+        pois = [
+            {"name": "Late", "area": "A", "open_minutes": (17 * 60, 21 * 60), "duration_minutes": 120},
+            {"name": "Early", "area": "A", "open_minutes": (9 * 60, 11 * 60), "duration_minutes": 90},
+            {"name": "Closed", "area": "A", "open_minutes": (22 * 60, 23 * 60)},
+        ]
+        visits = self.scheduler.schedule(pois, [3])
+        self.assertValid(visits, [3])
+        self.assertEqual([(v.poi["name"], v.time) for v in visits], [("Early", "09:00"), ("Late", "17:00")])
+
+    def test_repair_fills_left_over_room(self):
+        # Greedy day 1 takes the two quick visits; the long one only fits on day 2
+        pois = [{"name": "Quick 1", "area": "A", "duration_minutes": 60},
+                {"name": "Quick 2", "area": "A", "duration_minutes": 60},
+                {"name": "Long", "area": "A", "open": (9, 21), "duration_minutes": 600}]
+        visits = self.scheduler.schedule(pois, [2, 1])
+        self.assertValid(visits, [2, 1])
+        self.assertEqual(len(visits), 3)
+
+    def test_repair_independent_of_clock(self):
+        # 20 ms per clock read would have stopped a 50 ms deadline mid-repair
+        pois = [{"name": f"P{i}", "area": "AB"[i % 2], "open": (9 + i % 4, 21),
+                 "duration_minutes": 60 + 30 * (i % 5)} for i in range(40)]
+        expected = self.scheduler.schedule(pois, [3] * 6, repair_caps=[5] * 6)
+        ticks = iter(range(10 ** 6))
+        with mock.patch("scheduler.time.perf_counter", lambda: next(ticks) * 0.02):
+            slow = self.scheduler.schedule(pois, [3] * 6, repair_caps=[5] * 6)
+        self.assertEqual(slow, expected)
+        self.assertGreater(len(expected), 18)
+
+    def test_zero_deadline_still_valid(self):
+        pois = [{"name": f"P{i}", "area": "AB"[i % 3 == 0], "open": (i % 12, 24)} for i in range(200)]
+        scheduler = Scheduler(self.travel, time_limit=0.0)
+        visits = scheduler.schedule(pois, [4] * 20)
+        self.scheduler = scheduler
+        self.assertValid(visits, [4] * 20)
+
+
+class TestTimedPlanning(unittest.TestCase):
+    """Test scheduling_mode="timed" and the LLM POI mapping."""
+
+    def test_build_itinerary_timed(self):
+        config = PlannerConfig(scheduling_mode="timed")
+        intent = TripIntent(destination="Tokyo", days=20, preferences=["food"])
+        itinerary = build_itinerary(intent, config)
+
+        self.assertEqual(len(itinerary.get_uncovered_days()), 0)
+        for item in itinerary.items:
+            self.assertGreaterEqual(minutes(item.time), config.day_start_hour * 60)
+            self.assertLessEqual(minutes(item.time) + item.duration_minutes, config.day_end_hour * 60)
+
+        streamed = list(iter_itinerary(intent, config))
+        self.assertEqual([i for part in streamed if isinstance(part, ItineraryDay) for i in part.items],
+                         itinerary.items)
+        self.assertEqual(PlanPrefix("Tokyo", ["food"], config).build(20), itinerary)
+
+    def test_optimize_routes(self):
+        # Greedy earliest finish goes A, B, B, A; A, A, B, B travels 20 minutes less
+        pois = [{"name": "A1", "area": "A", "duration_minutes": 30},
+                {"name": "B1", "area": "B", "duration_minutes": 30},
+                {"name": "B2", "area": "B", "duration_minutes": 120},
+                {"name": "A2", "area": "A", "duration_minutes": 120}]
+        intent = TripIntent("Atlantis", 1, [])
+        config = PlannerConfig(dense_activity_days_threshold=0, max_activities_per_day=4)
+        plan = schedule_itinerary(intent, pois, config)
+        routed = schedule_itinerary(intent, pois, dataclasses.replace(config, optimize_routes=True))
+        self.assertEqual([item.name for item in plan.items], ["A1", "B1", "B2", "A2"])
+        self.assertEqual([(item.time, item.name) for item in routed.items],
+                         [("09:00", "A1"), ("09:40", "A2"), ("12:10", "B1"), ("12:50", "B2")])
+        self.assertTrue(validate_itinerary(routed).ok)
+
+        # The shorter route would start B2 after it closes, so the day keeps its order
+        pois[2]["open"] = (9, 13)
+        routed = schedule_itinerary(intent, pois, dataclasses.replace(config, optimize_routes=True))
+        self.assertEqual(routed.items, schedule_itinerary(intent, pois, config).items)
+
+    def test_llm_pois(self):
+        generated = generated_pois()
+        poi = llm_poi_to_dict(generated[1])
+        self.assertEqual(poi["open_minutes"], (17 * 60, 23 * 60))
+        self.assertEqual(poi["duration_minutes"], 120)
+
+        itinerary = schedule_itinerary(TripIntent("Atlantis", 2, ["food"]),
+                                       [llm_poi_to_dict(p) for p in generated])
+        self.assertEqual(len(itinerary.get_uncovered_days()), 0)
+        self.assertEqual({item.name for item in itinerary.items}, {p.name for p in generated})
+        market = next(item for item in itinerary.items if item.name == "Night Market")
+        self.assertGreaterEqual(minutes(market.time), 17 * 60)
+
+    def test_llm_plan_without_second_call(self):
+        with mock.patch.dict("os.environ", {"ANTHROPIC_API_KEY": "test-key"}):
+            planner = LLMTripPlanner()
+        planner.config = dataclasses.replace(planner.config, schedule_generated_pois=True)
+        intent = TripIntent("Atlantis", 3, ["food"])
+        with mock.patch.object(planner, "_generate_pois_with_llm", return_value=generated_pois()), \
+                mock.patch.object(planner, "_create_llm_itinerary") as second_call:
+            itinerary = planner.plan_trip(intent)
+
+        second_call.assert_not_called()
+        self.assertEqual(itinerary, schedule_itinerary(intent, [llm_poi_to_dict(p) for p in generated_pois()]))
+        self.assertTrue(validate_itinerary(itinerary).ok)
+
+
+if __name__ == "__main__":
+    unittest.main()
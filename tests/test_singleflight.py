@@ -0,0 +1,126 @@
+# test_singleflight.py
+# Unit tests for request coalescing across threads and coroutines
+
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from intent import TripIntent
+from planner import build_itinerary
+from singleflight import SingleFlight, AsyncSingleFlight, normalize_request_key
+
+
+class TestNormalizeRequestKey(unittest.TestCase):
+    """Test request key normalization."""
+
+    def test_case_and_whitespace_ignored(self):
+        self.assertEqual(
+            normalize_request_key("  Plan a 3-day trip to TOKYO "),
+            normalize_request_key("plan a 3-day   trip to tokyo")
+        )
+
+    def test_different_requests_differ(self):
+        self.assertNotEqual(
+            normalize_request_key("Tokyo for 3 days"),
+            normalize_request_key("Tokyo for 4 days")
+        )
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Test thread-based coalescing used by the Flask backend."""
+
+    def test_concurrent_identical_calls_run_once(self):
+        """Test that identical in-flight requests share one computation."""
+        flight = SingleFlight()
+        calls = []
+        barrier = threading.Barrier(8)
+
+        def plan():
+            calls.append(1)
+            time.sleep(0.2)
+            return build_itinerary(TripIntent(destination="Tokyo", days=3, preferences=["food"]))
+
+        def request():
+            barrier.wait()
+            return flight.do("tokyo", plan)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: request(), range(8)))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.executions, 1)
+        self.assertEqual(flight.coalesced, 7)
+
+        # Each caller gets its own copy
+        self.assertEqual(len({id(r) for r in results}), 8)
+        results[0].items.clear()
+        self.assertGreater(len(results[1].items), 0)
+
+    def test_sequential_calls_recompute(self):
+        """Test that a finished call isn't reused by later requests."""
+        flight = SingleFlight()
+        calls = []
+        flight.do("k", lambda: calls.append(1))
+        flight.do("k", lambda: calls.append(1))
+        self.assertEqual(len(calls), 2)
+
+    def test_errors_reach_every_caller(self):
+        """Test that a failing computation raises in leader and followers."""
+        flight = SingleFlight()
+        barrier = threading.Barrier(3)
+
+        def boom():
+            time.sleep(0.1)
+            raise RuntimeError("planner failed")
+
+        def request():
+            barrier.wait()
+            try:
+                flight.do("k", boom)
+            except RuntimeError as e:
+                return str(e)
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            errors = list(pool.map(lambda _: request(), range(3)))
+
+        self.assertEqual(errors, ["planner failed"] * 3)
+
+
+class TestAsyncSingleFlight(unittest.IsolatedAsyncioTestCase):
+    """Test coroutine-based coalescing used by the uAgents handler."""
+
+    async def test_concurrent_identical_calls_run_once(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def plan():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return {"items": [1, 2, 3]}
+
+        results = await asyncio.gather(*[flight.do("k", plan) for _ in range(5)])
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.coalesced, 4)
+        results[0]["items"].clear()
+        self.assertEqual(results[1]["items"], [1, 2, 3])
+
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        flight = AsyncSingleFlight()
+
+        async def plan():
+            await asyncio.sleep(0.1)
+            return "done"
+
+        first = asyncio.create_task(flight.do("k", plan))
+        second = asyncio.create_task(flight.do("k", plan))
+        await asyncio.sleep(0.02)
+        first.cancel()
+
+        self.assertEqual(await second, "done")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
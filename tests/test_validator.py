@@ -0,0 +1,99 @@
+# test_validator.py
+# Unit tests for the itinerary validator
+# Tests each violation type on hand-built itineraries and that planner output validates clean
+
+import unittest
+from intent import TripIntent
+from planner import DayRange, Itinerary, ItineraryItem, PeriodicDayRange, build_itinerary
+from planner_config import PlannerConfig
+from validator import (ACTIVITY_IN_RANGE, DUPLICATE_POI, GAP, INVALID_DAYS, INVALID_RANGE, INVALID_TIME,
+                       OUT_OF_RANGE, RANGE_OVERLAP, SLOT_COLLISION, ItineraryValidationError,
+                       check_itinerary, validate_itinerary)
+
+
+def item(day, time, name, duration=120):
+    return ItineraryItem(day=day, time=time, name=name, area="Centre", tags=[], url="",
+                         duration_minutes=duration)
+
+
+def rest(start, end):
+    return DayRange(start_day=start, end_day=end, description="Rest", activity_type="rest")
+
+
+class TestViolations(unittest.TestCase):
+    """Test that each broken guarantee is reported."""
+
+    def codes(self, itinerary):
+        return validate_itinerary(itinerary).codes
+
+    def test_valid(self):
+        itinerary = Itinerary(destination="X", days=10, items=[item(1, "09:00", "A"), item(1, "11:00", "B"),
+                                                                item(2, "09:00", "C")],
+                              day_ranges=[rest(3, 4), PeriodicDayRange(5, 10, "Rest", period_days=7)])
+        result = validate_itinerary(itinerary)
+        self.assertTrue(result.ok)
+        check_itinerary(itinerary)
+
+    def test_gaps(self):
+        itinerary = Itinerary(destination="X", days=9, items=[item(2, "09:00", "A")], day_ranges=[rest(4, 6)])
+        gaps = validate_itinerary(itinerary).by_code(GAP)
+        self.assertEqual([(v.start_day, v.end_day) for v in gaps], [(1, 1), (3, 3), (7, 9)])
+
+    def test_overlaps(self):
+        itinerary = Itinerary(destination="X", days=10, items=[item(5, "09:00", "A")],
+                              day_ranges=[rest(1, 4), rest(3, 6), rest(7, 10)])
+        result = validate_itinerary(itinerary)
+        overlap = result.by_code(RANGE_OVERLAP)
+        self.assertEqual([(v.start_day, v.end_day) for v in overlap], [(3, 4)])
+        self.assertEqual([v.start_day for v in result.by_code(ACTIVITY_IN_RANGE)], [5])
+
+    def test_out_of_range(self):
+        itinerary = Itinerary(destination="X", days=3, items=[item(0, "09:00", "A"), item(2, "09:00", "B")],
+                              day_ranges=[rest(1, 1), rest(3, 5)])
+        self.assertEqual(len(validate_itinerary(itinerary).by_code(OUT_OF_RANGE)), 2)
+
+    def test_bad_days_and_ranges(self):
+        self.assertEqual(self.codes(Itinerary(destination="X", days=0, items=[])), [INVALID_DAYS])
+        itinerary = Itinerary(destination="X", days=2, items=[item(1, "09:00", "A")], day_ranges=[rest(2, 1)])
+        self.assertEqual(self.codes(itinerary), [INVALID_RANGE, GAP])
+
+    def test_duplicates_and_times(self):
+        itinerary = Itinerary(destination="X", days=2, items=[item(1, "09:00", "A"), item(2, "09:00", "A"),
+                                                               item(2, "Morning", "B"), item(2, "25:00", "C")])
+        result = validate_itinerary(itinerary)
+        self.assertEqual(result.by_code(DUPLICATE_POI)[0].names, ["A"])
+        self.assertEqual([v.names for v in result.by_code(INVALID_TIME)], [["B"], ["C"]])
+
+    def test_slot_collisions(self):
+        itinerary = Itinerary(destination="X", days=1, items=[
+            item(1, "09:00", "Long", duration=300), item(1, "10:00", "Inside"), item(1, "13:00", "Tail"),
+            item(1, "15:00", "After")])
+        collisions = validate_itinerary(itinerary).by_code(SLOT_COLLISION)
+        self.assertEqual([v.names for v in collisions], [["Long", "Inside"], ["Long", "Tail"]])
+
+    def test_check_raises(self):
+        with self.assertRaises(ItineraryValidationError) as caught:
+            check_itinerary(Itinerary(destination="X", days=2, items=[item(1, "09:00", "A")]))
+        self.assertEqual([v.code for v in caught.exception.violations], [GAP])
+
+
+class TestPlannerOutput(unittest.TestCase):
+    """Test that planner output satisfies every guarantee."""
+
+    def test_build_itinerary(self):
+        configs = [PlannerConfig(), PlannerConfig(scheduling_mode="timed"), PlannerConfig(optimize_routes=True)]
+        for city in ("Tokyo", "London", "New York"):
+            for days in (1, 3, 7, 14, 45, 400):
+                for config in configs:
+                    itinerary = build_itinerary(TripIntent(destination=city, days=days, preferences=["food"]),
+                                                config)
+                    result = validate_itinerary(itinerary)
+                    self.assertTrue(result.ok, (city, days, config.scheduling_mode, result.violations[:3]))
+
+    def test_very_long_trip(self):
+        itinerary = build_itinerary(TripIntent(destination="Paris", days=100000, preferences=["art"]))
+        self.assertTrue(validate_itinerary(itinerary).ok)
+
+
+if __name__ == "__main__":
+    unittest.main()
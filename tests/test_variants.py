@@ -0,0 +1,87 @@
+# test_variants.py
+# Unit tests for multi-variant itinerary generation
+# Tests the shared objective, variant diversity and executor independence
+
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import variants as variants_module
+from intent import TripIntent
+from itinerary_cache import ItineraryCache
+from planner import Itinerary, ItineraryItem, build_itinerary
+from planning_service import PlanningService
+from variants import ObjectiveWeights, generate_variants, score_itinerary
+
+
+def item(day, time, area, tags):
+    return ItineraryItem(day=day, time=time, name=f"{area} {day} {time}", area=area, tags=tags, url="")
+
+
+class TestScoreItinerary(unittest.TestCase):
+    """Test the objective's parts."""
+
+    def test_parts(self):
+        itinerary = Itinerary(destination="X", days=2, items=[
+            item(1, "09:00", "A", ["food"]), item(1, "12:00", "B", ["art"]),
+            item(2, "09:00", "A", ["food"]), item(2, "12:00", "A", []),
+        ])
+        score = score_itinerary(itinerary, ["food", "history"])
+        self.assertAlmostEqual(score.coverage, (2 / 4 + 1 / 2) / 2)
+        self.assertEqual(score.travel_minutes, 30 + 10)
+        self.assertEqual(score.balance, 1.0)
+
+        weights = ObjectiveWeights(coverage=1.0, travel=0.0, balance=0.0)
+        self.assertAlmostEqual(score_itinerary(itinerary, ["food"], weights).total, 0.75)
+
+    def test_unbalanced_days_score_lower(self):
+        even = Itinerary("X", 2, [item(1, "09:00", "A", []), item(2, "09:00", "A", [])])
+        uneven = Itinerary("X", 2, [item(1, "09:00", "A", []), item(1, "12:00", "A", []),
+                                    item(1, "15:00", "A", []), item(2, "09:00", "A", [])])
+        self.assertGreater(score_itinerary(even, []).balance, score_itinerary(uneven, []).balance)
+
+    def test_empty(self):
+        self.assertEqual(score_itinerary(Itinerary("X", 3, []), ["food"]).total, 0.0)
+
+
+class TestGenerateVariants(unittest.TestCase):
+    """Test generation and ranking."""
+
+    def setUp(self):
+        self.intent = TripIntent(destination="Tokyo", days=5, preferences=["food", "culture"])
+
+    def test_ranked_and_distinct(self):
+        variants = generate_variants(self.intent, k=8, top_n=8, workers=1)
+        self.assertGreater(len(variants), 1)
+        scores = [v.score.total for v in variants]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        plans = {tuple((i.day, i.time, i.name) for i in v.itinerary.items) for v in variants}
+        self.assertEqual(len(plans), len(variants))
+        for variant in variants:
+            self.assertEqual(variant.itinerary.get_uncovered_days(), [])
+
+    def test_standard_plan_is_a_candidate(self):
+        variants = generate_variants(self.intent, k=1, top_n=1, workers=1)
+        self.assertEqual(variants[0].seed, 0)
+        self.assertEqual(variants[0].itinerary, build_itinerary(self.intent))
+
+    def test_same_result_on_a_pool(self):
+        inline = generate_variants(self.intent, k=8, top_n=3, workers=1)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            pooled = generate_variants(self.intent, k=8, top_n=3, executor=executor, workers=3)
+        self.assertEqual([(v.seed, v.itinerary) for v in inline], [(v.seed, v.itinerary) for v in pooled])
+
+    def test_defaults_to_planning_service_pool(self):
+        inline = generate_variants(self.intent, k=8, top_n=3, workers=1)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            service = PlanningService(executor=executor, cache=ItineraryCache())
+            with mock.patch.object(variants_module, "get_planning_service", return_value=service):
+                pooled = generate_variants(self.intent, k=8, top_n=3, workers=2)
+        self.assertEqual([(v.seed, v.itinerary) for v in inline], [(v.seed, v.itinerary) for v in pooled])
+        self.assertEqual(service.stats()["submitted"], 2)
+
+    def test_unsupported_city(self):
+        self.assertEqual(generate_variants(TripIntent("Atlantis", 3, []), workers=1), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,210 @@
+# test_web_api.py
+# Unit tests for the Flask API using the test client (static mode, no API key)
+
+import json
+import os
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "web_app", "backend"))
+
+import app as backend
+from itinerary_cache import ItineraryCache
+from planner import Itinerary, ItineraryItem
+from planning_service import PlanningService, PlanTimeoutError, ServiceBusyError
+
+
+class ApiTestCase(unittest.TestCase):
+    """Runs every request in static mode so no test reaches Claude."""
+
+    def setUp(self):
+        env = mock.patch.dict(os.environ)
+        env.start()
+        self.addCleanup(env.stop)
+        os.environ.pop("ANTHROPIC_API_KEY", None)
+        self.client = backend.app.test_client()
+
+
+class TestPlanStream(ApiTestCase):
+    """Test the NDJSON /api/plan/stream endpoint."""
+
+    def stream(self, message):
+        response = self.client.post("/api/plan/stream", json={"message": message})
+        events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        return response, events
+
+    def test_streams_days_in_order(self):
+        """Test the intent, day/range and done events for a long trip."""
+        response, events = self.stream("Plan a 40-day trip to Tokyo for food")
+
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        self.assertEqual(events[0]["type"], "intent")
+        self.assertEqual(events[0]["days"], 40)
+        self.assertEqual(events[1]["type"], "day")
+        self.assertEqual(events[1]["day"], 1)
+        self.assertEqual(events[-1]["type"], "done")
+
+        # Days and ranges tile the whole trip in order
+        next_day = 1
+        for event in events[1:-1]:
+            if event["type"] == "day":
+                self.assertEqual(event["day"], next_day)
+                next_day += 1
+            else:
+                self.assertEqual(event["start_day"], next_day)
+                next_day = event["end_day"] + 1
+        self.assertEqual(next_day, 41)
+
+    def test_streamed_itinerary_downloadable(self):
+        """Test that the finished stream can be downloaded as a calendar."""
+        _, events = self.stream("3 days in Paris")
+        itinerary_id = events[-1]["itinerary_id"]
+
+        response = self.client.get(f"/api/download/{itinerary_id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"BEGIN:VCALENDAR", response.data)
+
+    def test_unsupported_city_rejected_before_streaming(self):
+        """Test that planning errors are plain JSON responses."""
+        response = self.client.post("/api/plan/stream", json={"message": "5 days in Atlantis"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.get_json()["success"])
+
+    def test_multi_city(self):
+        """Test that every leg of a multi-city request is streamed."""
+        service = PlanningService(executor=ThreadPoolExecutor(max_workers=1), cache=ItineraryCache())
+        with mock.patch.object(backend, "get_planning_service", return_value=service):
+            _, events = self.stream("Tokyo 4 days then Singapore 3 for food")
+
+        self.assertEqual(events[0]["destination"], "Tokyo → Singapore")
+        self.assertEqual(events[0]["days"], 7)
+        self.assertEqual(max(event["day"] for event in events if event["type"] == "day"), 7)
+        self.assertEqual(events[-1]["type"], "done")
+        self.assertEqual(events[-1]["violations"], [])
+
+        response = self.client.post("/api/plan/stream", json={"message": "Tokyo 4 days then Atlantis 3"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Atlantis", response.get_json()["error"])
+
+
+class TestPlanVariants(ApiTestCase):
+    """Test the /api/plan/variants endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(executor.shutdown)
+        service = PlanningService(executor=executor, cache=ItineraryCache())
+        patcher = mock.patch("variants.get_planning_service", return_value=service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_returns_scored_variants(self):
+        """Test that variants come back best first and can be downloaded."""
+        response = self.client.post("/api/plan/variants",
+                                    json={"message": "Plan a 5-day trip to Tokyo for food", "count": 6, "top": 2})
+        data = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(data["success"])
+        self.assertLessEqual(len(data["variants"]), 2)
+        totals = [v["score"]["total"] for v in data["variants"]]
+        self.assertEqual(totals, sorted(totals, reverse=True))
+        download = self.client.get(f"/api/download/{data['variants'][0]['itinerary_id']}")
+        self.assertEqual(download.status_code, 200)
+
+    def test_rejects_bad_count(self):
+        """Test that a non-numeric count is a 400."""
+        response = self.client.post("/api/plan/variants", json={"message": "Tokyo", "count": "many"})
+        self.assertEqual(response.status_code, 400)
+
+
+class TestPlanGroup(ApiTestCase):
+    """Test the /api/plan/group endpoint."""
+
+    def test_group_plan(self):
+        response = self.client.post("/api/plan/group", json={
+            "destination": "Tokyo", "days": 3,
+            "travellers": [{"name": "Ana", "preferences": ["food"], "weight": 2},
+                           {"name": "Ben", "preferences": ["nature"], "must_see": ["Ueno Park"]}]})
+        data = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(data["preference_weights"]), ["food", "nature"])
+        self.assertEqual([c["name"] for c in data["coverage"]], ["Ana", "Ben"])
+        self.assertEqual(data["coverage"][1]["must_see_planned"], ["Ueno Park"])
+        self.assertEqual(data["itinerary"]["days"], 3)
+
+    def test_bad_requests(self):
+        for body in ({"destination": "Tokyo", "travellers": []},
+                     {"destination": "Tokyo", "travellers": [{"weight": "heavy"}]},
+                     {"destination": "Atlantis", "travellers": [{"preferences": ["food"]}]},
+                     {"destination": "Tokyo", "travellers": [{"preferences": ["food"], "weight": -1}]},
+                     {"destination": "Tokyo", "days": 0, "travellers": [{"preferences": ["food"]}]},
+                     {"destination": "Tokyo", "days": -3, "travellers": [{"preferences": ["food"]}]}):
+            response = self.client.post("/api/plan/group", json=body)
+            self.assertEqual(response.status_code, 400, body)
+
+
+class TestPlan(ApiTestCase):
+    """Test /api/plan through the planning service."""
+
+    def setUp(self):
+        super().setUp()
+        service = PlanningService(executor=ThreadPoolExecutor(max_workers=1), cache=ItineraryCache())
+        patcher = mock.patch.object(backend, "get_planning_service", return_value=service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = service
+
+    def test_plans_in_service(self):
+        response = self.client.post("/api/plan", json={"message": "Plan a 4-day trip to Paris for art"})
+        data = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["itinerary"]["days"], 4)
+        self.assertEqual(data["violations"], [])
+        self.assertEqual(self.service.stats()["submitted"], 1)
+
+    def test_reports_violations(self):
+        broken = Itinerary(destination="Paris", days=2, items=[
+            ItineraryItem(day=1, time="09:00", name="Louvre", area="Centre", tags=["art"], url="")])
+        with mock.patch.object(self.service, "plan", return_value=(broken, "")):
+            data = self.client.post("/api/plan", json={"message": "Plan a 2-day trip to Paris"}).get_json()
+        self.assertTrue(data["success"])
+        self.assertEqual([(v["code"], v["start_day"]) for v in data["violations"]], [("gap", 2)])
+
+    def test_busy_and_timeout_statuses(self):
+        for error, status in ((ServiceBusyError("full"), 503), (PlanTimeoutError("slow"), 504)):
+            with mock.patch.object(self.service, "plan", side_effect=error):
+                response = self.client.post("/api/plan", json={"message": "Plan a 2-day trip to London"})
+            self.assertEqual(response.status_code, status)
+            self.assertFalse(response.get_json()["success"])
+
+    def test_multi_city(self):
+        response = self.client.post("/api/plan", json={"message": "Tokyo 4 days then Singapore 3 for food"})
+        data = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["intent"]["destination"], "Tokyo → Singapore")
+        self.assertEqual(data["itinerary"]["days"], 7)
+        self.assertEqual(max(item["day"] for item in data["itinerary"]["items"]), 7)
+        # One job per leg
+        self.assertEqual(self.service.stats()["submitted"], 2)
+
+    def test_multi_city_unsupported_leg(self):
+        response = self.client.post("/api/plan", json={"message": "Tokyo 4 days then Atlantis 3"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Atlantis", response.get_json()["error"])
+
+    def test_sights_list_is_single_city(self):
+        for message, destination in (("Plan a 5-day trip to New York, Broadway and Central Park", "New York"),
+                                     ("Family trip to Singapore for 4 days, Kid-friendly", "Singapore")):
+            response = self.client.post("/api/plan", json={"message": message})
+            self.assertEqual(response.status_code, 200, message)
+            self.assertEqual(response.get_json()["intent"]["destination"], destination)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
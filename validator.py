@@ -0,0 +1,186 @@
+# validator.py
+# Structural checks for itineraries from any planner, cheap enough to run on every response
+# Finds gaps, overlaps, out-of-range days, duplicate POIs and slot collisions
+
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from planner import Itinerary
+
+# Violation codes
+INVALID_DAYS = "invalid_days"            # trip length below 1
+INVALID_RANGE = "invalid_range"          # range ending before it starts
+OUT_OF_RANGE = "out_of_range"            # activity or range outside days 1..days
+GAP = "gap"                              # days with neither activities nor a range
+RANGE_OVERLAP = "range_overlap"          # two ranges sharing days
+ACTIVITY_IN_RANGE = "activity_in_range"  # activity on a day a range already covers
+DUPLICATE_POI = "duplicate_poi"          # same POI planned more than once
+INVALID_TIME = "invalid_time"            # activity time that isn't "HH:MM"
+SLOT_COLLISION = "slot_collision"        # activities on one day overlapping in time
+
+_TIME_RE = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*$")
+
+
+@dataclass
+class Violation:
+    """
+    One broken guarantee.
+
+    Attributes:
+        code: One of the codes above
+        message: Human-readable description
+        start_day: First day affected, when the violation has days
+        end_day: Last day affected
+        names: Activities involved, if any
+    """
+    code: str
+    message: str
+    start_day: Optional[int] = None
+    end_day: Optional[int] = None
+    names: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ValidationResult:
+    """Violations found in one itinerary, in the order the checks ran."""
+    violations: List[Violation]
+
+    @property
+    def ok(self) -> bool:
+        return not self.violations
+
+    @property
+    def codes(self) -> List[str]:
+        """Distinct violation codes, in first-seen order."""
+        return list(dict.fromkeys(v.code for v in self.violations))
+
+    def by_code(self, code: str) -> List[Violation]:
+        return [v for v in self.violations if v.code == code]
+
+
+class ItineraryValidationError(ValueError):
+    """Raised by check_itinerary() for an itinerary with violations."""
+
+    def __init__(self, violations: List[Violation]):
+        self.violations = violations
+        super().__init__("; ".join(v.message for v in violations))
+
+
+def _start_minute(time_label: str) -> Optional[int]:
+    """Minutes after midnight for "HH:MM", or None if it isn't a valid time."""
+    match = _TIME_RE.match(time_label or "")
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if hour > 23 or minute > 59:
+        return None
+    return hour * 60 + minute
+
+
+def _day_span(start: int, end: int) -> str:
+    return f"day {start}" if start == end else f"days {start}–{end}"
+
+
+def validate_itinerary(itinerary: Itinerary) -> ValidationResult:
+    """
+    Check an itinerary against the planner's guarantees.
+
+    - The trip has at least one day, and every day from 1 to itinerary.days
+      has activities or falls in a day range (no gaps)
+    - Nothing is planned outside those days
+    - Day ranges don't overlap each other or days with activities
+    - No POI is planned twice, and no two activities on a day overlap in
+      time (start time plus duration_minutes)
+
+    Ranges are checked as spans, never expanded into days, so the cost is
+    O(items + ranges log ranges) plus sorting each day's activities,
+    whatever the trip length.
+
+    Returns:
+        ValidationResult; .ok is True when nothing is wrong
+    """
+    violations: List[Violation] = []
+    days = itinerary.days
+    if not isinstance(days, int) or days < 1:
+        violations.append(Violation(INVALID_DAYS, f"Trip length must be at least 1 day, not {days!r}"))
+        return ValidationResult(violations)
+
+    # Day ranges: bounds, then overlaps between ranges in start order
+    spans: List[Tuple[int, int]] = []
+    for day_range in itinerary.day_ranges:
+        start, end = day_range.start_day, day_range.end_day
+        if start > end:
+            violations.append(Violation(INVALID_RANGE, f"Range days {start}–{end} ends before it starts",
+                                        start_day=start, end_day=end))
+            continue
+        if start < 1 or end > days:
+            violations.append(Violation(OUT_OF_RANGE, f"Range {_day_span(start, end)} falls outside days 1–{days}",
+                                        start_day=start, end_day=end))
+        spans.append((start, end))
+    spans.sort()
+
+    merged: List[Tuple[int, int]] = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1]:
+            overlap_end = min(end, merged[-1][1])
+            violations.append(Violation(
+                RANGE_OVERLAP,
+                f"Range {_day_span(start, end)} overlaps another range on {_day_span(start, overlap_end)}",
+                start_day=start, end_day=overlap_end))
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+
+    # Activities: bounds, repeats and start times
+    by_day: Dict[int, List[Tuple[int, int, str]]] = {}
+    first_day: Dict[str, int] = {}
+    for item in itinerary.items:
+        if not 1 <= item.day <= days:
+            violations.append(Violation(OUT_OF_RANGE, f"{item.name!r} is on day {item.day}, outside days 1–{days}",
+                                        start_day=item.day, end_day=item.day, names=[item.name]))
+        if item.name in first_day:
+            violations.append(Violation(
+                DUPLICATE_POI, f"{item.name!r} is planned on day {first_day[item.name]} and again on day {item.day}",
+                start_day=item.day, end_day=item.day, names=[item.name]))
+        else:
+            first_day[item.name] = item.day
+        minute = _start_minute(item.time)
+        if minute is None:
+            violations.append(Violation(INVALID_TIME, f"{item.name!r} on day {item.day} has time {item.time!r}",
+                                        start_day=item.day, end_day=item.day, names=[item.name]))
+            by_day.setdefault(item.day, [])
+        else:
+            by_day.setdefault(item.day, []).append((minute, minute + max(item.duration_minutes or 0, 0), item.name))
+
+    # Each day's activities in start order; one overlapping the latest end so far collides with it
+    for day, slots in by_day.items():
+        slots.sort()
+        latest_end, latest_name = -1, None
+        for start, end, name in slots:
+            if start < latest_end:
+                violations.append(Violation(SLOT_COLLISION, f"{latest_name!r} and {name!r} overlap on day {day}",
+                                            start_day=day, end_day=day, names=[latest_name, name]))
+            if end > latest_end:
+                latest_end, latest_name = end, name
+
+    # Activity days inside a range, by binary search over the merged ranges
+    starts = [start for start, _ in merged]
+    for day in sorted(by_day):
+        i = bisect_right(starts, day) - 1
+        if i >= 0 and merged[i][1] >= day:
+            violations.append(Violation(ACTIVITY_IN_RANGE, f"Day {day} has activities but is also in a day range",
+                                        start_day=day, end_day=day))
+
+    for start, end in itinerary.get_uncovered_ranges():
+        violations.append(Violation(GAP, f"Nothing planned on {_day_span(start, end)}", start_day=start, end_day=end))
+
+    return ValidationResult(violations)
+
+
+def check_itinerary(itinerary: Itinerary):
+    """Raise ItineraryValidationError if validate_itinerary() finds anything."""
+    result = validate_itinerary(itinerary)
+    if not result.ok:
+        raise ItineraryValidationError(result.violations)
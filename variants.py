@@ -0,0 +1,197 @@
+# variants.py
+# Alternative itineraries for one intent, generated in parallel and ranked
+# Variants differ in area order, preference weights and tie-breaking seed
+
+import os
+import random
+import statistics
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from data_sources import fetch_pois
+from intent import TripIntent
+from planner import Itinerary, _rank_pois, plan_with_ranking
+from planner_config import PlannerConfig, get_config
+from planning_service import PlanningService, get_planning_service
+from routing import AreaTravelTimes, route_minutes
+
+DEFAULT_VARIANTS = 8
+DEFAULT_TOP_N = 3
+
+# Preference weights are drawn from this range for every variant but the first
+PREFERENCE_WEIGHT_RANGE = (0.5, 1.5)
+
+
+@dataclass
+class ObjectiveWeights:
+    """How much each part of the objective counts towards the total."""
+    coverage: float = 0.5
+    travel: float = 0.3
+    balance: float = 0.2
+
+
+@dataclass
+class ItineraryScore:
+    """
+    Shared objective for comparing itineraries of the same trip.
+
+    Attributes:
+        total: Weighted sum of the normalized parts below (higher is better)
+        coverage: 0-1, share of activities matching a preference averaged
+            with the share of preferences covered at least once
+        travel: 0-1, 1 / (1 + average travel hours per activity day)
+        balance: 0-1, 1 minus the coefficient of variation of activities per day
+        travel_minutes: Total travel between consecutive activities
+    """
+    total: float
+    coverage: float
+    travel: float
+    balance: float
+    travel_minutes: float
+
+
+@dataclass
+class Variant:
+    """One alternative itinerary and its score."""
+    seed: int
+    itinerary: Itinerary
+    score: ItineraryScore
+
+
+def score_itinerary(itinerary: Itinerary, preferences: Sequence[str],
+                    weights: ObjectiveWeights = None, travel=None) -> ItineraryScore:
+    """
+    Score an itinerary against the trip's preferences.
+
+    Travel is estimated from item areas (items don't carry coordinates), so
+    the default source is an AreaTravelTimes.
+    """
+    weights = weights or ObjectiveWeights()
+    travel = travel or AreaTravelTimes()
+    items = itinerary.items
+    if not items:
+        return ItineraryScore(total=0.0, coverage=0.0, travel=0.0, balance=0.0, travel_minutes=0.0)
+
+    prefs = set(preferences or [])
+    if prefs:
+        matched = sum(1 for item in items if prefs & set(item.tags)) / len(items)
+        covered = len(prefs & {tag for item in items for tag in item.tags}) / len(prefs)
+        coverage = (matched + covered) / 2
+    else:
+        coverage = 1.0
+
+    by_day: Dict[int, list] = {}
+    for item in items:
+        by_day.setdefault(item.day, []).append(item)
+    travel_minutes = 0.0
+    for day_items in by_day.values():
+        day_items.sort(key=lambda item: item.time)
+        travel_minutes += route_minutes([{"area": item.area} for item in day_items], travel)
+    travel_score = 1 / (1 + travel_minutes / len(by_day) / 60)
+
+    counts = [len(day_items) for day_items in by_day.values()]
+    mean = statistics.fmean(counts)
+    balance = max(0.0, 1 - statistics.pstdev(counts) / mean)
+
+    total = weights.coverage * coverage + weights.travel * travel_score + weights.balance * balance
+    return ItineraryScore(total=round(total, 6), coverage=round(coverage, 6),
+                          travel=round(travel_score, 6), balance=round(balance, 6),
+                          travel_minutes=travel_minutes)
+
+
+def variant_ranking(pois: List[dict], preferences: Sequence[str],
+                    seed: int) -> Tuple[List[dict], Optional[List[str]]]:
+    """
+    POI ranking and area order for variant `seed`.
+
+    Seed 0 is the standard planner ranking, so the default plan is always
+    among the candidates. Other seeds draw a weight per preference, break
+    ties randomly and shuffle the order in which days visit areas.
+    """
+    prefs = set(preferences or [])
+    if seed == 0:
+        return _rank_pois(pois, prefs), None
+
+    rng = random.Random(seed)
+    pref_weights = {pref: rng.uniform(*PREFERENCE_WEIGHT_RANGE) for pref in sorted(prefs)}
+    jitter = [rng.random() for _ in pois]
+
+    def key(index: int) -> tuple:
+        poi = pois[index]
+        open_start, open_end = poi.get("open", (9, 18))
+        weight = sum(pref_weights.get(tag, 0.0) for tag in set(poi.get("tags", [])))
+        return (-weight, -(open_end - open_start), jitter[index])
+
+    ranked = [pois[i] for i in sorted(range(len(pois)), key=key)]
+    area_order = list(dict.fromkeys(poi.get("area", "Unknown") for poi in ranked))
+    rng.shuffle(area_order)
+    return ranked, area_order
+
+
+def build_variant(intent: TripIntent, pois: List[dict], seed: int, config: PlannerConfig,
+                  weights: ObjectiveWeights = None) -> Variant:
+    """Plan and score one variant."""
+    ranked, area_order = variant_ranking(pois, intent.preferences, seed)
+    itinerary = plan_with_ranking(intent, ranked, config, area_order)
+    return Variant(seed=seed, itinerary=itinerary,
+                   score=score_itinerary(itinerary, intent.preferences, weights))
+
+
+def _build_variants(intent: TripIntent, pois: List[dict], seeds: List[int], config: PlannerConfig,
+                    weights: ObjectiveWeights) -> List[Variant]:
+    """Worker task: several variants sharing one copy of the catalog."""
+    return [build_variant(intent, pois, seed, config, weights) for seed in seeds]
+
+
+def generate_variants(intent: TripIntent, k: int = DEFAULT_VARIANTS, top_n: int = DEFAULT_TOP_N,
+                      config: PlannerConfig = None, weights: ObjectiveWeights = None,
+                      executor: Union[Executor, PlanningService] = None,
+                      workers: int = None) -> List[Variant]:
+    """
+    Generate `k` alternative itineraries and return the best `top_n`.
+
+    Variants are split into one task per worker, so wall-clock time grows
+    with k / workers rather than k; with one worker they are built in the
+    calling thread. Identical plans are only returned once.
+    Results are sorted by score (ties by seed) and don't depend on the
+    executor used.
+
+    Args:
+        intent: Parsed trip intent (the destination must be in the catalog)
+        k: Number of variants to generate, including the standard plan
+        top_n: Number of variants to return
+        config: Planner configuration (uses default if not provided)
+        weights: Objective weights (uses ObjectiveWeights() if not provided)
+        executor: Executor or PlanningService to run on; defaults to the
+            planning service's worker pool (get_planning_service()), whose
+            queue bound then applies: a full queue raises ServiceBusyError
+        workers: Number of tasks to split the variants into (default: CPU count)
+    """
+    if config is None:
+        config = get_config()
+    pois = fetch_pois(intent.destination, intent.preferences)
+    if not pois:
+        return []
+
+    seeds = list(range(max(1, k)))
+    workers = workers or os.cpu_count() or 1
+    chunks = [seeds[i::workers] for i in range(min(workers, len(seeds)))]
+    if len(chunks) > 1 and executor is None:
+        executor = get_planning_service()
+
+    if executor is None or len(chunks) == 1:
+        variants = _build_variants(intent, pois, seeds, config, weights)
+    else:
+        futures = [executor.submit(_build_variants, intent, pois, chunk, config, weights)
+                   for chunk in chunks]
+        variants = [variant for future in futures for variant in future.result()]
+
+    variants.sort(key=lambda v: (-v.score.total, v.seed))
+    unique, seen = [], set()
+    for variant in variants:
+        fingerprint = tuple((item.day, item.time, item.name) for item in variant.itinerary.items)
+        if fingerprint not in seen:
+            seen.add(fingerprint)
+            unique.append(variant)
+    return unique[:top_n]
@@ -4,11 +4,14 @@ Flask Backend API for Trip Planner Agent Web Platform
 Provides REST API endpoints for the web frontend
 """
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
 from io import BytesIO
+import json
 import sys
+from dataclasses import asdict
 import os
+import uuid
 from dotenv import load_dotenv
 
 # Resolve repository root and ensure project modules are importable
@@ -20,19 +23,158 @@ env_path = os.path.join(REPO_ROOT, '.env')
 if os.path.exists(env_path):
     load_dotenv(env_path)
 
-from intent import parse_intent
-from planner import build_itinerary
+from intent import TripIntent, parse_intent, parse_multi_city_intent
+from planner import iter_itinerary, Itinerary, ItineraryDay, PeriodicDayRange
 from llm_planner import create_intelligent_itinerary
 from llm_config import is_llm_available
 from exporters import itinerary_to_markdown, itinerary_to_ics, itinerary_to_ics_string
 from data_sources import get_supported_cities, is_city_supported
+from singleflight import SingleFlight, normalize_request_key
+from circuit_breaker import get_llm_breaker
+from itinerary_cache import get_itinerary_cache
+from preference_classifier import get_preference_classifier
+from variants import generate_variants
+from planning_service import PlanTimeoutError, ServiceBusyError, get_planning_service
+from multi_city import plan_multi_city
+from group import Traveller, plan_group
+from validator import validate_itinerary
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend access
 
+# Load the local preference classifier once at startup
+get_preference_classifier()
+
 # Store recent itineraries for download
 recent_itineraries = {}
 
+# Coalesces identical concurrent /api/plan requests into one computation
+plan_flight = SingleFlight()
+
+# Upper bound on "count" for /api/plan/variants
+MAX_VARIANTS = 32
+
+
+def _compute_plan(user_message: str):
+    """
+    Parse, plan and render one request.
+
+    Returns (intent, itinerary, markdown). itinerary and markdown are None
+    when the request can't be planned (no destination, or an unsupported
+    city in static mode); the caller turns that into an error response.
+    Multi-city requests ("Tokyo 4 days then Singapore 3") are planned leg
+    by leg and returned as one itinerary.
+    """
+    intent = parse_intent(user_message)
+
+    multi_city = parse_multi_city_intent(user_message, intent.preferences)
+    if multi_city:
+        return _compute_multi_city_plan(multi_city)
+
+    if not intent.destination:
+        return intent, None, None
+
+    # Default to 3 days if not specified
+    if not intent.days:
+        intent.days = 3
+
+    # Build itinerary using LLM if available, fallback to static
+    if is_llm_available():
+        # LLM mode - can plan trips to ANY city worldwide
+        itinerary = create_intelligent_itinerary(intent, use_llm=True)
+    else:
+        # Static mode - validate that the destination is in static database
+        if not is_city_supported(intent.destination):
+            return intent, None, None
+
+        # Planning and rendering run in the worker pool, off this request thread
+        itinerary, markdown = get_planning_service().plan(intent)
+        return intent, itinerary, markdown
+
+    # Convert to markdown
+    markdown = itinerary_to_markdown(itinerary)
+
+    return intent, itinerary, markdown
+
+
+def _compute_multi_city_plan(multi_city):
+    """
+    _compute_plan for a multi-city intent. The returned intent summarizes
+    the trip, or names the first unsupported city in static mode.
+    """
+    if is_llm_available():
+        plan = plan_multi_city(multi_city, use_llm=True)
+    else:
+        for leg in multi_city.legs:
+            if not is_city_supported(leg.destination):
+                return TripIntent(destination=leg.destination, days=leg.days,
+                                  preferences=multi_city.preferences), None, None
+        # Each leg is its own pool job, so the legs are planned in parallel
+        service = get_planning_service()
+        plan = plan_multi_city(multi_city, plan_leg=lambda leg_intent: service.plan(leg_intent)[0])
+
+    itinerary = plan.itinerary
+    intent = TripIntent(destination=itinerary.destination, days=itinerary.days,
+                        preferences=multi_city.preferences)
+    return intent, itinerary, itinerary_to_markdown(itinerary)
+
+
+def _item_to_dict(item) -> dict:
+    return {
+        'day': item.day,
+        'time': item.time,
+        'name': item.name,
+        'area': item.area,
+        'tags': item.tags,
+        'url': item.url,
+        'duration_minutes': item.duration_minutes
+    }
+
+
+def _day_range_to_dict(dr) -> dict:
+    return {
+        'start_day': dr.start_day,
+        'end_day': dr.end_day,
+        'description': dr.description,
+        'activity_type': dr.activity_type,
+        'num_days': dr.num_days,
+        # Repeating block length for periodic ranges (e.g. weekly rest on very long trips)
+        'period': dr.period_days if isinstance(dr, PeriodicDayRange) else None
+    }
+
+
+def _violations(itinerary) -> list:
+    """
+    Structural problems in an itinerary about to be returned, as dicts.
+
+    Empty for a sound plan. Anything found (most likely in an LLM plan) is
+    logged and passed on to the client rather than failing the request.
+    """
+    result = validate_itinerary(itinerary)
+    if not result.ok:
+        print(f"Itinerary for {itinerary.destination} failed validation: {', '.join(result.codes)}")
+    return [asdict(v) for v in result.violations]
+
+
+def _intent_error(intent):
+    """Error response for an intent that can't be planned, or None."""
+    if not intent.destination:
+        return jsonify({
+            'success': False,
+            'error': 'Could not identify destination. Please specify a city.',
+            'llm_available': is_llm_available(),
+            'message': 'You can ask for ANY city worldwide!' if is_llm_available() else f'Please choose from: {", ".join(get_supported_cities())}'
+        }), 400
+    if not is_llm_available() and not is_city_supported(intent.destination):
+        return jsonify({
+            'success': False,
+            'error': f'City "{intent.destination}" is not supported yet. Please choose from the available cities.',
+            'supported_cities': get_supported_cities(),
+            'llm_available': False,
+            'message': f'To enable planning for ANY city, add ANTHROPIC_API_KEY to .env file'
+        }), 400
+    return None
+
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -40,7 +182,10 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'service': 'Trip Planner Agent API',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'llm_circuit': get_llm_breaker().snapshot(),
+        'itinerary_cache': get_itinerary_cache().stats(),
+        'planning_service': get_planning_service().stats()
     })
 
 
@@ -75,8 +220,12 @@ def plan_trip():
         "intent": {...},
         "itinerary": {...},
         "markdown": "...",
+        "violations": [],
         "itinerary_id": "..."
     }
+
+    "violations" lists anything validate_itinerary() found wrong with the
+    plan (gaps, overlaps, repeated POIs, ...); it is empty for a sound plan.
     """
     try:
         data = request.get_json()
@@ -89,8 +238,10 @@ def plan_trip():
 
         user_message = data['message']
 
-        # Parse intent
-        intent = parse_intent(user_message)
+        # Identical concurrent requests share one computation; each gets its own copy
+        intent, itinerary, markdown = plan_flight.do(
+            normalize_request_key(user_message), _compute_plan, user_message
+        )
 
         if not intent.destination:
             return jsonify({
@@ -100,60 +251,24 @@ def plan_trip():
                 'message': 'You can ask for ANY city worldwide!' if is_llm_available() else f'Please choose from: {", ".join(get_supported_cities())}'
             }), 400
 
-        # Default to 3 days if not specified
-        if not intent.days:
-            intent.days = 3
-
-        # Build itinerary using LLM if available, fallback to static
-        if is_llm_available():
-            # LLM mode - can plan trips to ANY city worldwide
-            itinerary = create_intelligent_itinerary(intent, use_llm=True)
-        else:
-            # Static mode - validate that the destination is in static database
-            if not is_city_supported(intent.destination):
-                return jsonify({
-                    'success': False,
-                    'error': f'City "{intent.destination}" is not supported yet. Please choose from the available cities.',
-                    'supported_cities': get_supported_cities(),
-                    'llm_available': False,
-                    'message': f'To enable planning for ANY city, add ANTHROPIC_API_KEY to .env file'
-                }), 400
-
-            itinerary = build_itinerary(intent)
-
-        # Convert to markdown
-        markdown = itinerary_to_markdown(itinerary)
+        if itinerary is None:
+            return jsonify({
+                'success': False,
+                'error': f'City "{intent.destination}" is not supported yet. Please choose from the available cities.',
+                'supported_cities': get_supported_cities(),
+                'llm_available': False,
+                'message': f'To enable planning for ANY city, add ANTHROPIC_API_KEY to .env file'
+            }), 400
 
         # Generate unique ID for this itinerary
-        import uuid
         itinerary_id = str(uuid.uuid4())
 
         # Store itinerary for later download
         recent_itineraries[itinerary_id] = itinerary
 
         # Convert itinerary items and day ranges to dict for JSON serialization
-        items_dict = [
-            {
-                'day': item.day,
-                'time': item.time,
-                'name': item.name,
-                'area': item.area,
-                'tags': item.tags,
-                'url': item.url
-            }
-            for item in itinerary.items
-        ]
-
-        day_ranges_dict = [
-            {
-                'start_day': dr.start_day,
-                'end_day': dr.end_day,
-                'description': dr.description,
-                'activity_type': dr.activity_type,
-                'num_days': dr.num_days
-            }
-            for dr in itinerary.day_ranges
-        ] if itinerary.day_ranges else []
+        items_dict = [_item_to_dict(item) for item in itinerary.items]
+        day_ranges_dict = [_day_range_to_dict(dr) for dr in itinerary.day_ranges]
 
         return jsonify({
             'success': True,
@@ -170,15 +285,310 @@ def plan_trip():
                 'day_ranges': day_ranges_dict
             },
             'markdown': markdown,
+            'violations': _violations(itinerary),
             'itinerary_id': itinerary_id
         })
 
+    except ServiceBusyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+
+    except PlanTimeoutError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 504
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/plan/stream', methods=['POST'])
+def plan_trip_stream():
+    """
+    Plan a trip and stream it as newline-delimited JSON.
+
+    Same request body as /api/plan. Each line is one event:
+
+        {"type": "intent", "destination": ..., "days": ..., "preferences": [...]}
+        {"type": "day", "day": 1, "items": [...]}
+        {"type": "range", "start_day": 4, "end_day": 10, ...}
+        {"type": "done", "itinerary_id": "...", "markdown": "...", "violations": []}
+
+    Days and ranges arrive in day order. In static mode they are sent as the
+    planner produces them, so long trips show their first days right away;
+    LLM plans are streamed once Claude has answered. Multi-city requests
+    are planned leg by leg as in /api/plan and streamed once every leg is
+    done. Errors are reported before streaming starts, with the same bodies
+    as /api/plan.
+    """
+    data = request.get_json(silent=True)
+    if not data or 'message' not in data:
+        return jsonify({
+            'success': False,
+            'error': 'Missing "message" in request body'
+        }), 400
+
+    try:
+        intent = parse_intent(data['message'])
+        multi_city = parse_multi_city_intent(data['message'], intent.preferences)
+        itinerary = None
+        if multi_city:
+            intent, itinerary, _ = _compute_multi_city_plan(multi_city)
+        # A planned multi-city trip is named after all its legs, not one city
+        error = _intent_error(intent) if itinerary is None else None
+        if error:
+            return error
+        if not intent.days:
+            intent.days = 3
+
+        if itinerary is not None:
+            parts = itinerary.iter_parts()
+        elif is_llm_available():
+            parts = create_intelligent_itinerary(intent, use_llm=True).iter_parts()
+        else:
+            parts = iter_itinerary(intent)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+    def generate():
+        def line(event: dict) -> str:
+            return json.dumps(event) + '\n'
+
+        yield line({
+            'type': 'intent',
+            'destination': intent.destination,
+            'days': intent.days,
+            'preferences': intent.preferences
+        })
+
+        # Keep what was sent so the finished itinerary can be downloaded
+        items, day_ranges = [], []
+        try:
+            for part in parts:
+                if isinstance(part, ItineraryDay):
+                    items.extend(part.items)
+                    yield line({
+                        'type': 'day',
+                        'day': part.day,
+                        'items': [_item_to_dict(item) for item in part.items]
+                    })
+                else:
+                    day_ranges.append(part)
+                    yield line({'type': 'range', **_day_range_to_dict(part)})
+        except Exception as e:
+            yield line({'type': 'error', 'error': str(e)})
+            return
+
+        itinerary = Itinerary(destination=intent.destination, days=intent.days,
+                              items=items, day_ranges=day_ranges)
+        itinerary_id = str(uuid.uuid4())
+        recent_itineraries[itinerary_id] = itinerary
+        yield line({
+            'type': 'done',
+            'itinerary_id': itinerary_id,
+            'markdown': itinerary_to_markdown(itinerary),
+            'violations': _violations(itinerary)
+        })
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+
+@app.route('/api/plan/variants', methods=['POST'])
+def plan_trip_variants():
+    """
+    Alternative itineraries for one request, best first.
+
+    Request body:
+    {
+        "message": "Plan a 3-day trip to Tokyo for food and culture",
+        "count": 8,   # variants to generate (optional, max MAX_VARIANTS)
+        "top": 3      # variants to return (optional)
+    }
+
+    Response:
+    {
+        "success": true,
+        "intent": {...},
+        "variants": [{"itinerary_id": "...", "score": {...}, "itinerary": {...}, "markdown": "..."}]
+    }
+
+    Variants are built from the built-in catalog, so only supported cities
+    can be planned, with or without an API key.
+    """
+    data = request.get_json(silent=True)
+    if not data or 'message' not in data:
+        return jsonify({
+            'success': False,
+            'error': 'Missing "message" in request body'
+        }), 400
+
+    try:
+        count = max(1, min(int(data.get('count', 8)), MAX_VARIANTS))
+        top = max(1, int(data.get('top', 3)))
+    except (TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'error': '"count" and "top" must be integers'
+        }), 400
+
+    try:
+        intent = parse_intent(data['message'])
+        error = _intent_error(intent)
+        if error:
+            return error
+        if not is_city_supported(intent.destination):
+            return jsonify({
+                'success': False,
+                'error': f'Alternative plans are only available for: {", ".join(get_supported_cities())}',
+                'supported_cities': get_supported_cities()
+            }), 400
+        if not intent.days:
+            intent.days = 3
+
+        variants = []
+        for variant in generate_variants(intent, k=count, top_n=top):
+            itinerary_id = str(uuid.uuid4())
+            recent_itineraries[itinerary_id] = variant.itinerary
+            variants.append({
+                'itinerary_id': itinerary_id,
+                'score': asdict(variant.score),
+                'itinerary': {
+                    'destination': variant.itinerary.destination,
+                    'days': variant.itinerary.days,
+                    'items': [_item_to_dict(item) for item in variant.itinerary.items],
+                    'day_ranges': [_day_range_to_dict(dr) for dr in variant.itinerary.day_ranges]
+                },
+                'markdown': itinerary_to_markdown(variant.itinerary),
+                'violations': _violations(variant.itinerary)
+            })
+
+        return jsonify({
+            'success': True,
+            'intent': {
+                'destination': intent.destination,
+                'days': intent.days,
+                'preferences': intent.preferences
+            },
+            'variants': variants
+        })
+
+    except ServiceBusyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/plan/group', methods=['POST'])
+def plan_group_trip():
+    """
+    One shared itinerary for a group of travellers.
+
+    Request body:
+    {
+        "destination": "Tokyo",
+        "days": 4,
+        "travellers": [
+            {"name": "Ana", "preferences": ["food", "art"], "weight": 1.0, "must_see": ["teamLab Planets"]},
+            {"name": "Ben", "preferences": ["nature"]}
+        ]
+    }
+
+    Response:
+    {
+        "success": true,
+        "preference_weights": {"food": 0.25, ...},
+        "coverage": [{"name": "Ana", "matched_items": 5, ...}, ...],
+        "itinerary": {...},
+        "markdown": "...",
+        "itinerary_id": "..."
+    }
+
+    Group plans are built from the built-in catalog, so only supported
+    cities can be planned, with or without an API key.
+    """
+    data = request.get_json(silent=True)
+    if not data or 'destination' not in data or not data.get('travellers'):
+        return jsonify({
+            'success': False,
+            'error': 'Request body needs "destination" and a non-empty "travellers" list'
+        }), 400
+
+    try:
+        travellers = [
+            Traveller(name=str(t.get('name', f'Traveller {i + 1}')),
+                      preferences=list(t.get('preferences', [])),
+                      weight=float(t.get('weight', 1.0)),
+                      must_see=list(t.get('must_see', [])))
+            for i, t in enumerate(data['travellers'])
+        ]
+        days = int(data['days']) if data.get('days') is not None else 3
+    except (AttributeError, TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'error': '"travellers" must be objects with a list of "preferences" and a numeric "weight", '
+                     'and "days" must be an integer'
+        }), 400
+
+    if days < 1:
+        return jsonify({
+            'success': False,
+            'error': '"days" must be at least 1'
+        }), 400
+
+    if not is_city_supported(data['destination']):
+        return jsonify({
+            'success': False,
+            'error': f'Group plans are only available for: {", ".join(get_supported_cities())}',
+            'supported_cities': get_supported_cities()
+        }), 400
+
+    try:
+        plan = plan_group(data['destination'], days, travellers)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+    itinerary = plan.itinerary
+    itinerary_id = str(uuid.uuid4())
+    recent_itineraries[itinerary_id] = itinerary
+    return jsonify({
+        'success': True,
+        'preference_weights': plan.preference_weights,
+        'coverage': [asdict(c) for c in plan.coverage],
+        'itinerary': {
+            'destination': itinerary.destination,
+            'days': itinerary.days,
+            'items': [_item_to_dict(item) for item in itinerary.items],
+            'day_ranges': [_day_range_to_dict(dr) for dr in itinerary.day_ranges]
+        },
+        'markdown': itinerary_to_markdown(itinerary),
+        'violations': _violations(itinerary),
+        'itinerary_id': itinerary_id
+    })
+
 
 @app.route('/api/download/<itinerary_id>', methods=['GET'])
 def download_calendar(itinerary_id):
@@ -334,12 +744,18 @@ if __name__ == '__main__':
     # Determine if running in production or development
     debug_mode = os.environ.get('FLASK_ENV', 'production') == 'development'
 
+    # Start the planning workers now so the first request doesn't wait for them
+    get_planning_service().start()
+
     print(f"📍 API available at: http://localhost:{port}")
     print("📖 Endpoints:")
-    print("   GET  /api/health       - Health check")
-    print("   GET  /api/cities       - List supported cities")
-    print("   POST /api/plan         - Plan a trip")
-    print("   GET  /api/download/:id - Download calendar file")
-    print("   GET  /api/examples     - Get example prompts")
+    print("   GET  /api/health        - Health check")
+    print("   GET  /api/cities        - List supported cities")
+    print("   POST /api/plan          - Plan a trip")
+    print("   POST /api/plan/stream   - Plan a trip, streamed day by day (NDJSON)")
+    print("   POST /api/plan/variants - Alternative itineraries, best first")
+    print("   POST /api/plan/group    - One itinerary for a group of travellers")
+    print("   GET  /api/download/:id  - Download calendar file")
+    print("   GET  /api/examples      - Get example prompts")
 
     app.run(host='0.0.0.0', port=port, debug=debug_mode)
@@ -298,7 +298,7 @@ function displayItinerary(itinerary) {
                     <span class="range-type">${range.activity_type.replace('_', ' ')}</span>
                 </div>
                 <div class="day-range-description">
-                    ${escapeHtml(range.description)}
+                    ${escapeHtml(range.description)}${range.period ? ` (repeats every ${range.period} days)` : ''}
                 </div>
             </div>
         `).join('');